@@ -1,199 +1,381 @@
-import streamlit as st
-import pandas as pd
-from google.cloud import storage
-from servicios import extrae_csv, extrae_pdf, compara_totales, carga_csv
-import tempfile
-import os
-import dotenv
-
-from servicios.busquedallm import realiza_busqueda_llm
-from servicios.db.database_operations import insert_scales_data
-
-dotenv.load_dotenv()
-
-bucket_name = os.getenv('BUCKET_NAME')
-
-# --- FUNCIÓN PARA SUBIR ARCHIVOS A GCS ---
-# Debes configurar tus credenciales de GCP en el entorno donde ejecutes esto.
-def upload_to_gcs(bucket_name, file_object, destination_blob_name):
-    """Sube un objeto de archivo en memoria a un bucket de GCS."""
-    try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(destination_blob_name)
-
-        # Volver al inicio del archivo antes de subirlo
-        file_object.seek(0)
-        
-        blob.upload_from_file(file_object)
-        print(f"Archivo {destination_blob_name} subido exitosamente a {bucket_name}.")
-        return True
-    except Exception as e:
-        print(f"Error al subir a GCS: {e}")
-        return False
-
-# --- CONFIGURACIÓN DE LA PÁGINA ---
-st.set_page_config(layout="wide")
-st.title("Dashboard de Análisis de Facturas 📄🔍")
-
-# --- INICIALIZACIÓN DEL ESTADO DE SESIÓN ---
-# 'analysis_ready': controla la visibilidad del botón de análisis.
-if 'analysis_ready' not in st.session_state:
-    st.session_state.analysis_ready = False
-# 'df_results': almacenará el dataframe del análisis.
-if 'df_results' not in st.session_state:
-    st.session_state.df_results = None
-# 'periodo': almacenará el periodo extraído del CSV.
-if 'periodo' not in st.session_state:
-    st.session_state.periodo = 0
-# 'csv_download_data': almacenará los datos del CSV listos para descargar.
-if 'csv_download_data' not in st.session_state:
-    st.session_state.csv_download_data = None
-
-# ======================================================================
-# BARRA LATERAL (SIDEBAR)
-# ======================================================================
-with st.sidebar:
-    st.header("Carga de Archivos para Chequeo")
-
-    mensajes_sidebar = st.empty()
-
-    pdf_file = st.file_uploader("Sube tu factura PDF", type="pdf")
-    csv_file = st.file_uploader("Sube tu reporte CSV", type="csv")
-
-    if st.button("Chequear Totales"):
-        # Resetea el estado cada vez que se presiona el botón
-        st.session_state.analysis_ready = False
-        st.session_state.df_results = None
-        st.session_state.periodo = 0
-        st.session_state.csv_download_data = None # Limpiar datos de descarga
-        
-        if pdf_file and csv_file:
-            with st.spinner("Procesando archivos..."):
-                # (Tu lógica de archivos temporales se mantiene igual)
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-                    tmp_pdf.write(pdf_file.getvalue())
-                    pdf_path = tmp_pdf.name
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_csv:
-                    tmp_csv.write(csv_file.getvalue())
-                    csv_path = tmp_csv.name
-
-                total_factura_pdf = extrae_pdf.extraer_total_de_factura(pdf_path)
-                total_reporte_csv, periodo = extrae_csv.extrae_csv(csv_path)
-                st.session_state.periodo = periodo # Guardar periodo en el estado
-                son_iguales = compara_totales.compara_totales(total_factura_pdf, total_reporte_csv)
-                
-
-                # --- LÓGICA CONDICIONAL ---
-            if son_iguales:
-                st.success("Los totales coinciden perfectamente. Procediendo con las cargas...")
-                
-                try:
-                    # --- 1. Subir archivos a GCS ---
-                    st.info("Subiendo archivos a Cloud Storage e insertando registros en SQL...")
-                    pdf_blob_name = f"facturas/{pdf_file.name}"
-                    csv_blob_name = f"csv/{csv_file.name}"
-                    
-                    pdf_uploaded = upload_to_gcs(bucket_name, pdf_file, pdf_blob_name)
-                    csv_uploaded = upload_to_gcs(bucket_name, csv_file, csv_blob_name)
-                    
-                    if not (pdf_uploaded and csv_uploaded):
-                        st.error("Falló la subida de archivos a GCS. Proceso abortado.")
-                        
-                    # --- 2. Cargar CSV a la base de datos ---
-                    carga_csv.carga_invoices(csv_path)
-
-                    # --- 3. Actualizar estado de la app ---
-                    st.session_state.analysis_ready = True
-
-                except Exception as e:
-                    # Capturar cualquier error durante el proceso
-                    st.error(f"Ocurrió un error: {e}")
-                
-                finally:
-                    # --- 4. Limpiar archivos temporales ---
-                    # Este bloque se ejecuta siempre, haya error o no.
-                    if os.path.exists(pdf_path):
-                        os.remove(pdf_path)
-                    if os.path.exists(csv_path):
-                        os.remove(csv_path)
-                with mensajes_sidebar.container():
-                    st.success("¡Archivos subidos y Datos cargados en la base de datos exitosamente!")
-                    st.write("Limpieza de archivos temporales finalizada.")
-
-            else:
-                st.error("No coinciden los totales entre Factura y soporte.")
-        else:
-            st.warning("Por favor, asegúrate de subir ambos archivos.")
-
-    # --- BOTÓN CONDICIONAL PARA INICIAR ANÁLISIS ---
-    if st.session_state.analysis_ready:
-        st.markdown("---") # Separador visual
-        if st.button("🚀 Iniciar Análisis"):
-            mensajes_sidebar.empty()
-            with st.spinner("Realizando análisis con el modelo..."):
-                # Llama a la función y guarda el resultado en el estado de sesión
-                st.session_state.df_results = realiza_busqueda_llm(st.session_state.periodo)
-                st.session_state.csv_download_data = None # Limpiar datos de descarga previos
-                st.balloons()
-                st.success("¡Análisis completado!")
-
-# ======================================================================
-# PÁGINA PRINCIPAL
-# ======================================================================
-
-@st.cache_data
-def convert_df_to_csv(df):
-    """Convierte un DataFrame a un string de bytes en formato CSV."""
-    return df.to_csv(index=False).encode('utf-8')
-
-# --- NUEVA SECCIÓN: Mostrar los resultados del análisis ---
-# Esto se mostrará solo si el dataframe existe en el estado de sesión
-if st.session_state.df_results is not None:
-    st.subheader("Resultados del Análisis")
-    
-    # Columnas que quieres mostrar en la tabla
-    columnas_a_mostrar = [
-        'nombre_producto', 
-        'track_code', 
-        'peso_facturable', 
-        'tarifa_proveedor', 
-        'tarifa_real', 
-        'diferencia'
-    ]
-    
-    # Filtra el DataFrame para mostrar solo las columnas deseadas
-    df_filtrado = st.session_state.df_results[columnas_a_mostrar]
-    
-    # Muestra el DataFrame en la página principal
-    st.dataframe(df_filtrado)
-    
-    st.markdown("---")
-    
-# --- LÓGICA PARA EL BOTÓN DE DOBLE ACCIÓN ---
-
-    # 1. Botón principal que inicia la acción
-    if st.button("Guardar en BD y Generar Reporte"):
-        with st.spinner("Procesando..."):
-            insert_success = insert_scales_data(st.session_state.df_results)
-
-            if insert_success:
-                st.success("¡Datos guardados en la base de datos exitosamente!")
-                # Prepara los datos del CSV para la descarga y los guarda en el estado
-                st.session_state.csv_download_data = convert_df_to_csv(df_filtrado)
-            else:
-                st.error("Hubo un problema al guardar los datos en la base de datos.")
-                st.session_state.csv_download_data = None
-
-    # 2. El botón de descarga solo aparece si los datos del CSV están listos
-    #    Usamos .get() para acceder de forma segura y evitar el KeyError.
-    if st.session_state.get("csv_download_data") is not None:
-        file_name = f"periodo_{st.session_state.periodo}.csv"
-        st.download_button(
-           label="📥 Descargar Reporte CSV",
-           data=st.session_state.csv_download_data,
-           file_name=file_name,
-           mime='text/csv'
-        )
-else:
-    st.info("Carga los archivos en la barra lateral y ejecuta el análisis para ver los resultados aquí.")
\ No newline at end of file
+import streamlit as st
+import pandas as pd
+from servicios import extrae_csv, extrae_pdf, compara_totales, carga_csv
+import os
+import json
+import dotenv
+
+from servicios import trabajos
+from servicios import auditoria_declarada
+from servicios import almacenamiento
+from servicios.consulta_tarificacion import version_tarifario
+from servicios.db.database_operations import insert_scales_data
+from servicios.metricas import Metricas, corrida
+
+# Filas por página en las tablas de resultados: el navegador recibe solo las visibles.
+FILAS_POR_PAGINA = 100
+
+
+@st.cache_resource
+def configuracion() -> dict:
+    """
+    Lee el .env una sola vez por proceso del servidor, no en cada rerun.
+
+    El engine de la base, los clientes de Tavily, Gemini y Cloud Storage y el
+    tarifario ya son únicos por proceso en `servicios` (los comparten los
+    análisis en segundo plano), así que no se duplican acá.
+    """
+    dotenv.load_dotenv()
+    return {'bucket_name': os.getenv('BUCKET_NAME')}
+
+
+bucket_name = configuracion()['bucket_name']
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def audita_periodo(periodo: int, version: tuple) -> pd.DataFrame:
+    """
+    Auditoría con datos declarados del periodo, guardada entre reruns.
+
+    `version` es la de 'tarifario': si cambian las tarifas la clave cambia y se
+    recalcula. Al cargar un CSV nuevo se invalida con `audita_periodo.clear()`.
+    """
+    return auditoria_declarada.audita_periodo(periodo)
+
+
+# --- CONFIGURACIÓN DE LA PÁGINA ---
+st.set_page_config(layout="wide")
+st.title("Dashboard de Análisis de Facturas 📄🔍")
+
+# --- INICIALIZACIÓN DEL ESTADO DE SESIÓN ---
+# 'analysis_ready': controla la visibilidad del botón de análisis.
+if 'analysis_ready' not in st.session_state:
+    st.session_state.analysis_ready = False
+# 'df_results': almacenará el dataframe del análisis.
+if 'df_results' not in st.session_state:
+    st.session_state.df_results = None
+# 'periodo': almacenará el periodo extraído del CSV.
+if 'periodo' not in st.session_state:
+    st.session_state.periodo = 0
+# 'csv_download_data': almacenará los datos del CSV listos para descargar.
+if 'csv_download_data' not in st.session_state:
+    st.session_state.csv_download_data = None
+# 'trabajo_id': id del análisis que corre en segundo plano y cuyo progreso se muestra.
+if 'trabajo_id' not in st.session_state:
+    st.session_state.trabajo_id = None
+# 'metricas': registro de métricas de la última corrida de la sesión (chequeo o análisis).
+if 'metricas' not in st.session_state:
+    st.session_state.metricas = None
+# 'auditoria': resultado de la auditoría con datos declarados del periodo elegido.
+if 'auditoria' not in st.session_state:
+    st.session_state.auditoria = None
+
+# ======================================================================
+# BARRA LATERAL (SIDEBAR)
+# ======================================================================
+with st.sidebar:
+    st.header("Carga de Archivos para Chequeo")
+
+    mensajes_sidebar = st.empty()
+
+    pdf_file = st.file_uploader("Sube tu factura PDF", type="pdf")
+    csv_file = st.file_uploader("Sube tu reporte CSV", type="csv")
+
+    if st.button("Chequear Totales"):
+        # Resetea el estado cada vez que se presiona el botón
+        st.session_state.analysis_ready = False
+        st.session_state.df_results = None
+        st.session_state.periodo = 0
+        st.session_state.csv_download_data = None # Limpiar datos de descarga
+        # Las métricas del panel son las de esta corrida, sin tocar las de otras sesiones o análisis.
+        st.session_state.metricas = Metricas()
+        with corrida(st.session_state.metricas):
+            if pdf_file and csv_file:
+                with st.spinner("Procesando archivos..."):
+                    # Los archivos subidos se leen desde memoria, sin copiarlos a disco.
+                    total_factura_pdf = extrae_pdf.extraer_total_de_factura(pdf_file)
+                    # El CSV se parsea una sola vez: el mismo reporte se usa para
+                    # comparar totales y para cargar la base de datos.
+                    try:
+                        reporte_csv = extrae_csv.lee_csv_invoices(csv_file)
+                        st.session_state.periodo = reporte_csv.periodo # Guardar periodo en el estado
+                        son_iguales = compara_totales.compara_totales(total_factura_pdf, reporte_csv.df)
+                    except Exception as e:
+                        st.error(f"Ocurrió un error al procesar el CSV: {e}")
+                        son_iguales = False
+                
+
+                    # --- LÓGICA CONDICIONAL ---
+                if son_iguales:
+                    st.success("Los totales coinciden perfectamente. Procediendo con las cargas...")
+                
+                    try:
+                        # --- 1. Subir archivos a GCS (en segundo plano, a la vez) ---
+                        # Las credenciales de GCP se toman del entorno donde se ejecuta la app.
+                        st.info("Subiendo archivos a Cloud Storage e insertando registros en SQL...")
+                        subidas = almacenamiento.sube_archivos(bucket_name, {
+                            f"facturas/{pdf_file.name}": pdf_file,
+                            f"csv/{csv_file.name}": csv_file,
+                        })
+
+                        # --- 2. Cargar CSV a la base de datos, mientras se suben los archivos ---
+                        carga_csv.carga_invoices(reporte_csv)
+                        # Las auditorías guardadas del periodo ya no reflejan lo cargado.
+                        audita_periodo.clear()
+
+                        if not all(subida.result() for subida in subidas.values()):
+                            st.error("Falló la subida de archivos a GCS.")
+
+                        # --- 3. Actualizar estado de la app ---
+                        st.session_state.analysis_ready = True
+
+                        with mensajes_sidebar.container():
+                            st.success("¡Archivos subidos y Datos cargados en la base de datos exitosamente!")
+
+                    except Exception as e:
+                        # Capturar cualquier error durante el proceso (también una carga que no terminó)
+                        st.error(f"Ocurrió un error: {e}")
+
+                else:
+                    st.error("No coinciden los totales entre Factura y soporte.")
+            else:
+                st.warning("Por favor, asegúrate de subir ambos archivos.")
+
+    # --- BOTÓN CONDICIONAL PARA INICIAR ANÁLISIS ---
+    if st.session_state.analysis_ready:
+        st.markdown("---") # Separador visual
+        if st.button("🚀 Iniciar Análisis"):
+            mensajes_sidebar.empty()
+            # El análisis corre en segundo plano: el botón solo lo encola.
+            st.session_state.trabajo_id = trabajos.enviar_analisis(st.session_state.periodo)
+            st.session_state.metricas = trabajos.metricas_trabajo(st.session_state.trabajo_id)
+            st.session_state.df_results = None
+            st.session_state.csv_download_data = None # Limpiar datos de descarga previos
+            st.info(f"Análisis enviado. Id de trabajo: {st.session_state.trabajo_id}")
+
+    # --- ANÁLISIS ANTERIORES O EN CURSO ---
+    # Permite retomar el seguimiento tras una reconexión o cargar un resultado ya calculado.
+    trabajos_conocidos = trabajos.lista_trabajos()
+    if trabajos_conocidos:
+        st.markdown("---")
+        st.header("Análisis")
+        opciones = {
+            f"{t.periodo} · {t.estado} · {t.id}": t.id for t in trabajos_conocidos
+        }
+        seleccion = st.selectbox("Análisis anteriores o en curso", list(opciones))
+        if st.button("Ver análisis"):
+            trabajo = trabajos.obtener_trabajo(opciones[seleccion])
+            st.session_state.periodo = trabajo.periodo
+            st.session_state.metricas = trabajos.metricas_trabajo(trabajo.id)
+            st.session_state.csv_download_data = None
+            if trabajo.estado == trabajos.TERMINADO:
+                st.session_state.df_results = trabajos.carga_resultado(trabajo.id)
+                st.session_state.trabajo_id = None
+            else:
+                st.session_state.df_results = None
+                st.session_state.trabajo_id = trabajo.id
+
+# ======================================================================
+# PÁGINA PRINCIPAL
+# ======================================================================
+
+@st.cache_data
+def convert_df_to_csv(df):
+    """Convierte un DataFrame a un string de bytes en formato CSV."""
+    return df.to_csv(index=False).encode('utf-8')
+
+
+@st.fragment(run_every=2)
+def muestra_progreso():
+    """Consulta cada 2 segundos el estado del análisis en segundo plano."""
+    trabajo = trabajos.obtener_trabajo(st.session_state.trabajo_id)
+    if trabajo is None:
+        st.session_state.trabajo_id = None
+        return
+
+    st.subheader(f"Análisis del periodo {trabajo.periodo}")
+    if trabajo.estado == trabajos.TERMINADO:
+        st.session_state.df_results = trabajos.carga_resultado(trabajo.id)
+        st.session_state.trabajo_id = None
+        st.balloons()
+        st.rerun()
+    elif trabajo.estado in (trabajos.FALLIDO, trabajos.INTERRUMPIDO):
+        st.error(f"El análisis terminó en estado '{trabajo.estado}'. {trabajo.error or ''}")
+        # Las filas ya resueltas quedaron guardadas: se retoma desde donde se cortó.
+        if st.button("⏩ Reanudar análisis"):
+            st.session_state.trabajo_id = trabajos.enviar_analisis(trabajo.periodo, reanudar=True)
+            st.session_state.metricas = trabajos.metricas_trabajo(st.session_state.trabajo_id)
+            st.rerun()
+    else:
+        avance = trabajo.hechos / trabajo.total if trabajo.total else 0.0
+        st.progress(avance, text=f"{trabajo.hechos} de {trabajo.total} productos procesados")
+        eta = trabajo.eta_segundos
+        col1, col2 = st.columns(2)
+        col1.metric("Productos restantes", trabajo.restantes)
+        col2.metric("Tiempo restante estimado", f"{eta / 60:.1f} min" if eta is not None else "calculando...")
+
+
+def muestra_paginado(df: pd.DataFrame, clave: str, filas_por_pagina: int = FILAS_POR_PAGINA):
+    """Muestra `df` de a una página, con un selector de página si no entra en una sola."""
+    paginas = max(1, -(-len(df) // filas_por_pagina))
+    # Un resultado nuevo puede tener menos páginas que la elegida antes.
+    if st.session_state.get(clave, 1) > paginas:
+        st.session_state[clave] = 1
+    pagina = 1
+    if paginas > 1:
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1, key=clave)
+    inicio = (pagina - 1) * filas_por_pagina
+    st.dataframe(df.iloc[inicio:inicio + filas_por_pagina], hide_index=True)
+    if paginas > 1:
+        st.caption(f"Filas {inicio + 1:,} a {min(inicio + filas_por_pagina, len(df)):,} de {len(df):,}")
+
+
+@st.fragment
+def muestra_resultados():
+    """
+    Tabla de resultados, guardado y descarga. Es un fragmento: cambiar de
+    página, guardar o descargar rerenderiza solo esta sección.
+    """
+    st.subheader("Resultados del Análisis")
+
+    # Columnas que quieres mostrar en la tabla
+    columnas_a_mostrar = [
+        'nombre_producto', 
+        'track_code', 
+        'peso_facturable', 
+        'tarifa_proveedor', 
+        'tarifa_real', 
+        'diferencia'
+    ]
+
+    # Filtra el DataFrame para mostrar solo las columnas deseadas
+    df_filtrado = st.session_state.df_results[columnas_a_mostrar]
+
+    # Muestra el DataFrame en la página principal, de a una página
+    muestra_paginado(df_filtrado, clave="pagina_resultados")
+
+    st.markdown("---")
+
+    # --- LÓGICA PARA EL BOTÓN DE DOBLE ACCIÓN ---
+
+    # 1. Botón principal que inicia la acción
+    if st.button("Guardar en BD y Generar Reporte"):
+        with st.spinner("Procesando..."):
+            insert_success = insert_scales_data(st.session_state.df_results)
+
+            if insert_success:
+                st.success("¡Datos guardados en la base de datos exitosamente!")
+                # Prepara los datos del CSV para la descarga y los guarda en el estado
+                st.session_state.csv_download_data = convert_df_to_csv(df_filtrado)
+            else:
+                st.error("Hubo un problema al guardar los datos en la base de datos.")
+                st.session_state.csv_download_data = None
+
+    # 2. El botón de descarga solo aparece si los datos del CSV están listos
+    #    Usamos .get() para acceder de forma segura y evitar el KeyError.
+    if st.session_state.get("csv_download_data") is not None:
+        file_name = f"periodo_{st.session_state.periodo}.csv"
+        st.download_button(
+           label="📥 Descargar Reporte CSV",
+           data=st.session_state.csv_download_data,
+           file_name=file_name,
+           mime='text/csv',
+           on_click="ignore",
+        )
+
+
+@st.fragment
+def muestra_auditoria_declarada():
+    """Pestaña de auditoría con datos declarados, como fragmento independiente del resto de la página."""
+    st.write(
+        "Recalcula peso aforado, peso facturable y tarifa con las medidas que declara el proveedor "
+        "y marca las invoices cuyos datos no son consistentes con lo facturado. No consulta APIs externas."
+    )
+    periodo_auditoria = st.number_input(
+        "Periodo (AAAAMM)", min_value=0, step=1, format="%d",
+        value=int(st.session_state.periodo or 0),
+    )
+    if st.button("Auditar periodo"):
+        with st.spinner("Auditando..."):
+            try:
+                st.session_state.auditoria = audita_periodo(int(periodo_auditoria), version_tarifario())
+            except Exception as e:
+                st.error(f"No se pudo auditar el periodo: {e}")
+                st.session_state.auditoria = None
+
+    auditoria = st.session_state.auditoria
+    if auditoria is not None:
+        resumen = auditoria_declarada.resumen_auditoria(auditoria)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Invoices", f"{resumen['filas']:,}")
+        col2.metric("Inconsistentes", f"{resumen['inconsistentes']:,}")
+        col3.metric("Facturado de más", f"{resumen['facturado_de_mas']:,.2f}")
+        col4.metric("Facturado de menos", f"{resumen['facturado_de_menos']:,.2f}")
+        if resumen['divisor_aforado_declarado'] is not None:
+            st.caption(
+                f"El proveedor calcula el peso aforado con un divisor de "
+                f"{resumen['divisor_aforado_declarado']:,.0f} (el análisis usa {auditoria_declarada.DIVISOR_AFORADO})."
+            )
+        st.dataframe(pd.DataFrame(
+            [{'motivo': descripcion, 'invoices': resumen[nombre]}
+             for nombre, descripcion in auditoria_declarada.MOTIVOS.items()]
+        ), hide_index=True)
+
+        inconsistentes = auditoria[auditoria['inconsistente']]
+        muestra_paginado(inconsistentes[[
+            'track_code', 'name', 'peso_aforado', 'peso_aforado_calculado', 'peso_facturable',
+            'peso_facturable_calculado', 'tarifa', 'tarifa_esperada', 'diferencia', 'motivo',
+        ]], clave="pagina_auditoria")
+        st.download_button(
+            label="📥 Descargar inconsistentes (CSV)",
+            data=convert_df_to_csv(inconsistentes),
+            file_name=f"auditoria_declarada_{periodo_auditoria}.csv",
+            mime='text/csv',
+            on_click="ignore",
+        )
+
+
+tab_llm, tab_declarados = st.tabs(["🔎 Análisis con Tavily + Gemini", "📐 Auditoría de datos declarados"])
+
+with tab_llm:
+    if st.session_state.trabajo_id is not None:
+        muestra_progreso()
+
+    # --- NUEVA SECCIÓN: Mostrar los resultados del análisis ---
+    # Esto se mostrará solo si el dataframe existe en el estado de sesión
+    if st.session_state.df_results is not None:
+        muestra_resultados()
+    elif st.session_state.trabajo_id is None:
+        st.info("Carga los archivos en la barra lateral y ejecuta el análisis para ver los resultados aquí.")
+
+# --- AUDITORÍA CON LOS DATOS DECLARADOS (sin Tavily ni Gemini) ---
+with tab_declarados:
+    muestra_auditoria_declarada()
+
+# --- MÉTRICAS DE LA ÚLTIMA CORRIDA ---
+@st.fragment
+def muestra_metricas(registro: Metricas):
+    """Panel de métricas; como fragmento, abrirlo o descargar no rerenderiza las tablas de resultados."""
+    with st.expander("📈 Métricas de la última corrida"):
+        df_etapas = pd.DataFrame(registro.resumen_etapas()).set_index('etapa').sort_values('total_s', ascending=False)
+        st.dataframe(pd.DataFrame({
+            'ejecuciones': df_etapas['ejecuciones'],
+            'p50 (ms)': (df_etapas['p50_s'] * 1000).round(1),
+            'p95 (ms)': (df_etapas['p95_s'] * 1000).round(1),
+            'total (s)': df_etapas['total_s'].round(2),
+        }))
+        contadores = registro.contadores()
+        if contadores:
+            st.dataframe(pd.DataFrame([{
+                'contador': c['nombre'],
+                'etiquetas': ", ".join(f"{k}={v}" for k, v in c['etiquetas'].items()),
+                'valor': c['valor'],
+            } for c in contadores]), hide_index=True)
+        col1, col2 = st.columns(2)
+        col1.download_button("Descargar (Prometheus)", registro.exporta_prometheus(),
+                             file_name="metricas.prom", mime="text/plain", on_click="ignore")
+        col2.download_button("Descargar (OTLP JSON)", json.dumps(registro.exporta_otlp(), ensure_ascii=False),
+                             file_name="metricas.json", mime="application/json", on_click="ignore")
+
+
+if st.session_state.metricas is not None and st.session_state.metricas.resumen_etapas():
+    muestra_metricas(st.session_state.metricas)
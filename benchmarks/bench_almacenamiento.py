@@ -0,0 +1,120 @@
+"""
+Benchmark y chequeo de las subidas a Cloud Storage, contra un GCS falso local.
+
+Con servidores_falsos.ServidorGcsFalso como STORAGE_EMULATOR_HOST verifica
+los tres caminos de servicios/almacenamiento.py:
+- subida en paralelo: la factura y el CSV con sube_archivos tardan menos que
+  de a uno con upload_to_gcs;
+- archivos repetidos: volver a subirlos no manda contenido (mismo MD5/CRC32C)
+  y suma 'subidas_omitidas';
+- subida reanudable: un archivo de más de GCS_UMBRAL_REANUDABLE se sube en
+  partes de GCS_PARTE_MB y llega entero.
+
+Termina con código 1 si algún chequeo falla.
+
+Ejecutar desde la raíz del proyecto:
+    python -m benchmarks.bench_almacenamiento
+"""
+import io
+import os
+import sys
+import math
+import time
+import argparse
+from benchmarks.servidores_falsos import ServidorGcsFalso
+
+ARCHIVOS = {
+    "facturas/factura_correcta.pdf": os.path.join("files", "factura_correcta.pdf"),
+    "reportes/Invoices_202507-10.csv": os.path.join("files", "Invoices_202507-10.csv"),
+}
+
+
+def _lee(archivos: dict[str, str]) -> dict[str, io.BytesIO]:
+    contenidos = {}
+    for destino, ruta in archivos.items():
+        with open(ruta, "rb") as archivo:
+            contenidos[destino] = io.BytesIO(archivo.read())
+    return contenidos
+
+
+def _subidas(servidor: ServidorGcsFalso) -> int:
+    """Pedidos que mandan contenido (no cuenta las consultas de metadatos)."""
+    return sum(servidor.pedidos[tipo] for tipo in ("multipart", "reanudable", "parte"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latencia-ms", type=float, default=200, help="Latencia del GCS falso.")
+    parser.add_argument("--mb-reanudable", type=float, default=3,
+                        help="Tamaño del archivo que se sube con la subida reanudable.")
+    args = parser.parse_args()
+
+    fallas = []
+
+    def chequea(condicion: bool, descripcion: str):
+        print(f"  {'✅' if condicion else '❌'} {descripcion}")
+        if not condicion:
+            fallas.append(descripcion)
+
+    with ServidorGcsFalso(latencia_ms=args.latencia_ms) as servidor:
+        # El cliente es uno solo por proceso: se lo crea apuntando al servidor falso, antes de medir.
+        os.environ["STORAGE_EMULATOR_HOST"] = servidor.url
+        from servicios import almacenamiento
+        from servicios.metricas import corrida
+        almacenamiento.obtener_cliente()
+
+        print("== Subida en paralelo")
+        archivos = _lee(ARCHIVOS)
+        inicio = time.perf_counter()
+        for destino, file_object in archivos.items():
+            almacenamiento.upload_to_gcs("secuencial", file_object, destino)
+        secuencial = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        futuros = almacenamiento.sube_archivos("paralelo", archivos)
+        subidos = {destino: futuro.result() for destino, futuro in futuros.items()}
+        paralelo = time.perf_counter() - inicio
+        print(f"  De a uno: {secuencial:.2f} s, en paralelo: {paralelo:.2f} s")
+        chequea(all(subidos.values()), "todas las subidas en paralelo terminan bien")
+        chequea(paralelo < secuencial * 0.75, "en paralelo tarda menos que de a uno")
+        chequea(all(servidor.objetos.get(("paralelo", destino)) == file_object.getvalue()
+                    for destino, file_object in archivos.items()), "el contenido subido es el original")
+
+        print("\n== Archivos repetidos")
+        antes = _subidas(servidor)
+        with corrida() as registro:
+            futuros = almacenamiento.sube_archivos("paralelo", archivos)
+            repetidos = {destino: futuro.result() for destino, futuro in futuros.items()}
+        omitidas = sum(c['valor'] for c in registro.contadores() if c['nombre'] == "subidas_omitidas")
+        chequea(all(repetidos.values()), "las subidas repetidas se dan por buenas")
+        chequea(_subidas(servidor) == antes, "no se vuelve a mandar contenido")
+        chequea(omitidas == len(archivos), f"se cuentan {len(archivos)} subidas omitidas (hubo {omitidas:g})")
+
+        print("\n== Subida reanudable")
+        os.environ["GCS_UMBRAL_REANUDABLE"] = str(1024 * 1024)
+        os.environ["GCS_PARTE_MB"] = "0.5"
+        tamano = int(args.mb_reanudable * 1024 * 1024) + 123
+        grande = io.BytesIO(os.urandom(tamano))
+        antes = servidor.pedidos.copy()
+        inicio = time.perf_counter()
+        resultado = almacenamiento.upload_to_gcs("paralelo", grande, "reportes/grande.csv")
+        print(f"  {tamano / 1024 / 1024:.1f} MB en {time.perf_counter() - inicio:.2f} s")
+        partes = servidor.pedidos["parte"] - antes["parte"]
+        esperadas = math.ceil(tamano / (512 * 1024))
+        chequea(resultado, "la subida reanudable termina bien")
+        chequea(servidor.pedidos["reanudable"] - antes["reanudable"] == 1
+                and servidor.pedidos["multipart"] == antes["multipart"], "usa una sesión reanudable, no multipart")
+        chequea(partes == esperadas, f"sube {esperadas} partes de 0,5 MB (subió {partes})")
+        chequea(servidor.objetos.get(("paralelo", "reportes/grande.csv")) == grande.getvalue(),
+                "el archivo llega entero")
+
+        almacenamiento.cerrar_cliente()
+        print(f"\nGCS falso: pedidos {dict(servidor.pedidos)}")
+
+    if fallas:
+        print(f"❌ Fallaron {len(fallas)} chequeos: {'; '.join(fallas)}")
+        sys.exit(1)
+    print("✅ Subidas a Cloud Storage verificadas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark y chequeo de carga_csv.carga_invoices por sus dos caminos.
+
+Carga cada CSV de ejemplo en una base SQLite temporal desde la ruta (lectura
+por bloques) y desde el ReporteCsv de extrae_csv.lee_csv_invoices (el que usa
+la app), mide cada camino y verifica que los dos insertan exactamente las
+mismas filas en 'invoices'. Termina con código 1 si alguna difiere.
+
+Ejecutar desde la raíz del proyecto:
+    python -m benchmarks.bench_carga_csv
+"""
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import pandas as pd
+import sqlalchemy
+from servicios import extrae_csv, carga_csv
+from servicios.db import conexion, esquema
+
+CSV_MUESTRAS = (
+    os.path.join("files", "Invoices_202507-10.csv"),
+    os.path.join("files", "Invoices_202511.csv"),
+    os.path.join("files", "test.csv"),
+)
+
+
+def carga(engine, ruta: str, desde_reporte: bool) -> tuple[pd.DataFrame, float]:
+    """Carga el CSV en una tabla vacía y devuelve lo insertado (sin el id) y los segundos."""
+    with engine.connect() as db_conn:
+        # Sin el registro de 'cargas_csv', la segunda carga del mismo archivo no se omite.
+        carga_csv.cargas_csv_table.create(db_conn, checkfirst=True)
+        db_conn.execute(carga_csv.cargas_csv_table.delete())
+        db_conn.execute(esquema.invoices_table.delete())
+        db_conn.commit()
+
+    inicio = time.perf_counter()
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        carga_csv.carga_invoices(extrae_csv.lee_csv_invoices(ruta) if desde_reporte else ruta)
+    segundos = time.perf_counter() - inicio
+
+    columnas = [c for c in esquema.invoices_table.c if c.name != "id"]
+    with engine.connect() as db_conn:
+        filas = db_conn.execute(sqlalchemy.select(*columnas).order_by(esquema.invoices_table.c.id)).fetchall()
+    return pd.DataFrame(filas, columns=[c.name for c in columnas]), segundos
+
+
+def main():
+    diferentes = []
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = conexion.crea_engine_local(f"sqlite:///{os.path.join(directorio, 'carga.sqlite')}")
+        conexion.usar_engine(engine)
+
+        print(f"{'archivo':<34} {'filas':>7} {'ruta s':>8} {'reporte s':>10}  iguales")
+        for ruta in CSV_MUESTRAS:
+            desde_ruta, segundos_ruta = carga(engine, ruta, desde_reporte=False)
+            desde_reporte, segundos_reporte = carga(engine, ruta, desde_reporte=True)
+            iguales = len(desde_ruta) > 0 and desde_ruta.equals(desde_reporte)
+            if not iguales:
+                diferentes.append(ruta)
+            print(f"{ruta:<34} {len(desde_ruta):>7,} {segundos_ruta:>8.3f} {segundos_reporte:>10.3f}  "
+                  f"{'✅' if iguales else '❌'}")
+        conexion.cerrar_conexiones()
+
+    if diferentes:
+        print(f"❌ Los dos caminos insertan filas distintas para: {', '.join(diferentes)}")
+        sys.exit(1)
+    print("✅ Desde la ruta y desde el ReporteCsv se insertan las mismas filas.")
+
+
+if __name__ == "__main__":
+    main()
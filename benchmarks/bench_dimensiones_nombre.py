@@ -0,0 +1,96 @@
+"""
+Benchmark y chequeo de dimensiones_nombre.dimensiones_desde_nombre sobre los
+CSV de ejemplo.
+
+Informa, por archivo, cuántos nombres se resuelven sin red y a qué velocidad,
+y verifica:
+- que en files/Invoices_202507-10.csv se resuelve al menos un nombre y cada
+  nombre resuelto da los valores esperados (ESPERADOS_MUESTRA);
+- los casos de CASOS, incluidos los que no deben resolverse (modelos como
+  "5G", rangos, capacidades, medidas sin unidad o de dos lados).
+
+Un nombre resuelto que no figura en ESPERADOS_MUESTRA también es una falla:
+hay que revisarlo a mano y agregarlo. Termina con código 1 si algo falla.
+
+Ejecutar desde la raíz del proyecto:
+    python -m benchmarks.bench_dimensiones_nombre
+"""
+import os
+import sys
+import time
+import pandas as pd
+from servicios.dimensiones_nombre import dimensiones_desde_nombre
+
+CSV_MUESTRAS = (
+    os.path.join("files", "Invoices_202507-10.csv"),
+    os.path.join("files", "Invoices_202511.csv"),
+)
+MUESTRA_CON_ACIERTOS = CSV_MUESTRAS[0]
+
+# Nombres de la muestra que se resuelven, con (alto, ancho, largo, peso) en cm y kg, revisados a mano.
+ESPERADOS_MUESTRA = {
+    "Pick End Now - Brass Statue/Idol of Goddess Durga Ma,(Lxbxh - 4 X 2 X 5.25) inches Weight - 0.9 Kg":
+        (13.34, 5.08, 10.16, 0.9),
+}
+
+# Nombre -> (alto, ancho, largo, peso) esperado, o None si no debe resolverse.
+CASOS = {
+    "Box 30 x 20 x 10 cm 500g": (10.0, 20.0, 30.0, 0.5),
+    "Storage Box 40x30x20 cm, 1.2 kg": (20.0, 30.0, 40.0, 1.2),
+    "Gig Bag Heavy Padded (42X19X8) Inches 2.5 kg": (20.32, 48.26, 106.68, 2.5),
+    "Alarm Clock (Small_140X114X74 Mm, 250 gm)": (7.4, 11.4, 14.0, 0.25),
+    "Honda Activa 5G Seat Cover 30 x 20 x 10 cm": None,
+    "Activa 6g scooty cover 120 x 60 x 40 cm": None,
+    "Activa 3G/4G cover 120 x 60 x 40 cm 800g": (40.0, 60.0, 120.0, 0.8),
+    "Puri Dabba 22G steel 20 x 20 x 5 cm": None,
+    "Tin Box 15g/ml (39 mm x 20 mm x 10 mm)": None,
+    "Car Sticker Decals L X H 35 X 10 Cms 50 gm": None,
+    "Cycle Stand for 66-75 KG riders 40 x 10 x 10 cm": None,
+    "Luggage Scale up to 50 kg 15 x 5 x 3 cm": None,
+    "Stool 45 x 30 x 30 cm 500": None,
+    "Wall Shelf (61 x 37.6 x 4) 1.5 kg": None,
+    "Candles 4 X 60g each 10 x 10 x 8 cm": None,
+}
+
+
+def _valores(dimensiones) -> tuple | None:
+    if dimensiones is None:
+        return None
+    return (dimensiones.alto, dimensiones.ancho, dimensiones.largo, dimensiones.peso)
+
+
+def main():
+    fallas = []
+
+    def chequea(condicion: bool, descripcion: str):
+        print(f"  {'✅' if condicion else '❌'} {descripcion}")
+        if not condicion:
+            fallas.append(descripcion)
+
+    print("== Muestras")
+    for ruta in CSV_MUESTRAS:
+        nombres = pd.read_csv(ruta, usecols=['name'], encoding='latin-1')['name'].dropna().astype(str)
+        inicio = time.perf_counter()
+        resueltos = {nombre: _valores(dimensiones_desde_nombre(nombre)) for nombre in nombres}
+        segundos = time.perf_counter() - inicio
+        aciertos = {nombre: valores for nombre, valores in resueltos.items() if valores is not None}
+        print(f"  {ruta}: {len(aciertos)} de {len(resueltos)} nombres distintos resueltos "
+              f"({len(aciertos) / max(len(resueltos), 1):.2%}), {len(nombres) / segundos:,.0f} nombres/s")
+        if ruta == MUESTRA_CON_ACIERTOS:
+            chequea(len(aciertos) > 0, f"{ruta} resuelve al menos un nombre")
+        for nombre, valores in aciertos.items():
+            chequea(ESPERADOS_MUESTRA.get(nombre) == valores, f"{nombre[:70]} -> {valores}")
+
+    print("\n== Casos")
+    for nombre, esperado in CASOS.items():
+        obtenido = _valores(dimensiones_desde_nombre(nombre))
+        chequea(obtenido == esperado, f"{nombre} -> {obtenido}" + ("" if obtenido == esperado else f" (se esperaba {esperado})"))
+
+    if fallas:
+        print(f"❌ Fallaron {len(fallas)} chequeos.")
+        sys.exit(1)
+    print("✅ Dimensiones desde el nombre verificadas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark de extrae_pdf.extraer_total_de_factura.
+
+Compara el camino completo (pdfplumber, rapido=False), el camino rápido
+(pdfium, rapido=True) y una segunda lectura del mismo PDF (caché por hash),
+sobre files/factura_correcta.pdf y sobre facturas generadas de varias páginas.
+
+Ejecutar desde la raíz del proyecto:
+    python -m benchmarks.bench_extrae_pdf
+"""
+import os
+import time
+import tempfile
+from servicios import extrae_pdf
+
+PDF_REAL = os.path.join("files", "factura_correcta.pdf")
+PAGINAS_GENERADAS = (1, 10, 50)
+LINEAS_POR_PAGINA = 45
+REPETICIONES = 5
+
+
+def _escapa(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def genera_factura_pdf(ruta: str, paginas: int, total: str = "1.234.567,89"):
+    """Escribe un PDF mínimo (Helvetica) con líneas de detalle y el total al pie de la última página."""
+    objetos = []
+    contenidos = []
+    for numero in range(paginas):
+        lineas = [
+            f"BFX{numero:04d}{i:06d}X  Producto de prueba {i}  ambito 2  24hs  $ 5.600,00"
+            for i in range(LINEAS_POR_PAGINA)
+        ]
+        if numero == paginas - 1:
+            lineas += ["Subtotal: $ 1.020.304,04", "IVA: $ 214.263,85", f"TOTAL: $ {total}"]
+        flujo = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_escapa(l)}) '" for l in lineas) + " ET"
+        contenidos.append(flujo.encode("latin-1"))
+
+    # 1: catálogo, 2: páginas, 3: fuente, luego pares (página, contenido)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(paginas))
+    objetos.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objetos.append(f"<< /Type /Pages /Kids [{kids}] /Count {paginas} >>".encode())
+    objetos.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i, flujo in enumerate(contenidos):
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objetos.append(f"<< /Length {len(flujo)} >>\nstream\n".encode() + flujo + b"\nendstream")
+
+    salida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for numero, objeto in enumerate(objetos, 1):
+        offsets.append(len(salida))
+        salida += f"{numero} 0 obj\n".encode() + objeto + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    salida += b"".join(f"{o:010d} 00000 n \n".encode() for o in offsets)
+    salida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+    with open(ruta, "wb") as archivo:
+        archivo.write(salida)
+
+
+def _mide(funcion, repeticiones: int = REPETICIONES) -> tuple[float, object]:
+    """Devuelve la mediana en milisegundos y el último resultado."""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return sorted(tiempos)[len(tiempos) // 2], resultado
+
+
+def compara(nombre: str, ruta: str):
+    def sin_cache(rapido):
+        extrae_pdf._cache_totales.clear()
+        return extrae_pdf.extraer_total_de_factura(ruta, rapido=rapido)
+
+    t_completo, total_completo = _mide(lambda: sin_cache(False))
+    t_rapido, total_rapido = _mide(lambda: sin_cache(True))
+    extrae_pdf.extraer_total_de_factura(ruta)
+    t_cache, _ = _mide(lambda: extrae_pdf.extraer_total_de_factura(ruta))
+
+    coincide = "✅" if total_completo == total_rapido else "❌"
+    print(f"{nombre:<28} {t_completo:>10.1f} {t_rapido:>10.1f} {t_cache:>10.2f} "
+          f"{t_completo / t_rapido:>8.1f}x  {total_rapido} {coincide}")
+
+
+def main():
+    print(f"{'PDF':<28} {'completo':>10} {'rápido':>10} {'caché':>10} {'mejora':>9}  total")
+    print(f"{'':<28} {'(ms)':>10} {'(ms)':>10} {'(ms)':>10}")
+    if os.path.exists(PDF_REAL):
+        compara(os.path.basename(PDF_REAL), PDF_REAL)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for paginas in PAGINAS_GENERADAS:
+            ruta = os.path.join(directorio, f"factura_{paginas}p.pdf")
+            genera_factura_pdf(ruta, paginas)
+            compara(f"generada {paginas} páginas", ruta)
+
+
+if __name__ == "__main__":
+    main()
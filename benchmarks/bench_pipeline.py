@@ -0,0 +1,210 @@
+"""
+Benchmark de punta a punta del flujo de auditoría, sin Cloud SQL, Tavily ni Gemini.
+
+Corre extrae_pdf, extrae_csv, carga_invoices, realiza_busqueda_llm e
+insert_scales_data contra:
+- una base SQLite local (con el tarifario de files/Tarifario_2025H2.csv),
+- un servidor local que imita a Tavily y a Gemini (ver servidores_falsos.py).
+
+Los escenarios son files/Invoices_202507-10.csv (se analiza su primer periodo)
+y un CSV sintético de N filas armado con productos de esa muestra.
+
+Reporta, por etapa, segundos, filas por segundo y pico de memoria (RSS) del
+proceso. Con --guardar-baseline guarda los números, y en las corridas
+siguientes los compara y marca las etapas que empeoraron más que la tolerancia.
+
+Ejecutar desde la raíz del proyecto:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --filas-sinteticas 100000 --guardar-baseline
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+
+# El benchmark mide el flujo, no la cuota: sin límite de rpm y con backoff corto.
+os.environ.setdefault("TAVILY_RPM", "0")
+os.environ.setdefault("GEMINI_RPM", "0")
+os.environ.setdefault("LLM_BACKOFF_BASE", "0.05")
+os.environ.setdefault("LLM_MAX_REINTENTOS", "8")
+
+from servicios import extrae_pdf, extrae_csv, carga_csv
+from servicios.busquedallm import realiza_busqueda_llm
+from servicios.cache_dimensiones import CacheDimensiones
+from servicios.clientes_proveedores import ClientesProveedores, ClienteTavily, ClienteGemini
+from servicios.db import conexion, esquema
+from servicios.db.database_operations import insert_scales_data
+from benchmarks.servidores_falsos import ServidorFalso
+
+PDF = os.path.join("files", "factura_correcta.pdf")
+CSV_MUESTRA = os.path.join("files", "Invoices_202507-10.csv")
+CSV_TARIFARIO = os.path.join("files", "Tarifario_2025H2.csv")
+BASELINE_DEFAULT = os.path.join("benchmarks", "baselines", "pipeline.json")
+# Periodo de las filas sintéticas: vigente en el tarifario y distinto de los de la muestra.
+PERIODO_SINTETICO = 202512
+# Por debajo de esta diferencia (segundos) no se considera regresión: es ruido.
+RUIDO_SEGUNDOS = 0.05
+
+
+def pico_rss_mb() -> float:
+    """Pico de memoria residente del proceso hasta ahora (Linux informa KB, macOS bytes)."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 / 1024 if sys.platform == "darwin" else pico / 1024
+
+
+def prepara_base(directorio: str):
+    """Crea la base SQLite local con el esquema y el tarifario, y la deja como engine compartido."""
+    engine = conexion.crea_engine_local(f"sqlite:///{os.path.join(directorio, 'bench.sqlite')}")
+    conexion.usar_engine(engine)
+
+    tarifas = pd.read_csv(CSV_TARIFARIO, encoding="utf-8-sig")
+    tarifas.columns = [c.lower().replace(" ", "_").replace("á", "a") for c in tarifas.columns]
+    for columna in ("fecha_inicio", "fecha_fin"):
+        tarifas[columna] = pd.to_datetime(tarifas[columna]).dt.date
+    with engine.connect() as db_conn:
+        db_conn.execute(esquema.tarifario_table.insert(), tarifas.to_dict(orient="records"))
+        db_conn.commit()
+
+
+def genera_csv_sintetico(ruta: str, filas: int, semilla: int = 0):
+    """Escribe un CSV de `filas` envíos tomados al azar de la muestra, con track_code único."""
+    muestra = extrae_csv.lee_csv_invoices(CSV_MUESTRA).df
+    rng = np.random.default_rng(semilla)
+    df = muestra.iloc[rng.integers(0, len(muestra), filas)].reset_index(drop=True)
+    df["periodo"] = PERIODO_SINTETICO
+    df["track_code"] = [f"SYN{i:010d}X" for i in range(filas)]
+    df.to_csv(ruta, index=False)
+
+
+class Medidor:
+    """Mide cada etapa de un escenario: segundos, filas, filas/s y pico de RSS."""
+
+    def __init__(self, verboso: bool):
+        self.verboso = verboso
+        self.etapas = {}
+
+    @contextlib.contextmanager
+    def etapa(self, nombre: str):
+        registro = {"filas": 0}
+        with contextlib.ExitStack() as pila:
+            if not self.verboso:
+                pila.enter_context(contextlib.redirect_stdout(pila.enter_context(open(os.devnull, "w"))))
+            inicio = time.perf_counter()
+            yield registro
+            segundos = time.perf_counter() - inicio
+        self.etapas[nombre] = {
+            "segundos": round(segundos, 4),
+            "filas": registro["filas"],
+            "filas_por_segundo": round(registro["filas"] / segundos, 1) if segundos > 0 else None,
+            "pico_rss_mb": round(pico_rss_mb(), 1),
+        }
+
+
+def corre_escenario(nombre: str, ruta_csv: str, clientes: ClientesProveedores, directorio: str,
+                    workers: int, lote: int, verboso: bool) -> dict:
+    medidor = Medidor(verboso)
+
+    with medidor.etapa("extrae_pdf") as r:
+        extrae_pdf._cache_totales.clear()
+        extrae_pdf.extraer_total_de_factura(PDF)
+        r["filas"] = 1
+    with medidor.etapa("extrae_csv") as r:
+        reporte = extrae_csv.lee_csv_invoices(ruta_csv)
+        r["filas"] = len(reporte.df)
+    with medidor.etapa("carga_invoices") as r:
+        r["filas"] = carga_csv.carga_invoices(reporte)
+    with medidor.etapa("realiza_busqueda_llm") as r:
+        cache = CacheDimensiones(os.path.join(directorio, f"cache_{nombre}.sqlite"))
+        resultado = realiza_busqueda_llm(reporte.periodo, max_workers=workers, tamano_lote=lote,
+                                         cache=cache, clientes=clientes)
+        cache.cerrar()
+        r["filas"] = int((reporte.df["periodo"] == reporte.periodo).sum())
+    with medidor.etapa("insert_scales_data") as r:
+        if not resultado.empty:
+            insert_scales_data(resultado)
+        r["filas"] = len(resultado)
+
+    return medidor.etapas
+
+
+def imprime(nombre: str, etapas: dict, base: dict | None, tolerancia: float) -> list[str]:
+    """Imprime la tabla del escenario y devuelve las etapas que empeoraron respecto de la baseline."""
+    regresiones = []
+    print(f"\n== {nombre}")
+    print(f"{'etapa':<22} {'segundos':>10} {'filas':>9} {'filas/s':>11} {'RSS MB':>8}  vs. baseline")
+    for etapa, datos in etapas.items():
+        comparacion = ""
+        anterior = (base or {}).get(etapa)
+        if anterior:
+            cambio = datos["segundos"] / anterior["segundos"] - 1 if anterior["segundos"] else 0.0
+            comparacion = f"{cambio:+.0%}"
+            if cambio > tolerancia and datos["segundos"] - anterior["segundos"] > RUIDO_SEGUNDOS:
+                comparacion += "  ❌ regresión"
+                regresiones.append(f"{nombre}/{etapa}")
+        filas_s = f"{datos['filas_por_segundo']:,.0f}" if datos["filas_por_segundo"] is not None else "-"
+        print(f"{etapa:<22} {datos['segundos']:>10.3f} {datos['filas']:>9,} {filas_s:>11} "
+              f"{datos['pico_rss_mb']:>8.1f}  {comparacion}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas-sinteticas", type=int, default=100_000,
+                        help="Filas del CSV sintético (0 para omitirlo).")
+    parser.add_argument("--latencia-ms", type=float, default=20, help="Latencia de Tavily/Gemini falsos.")
+    parser.add_argument("--tasa-errores", type=float, default=0.01, help="Probabilidad de 429 por pedido.")
+    parser.add_argument("--workers", type=int, default=16, help="Productos consultados en paralelo.")
+    parser.add_argument("--lote", type=int, default=1, help="Productos por pedido a Gemini.")
+    parser.add_argument("--baseline", default=BASELINE_DEFAULT, help="Archivo JSON de la baseline.")
+    parser.add_argument("--guardar-baseline", action="store_true", help="Guarda esta corrida como baseline.")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="Empeoramiento relativo a partir del cual una etapa es regresión.")
+    parser.add_argument("--verboso", action="store_true", help="Muestra la salida de cada etapa.")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.guardar_baseline:
+        with open(args.baseline, encoding="utf-8") as archivo:
+            baseline = json.load(archivo)
+
+    resultados = {}
+    regresiones = []
+    with tempfile.TemporaryDirectory() as directorio, \
+            ServidorFalso(latencia_ms=args.latencia_ms, tasa_errores=args.tasa_errores) as servidor:
+        prepara_base(directorio)
+        clientes = ClientesProveedores(
+            tavily=ClienteTavily("clave-falsa", url=servidor.url),
+            gemini=ClienteGemini("clave-falsa", endpoint=servidor.url),
+        )
+        escenarios = {"muestra": CSV_MUESTRA}
+        if args.filas_sinteticas > 0:
+            ruta = os.path.join(directorio, f"sintetico_{args.filas_sinteticas}.csv")
+            genera_csv_sintetico(ruta, args.filas_sinteticas)
+            escenarios[f"sintetico_{args.filas_sinteticas}"] = ruta
+
+        for nombre, ruta in escenarios.items():
+            resultados[nombre] = corre_escenario(nombre, ruta, clientes, directorio,
+                                                 args.workers, args.lote, args.verboso)
+            regresiones += imprime(nombre, resultados[nombre], baseline.get(nombre), args.tolerancia)
+
+        print(f"\nServidor falso: pedidos {dict(servidor.pedidos)}, 429 simulados {dict(servidor.errores)}")
+        conexion.cerrar_conexiones()
+
+    if args.guardar_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, indent=2)
+        print(f"💾 Baseline guardada en {args.baseline}")
+    elif regresiones:
+        print(f"❌ Regresiones respecto de la baseline: {', '.join(regresiones)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Servidores HTTP locales que imitan las APIs de Tavily, de Gemini y de Cloud
+Storage para los benchmarks.
+
+`ServidorFalso` responde POST /search (Tavily) y POST
+/v1beta/models/<modelo>:generateContent (Gemini, transporte REST) con una
+latencia y una tasa de errores 429 configurables. Las dimensiones que
+"extrae" Gemini se derivan del hash del nombre del producto, así un mismo
+producto siempre recibe las mismas medidas.
+
+`ServidorGcsFalso` implementa la parte de la API JSON de Cloud Storage que
+usa el cliente al subir: los metadatos de un objeto, la subida multipart y la
+subida reanudable en partes.
+"""
+import re
+import json
+import time
+import uuid
+import base64
+import random
+import hashlib
+import threading
+from collections import Counter
+from urllib.parse import urlparse, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import google_crc32c
+
+_patron_lote = re.compile(r'Producto invoice_id=(\S+): "(.*?)"\n')
+_patron_producto = re.compile(r'para el producto "(.*?)"', re.DOTALL)
+
+
+def dimensiones_falsas(nombre: str) -> dict:
+    """Medidas plausibles y deterministas para un nombre de producto."""
+    semilla = int(hashlib.md5(nombre.encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(semilla)
+    return {
+        "alto": round(rng.uniform(2, 60), 1),
+        "ancho": round(rng.uniform(5, 60), 1),
+        "largo": round(rng.uniform(5, 90), 1),
+        "peso": round(rng.uniform(0.1, 15), 2),
+        "fuente": "servidor falso",
+    }
+
+
+class ServidorFalso:
+    """
+    Tavily y Gemini falsos sobre un ThreadingHTTPServer en 127.0.0.1.
+
+    Args:
+        latencia_ms: Demora de cada respuesta, en milisegundos.
+        tasa_errores: Probabilidad (0 a 1) de responder 429 a un pedido.
+        semilla: Semilla de los errores, para que dos corridas sean comparables.
+    """
+
+    def __init__(self, latencia_ms: float = 20, tasa_errores: float = 0.0, semilla: int = 0):
+        self.latencia = latencia_ms / 1000
+        self.tasa_errores = tasa_errores
+        self.pedidos = Counter()
+        self.errores = Counter()
+        self._rng = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._servidor.server_port}"
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _falla(self, api: str) -> bool:
+        with self._lock:
+            self.pedidos[api] += 1
+            if self._rng.random() < self.tasa_errores:
+                self.errores[api] += 1
+                return True
+        return False
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _responde(self, codigo: int, cuerpo: dict):
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_POST(self):
+                pedido = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                time.sleep(servidor.latencia)
+                if self.path.startswith("/search"):
+                    self._tavily(pedido)
+                elif ":generateContent" in self.path:
+                    self._gemini(pedido)
+                else:
+                    self._responde(404, {"error": "ruta desconocida"})
+
+            def _tavily(self, pedido: dict):
+                if servidor._falla("tavily"):
+                    self._responde(429, {"detail": {"error": "Rate limit exceeded"}})
+                    return
+                consulta = pedido.get("query", "")
+                self._responde(200, {"query": consulta, "results": [
+                    {"title": consulta[:80], "url": "https://ejemplo.local/producto",
+                     "content": f"Product dimensions and weight for {consulta}", "score": 0.9},
+                ]})
+
+            def _gemini(self, pedido: dict):
+                if servidor._falla("gemini"):
+                    self._responde(429, {"error": {"code": 429, "message": "Resource has been exhausted",
+                                                   "status": "RESOURCE_EXHAUSTED"}})
+                    return
+                prompt = pedido["contents"][0]["parts"][0]["text"]
+                lote = _patron_lote.findall(prompt)
+                if lote:
+                    respuesta = [{"invoice_id": invoice_id, **dimensiones_falsas(nombre)} for invoice_id, nombre in lote]
+                else:
+                    nombre = _patron_producto.search(prompt)
+                    respuesta = dimensiones_falsas(nombre.group(1) if nombre else prompt)
+                self._responde(200, {"candidates": [{
+                    "content": {"parts": [{"text": json.dumps(respuesta)}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }], "usageMetadata": {
+                    # Aproximación de ~4 caracteres por token, solo para las métricas.
+                    "promptTokenCount": len(prompt) // 4,
+                    "candidatesTokenCount": len(json.dumps(respuesta)) // 4,
+                }})
+
+        return Handler
+
+
+class ServidorGcsFalso:
+    """
+    Cloud Storage falso sobre un ThreadingHTTPServer en 127.0.0.1, para usar
+    con STORAGE_EMULATOR_HOST=<url>.
+
+    Guarda los objetos en memoria (`objetos`, por (bucket, nombre)) y cuenta
+    los pedidos por tipo en `pedidos`: 'metadatos', 'multipart', 'reanudable'
+    (inicio de sesión) y 'parte' (cada parte de una subida reanudable).
+
+    Args:
+        latencia_ms: Demora de cada respuesta, en milisegundos.
+    """
+
+    def __init__(self, latencia_ms: float = 20):
+        self.latencia = latencia_ms / 1000
+        self.objetos = {}
+        self.pedidos = Counter()
+        self._sesiones = {}
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._servidor.server_port}"
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _cuenta(self, tipo: str):
+        with self._lock:
+            self.pedidos[tipo] += 1
+
+    def _metadatos(self, bucket: str, nombre: str) -> dict:
+        datos = self.objetos[(bucket, nombre)]
+        return {
+            "kind": "storage#object",
+            "bucket": bucket,
+            "name": nombre,
+            "generation": "1",
+            "size": str(len(datos)),
+            "md5Hash": base64.b64encode(hashlib.md5(datos).digest()).decode("ascii"),
+            "crc32c": base64.b64encode(google_crc32c.Checksum(datos).digest()).decode("ascii"),
+        }
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _responde(self, codigo: int, cuerpo: dict, encabezados: dict | None = None):
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                for clave, valor in (encabezados or {}).items():
+                    self.send_header(clave, valor)
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _cuerpo(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_GET(self):
+                time.sleep(servidor.latencia)
+                servidor._cuenta("metadatos")
+                ruta = re.match(r"/storage/v1/b/([^/]+)/o/(.+)", urlparse(self.path).path)
+                clave = (ruta[1], unquote(ruta[2])) if ruta else None
+                if clave in servidor.objetos:
+                    self._responde(200, servidor._metadatos(*clave))
+                else:
+                    self._responde(404, {"error": {"code": 404, "message": "No such object"}})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                ruta = re.match(r"/upload/storage/v1/b/([^/]+)/o", url.path)
+                if not ruta:
+                    self._responde(404, {"error": {"code": 404, "message": "ruta desconocida"}})
+                    return
+                bucket = ruta[1]
+                parametros = parse_qs(url.query)
+                cuerpo = self._cuerpo()
+                time.sleep(servidor.latencia)
+                if parametros["uploadType"][0] == "multipart":
+                    servidor._cuenta("multipart")
+                    # multipart/related: primero los metadatos en JSON, después el contenido.
+                    limite = re.search(r'boundary="?([^";]+)', self.headers["Content-Type"])[1].encode()
+                    partes = [p for p in cuerpo.split(b"--" + limite) if p.strip(b"\r\n-")]
+                    metadatos = json.loads(partes[0].split(b"\r\n\r\n", 1)[1])
+                    servidor.objetos[(bucket, metadatos["name"])] = partes[1].split(b"\r\n\r\n", 1)[1][:-2]
+                    self._responde(200, servidor._metadatos(bucket, metadatos["name"]))
+                    return
+                servidor._cuenta("reanudable")
+                nombre = json.loads(cuerpo)["name"] if cuerpo else parametros["name"][0]
+                sesion = uuid.uuid4().hex
+                servidor._sesiones[sesion] = (bucket, nombre, bytearray())
+                self._responde(200, {}, {"Location": f"{servidor.url}/upload/sesion/{sesion}"})
+
+            def do_PUT(self):
+                bucket, nombre, recibido = servidor._sesiones[self.path.rsplit("/", 1)[1]]
+                recibido += self._cuerpo()
+                time.sleep(servidor.latencia)
+                servidor._cuenta("parte")
+                # Content-Range: bytes <desde>-<hasta>/<total>, con '*' mientras no se conoce el total.
+                total = self.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+                if total != "*" and len(recibido) == int(total):
+                    servidor.objetos[(bucket, nombre)] = bytes(recibido)
+                    self._responde(200, servidor._metadatos(bucket, nombre))
+                    return
+                self.send_response(308)
+                self.send_header("Range", f"bytes=0-{len(recibido) - 1}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        return Handler
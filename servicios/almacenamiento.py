@@ -0,0 +1,151 @@
+import os
+import base64
+import atexit
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO
+import google_crc32c
+from google.cloud import storage
+from servicios.metricas import metricas, en_contexto
+
+# Archivos de más de esto se suben en partes (subida reanudable), no en un único pedido.
+UMBRAL_REANUDABLE_DEFAULT = 8 * 1024 * 1024
+# Tamaño de cada parte de la subida reanudable: GCS exige múltiplos de 256 KiB.
+PARTE_REANUDABLE = 256 * 1024
+PARTE_MB_DEFAULT = 8
+# Subidas simultáneas (el PDF y el CSV de una carga van a la vez).
+MAX_WORKERS_DEFAULT = 4
+# Bloque de lectura al calcular los checksums.
+BLOQUE_LECTURA = 1024 * 1024
+
+_cliente = None
+_executor = None
+_lock = threading.Lock()
+
+
+def obtener_cliente() -> storage.Client:
+    """
+    Devuelve el cliente de Cloud Storage compartido por todo el proceso.
+
+    Se crea la primera vez que se lo pide. Si STORAGE_EMULATOR_HOST está
+    definida (por ejemplo, un fake-gcs-server local), el cliente apunta ahí
+    y no usa credenciales.
+    """
+    global _cliente
+    if _cliente is not None:
+        return _cliente
+
+    with _lock:
+        if _cliente is None:
+            if os.getenv('STORAGE_EMULATOR_HOST'):
+                from google.auth.credentials import AnonymousCredentials
+                _cliente = storage.Client(
+                    project=os.getenv('GOOGLE_CLOUD_PROJECT', 'local'),
+                    credentials=AnonymousCredentials(),
+                )
+            else:
+                _cliente = storage.Client()
+    return _cliente
+
+
+def _obtener_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('GCS_MAX_WORKERS', MAX_WORKERS_DEFAULT)),
+                thread_name_prefix="gcs",
+            )
+    return _executor
+
+
+def checksums(file_object: BinaryIO) -> tuple[str, str, int]:
+    """MD5 y CRC32C del archivo en base64 (como los informa GCS) y su tamaño en bytes."""
+    md5 = hashlib.md5()
+    crc32c = google_crc32c.Checksum()
+    tamano = 0
+    file_object.seek(0)
+    while bloque := file_object.read(BLOQUE_LECTURA):
+        md5.update(bloque)
+        crc32c.update(bloque)
+        tamano += len(bloque)
+    file_object.seek(0)
+    return (
+        base64.b64encode(md5.digest()).decode("ascii"),
+        base64.b64encode(crc32c.digest()).decode("ascii"),
+        tamano,
+    )
+
+
+def upload_to_gcs(bucket_name: str, file_object: BinaryIO, destination_blob_name: str) -> bool:
+    """
+    Sube un objeto de archivo en memoria a un bucket de GCS.
+
+    Si en el destino ya hay un blob con el mismo contenido (mismo MD5, o mismo
+    CRC32C en los objetos compuestos, que no tienen MD5) no se vuelve a subir.
+    Los archivos grandes se suben en partes con una subida reanudable.
+
+    Returns:
+        True si el archivo quedó en el bucket (subido u omitido por repetido), False si falló.
+    """
+    try:
+        with metricas.span("gcs"):
+            bucket = obtener_cliente().bucket(bucket_name)
+            md5, crc32c, tamano = checksums(file_object)
+
+            existente = bucket.get_blob(destination_blob_name)
+            if existente is not None and (existente.md5_hash == md5 if existente.md5_hash else existente.crc32c == crc32c):
+                metricas.suma("subidas_omitidas", proveedor="gcs")
+                print(f"Archivo {destination_blob_name} ya estaba en {bucket_name} con el mismo contenido: no se sube.")
+                return True
+
+            blob = bucket.blob(destination_blob_name)
+            size = tamano
+            if tamano > int(os.getenv('GCS_UMBRAL_REANUDABLE', UMBRAL_REANUDABLE_DEFAULT)):
+                partes = max(1, int(float(os.getenv('GCS_PARTE_MB', PARTE_MB_DEFAULT)) * 1024 * 1024) // PARTE_REANUDABLE)
+                blob.chunk_size = partes * PARTE_REANUDABLE
+                # Sin tamaño, el cliente sube de a `chunk_size` con una sesión reanudable.
+                size = None
+            # Volver al inicio del archivo antes de subirlo
+            file_object.seek(0)
+            blob.upload_from_file(file_object, size=size, checksum="crc32c")
+        metricas.suma("bytes_enviados", tamano, proveedor="gcs")
+        print(f"Archivo {destination_blob_name} subido exitosamente a {bucket_name}.")
+        return True
+    except Exception as e:
+        print(f"Error al subir a GCS: {e}")
+        return False
+
+
+def sube_archivos(bucket_name: str, archivos: dict[str, BinaryIO]) -> dict[str, Future]:
+    """
+    Sube los archivos en paralelo, en segundo plano.
+
+    Args:
+        bucket_name: El bucket de destino.
+        archivos: Nombre del blob de destino -> objeto de archivo.
+
+    Returns:
+        Nombre del blob -> Future con el resultado de `upload_to_gcs`.
+    """
+    executor = _obtener_executor()
+    return {
+        destino: executor.submit(en_contexto(upload_to_gcs), bucket_name, file_object, destino)
+        for destino, file_object in archivos.items()
+    }
+
+
+def cerrar_cliente():
+    """Espera las subidas pendientes y cierra el cliente. Se registra para ejecutarse al salir del proceso."""
+    global _cliente, _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+        if _cliente is not None:
+            _cliente.close()
+            _cliente = None
+
+
+atexit.register(cerrar_cliente)
@@ -0,0 +1,62 @@
+import io
+import os
+import contextlib
+from typing import BinaryIO, Iterator, Union
+
+# Lo que aceptan los servicios que leen la factura o el reporte: una ruta, el
+# contenido en memoria o un archivo binario abierto (por ejemplo, el
+# UploadedFile de Streamlit, que es un BytesIO).
+Origen = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+def es_ruta(origen: Origen) -> bool:
+    return isinstance(origen, (str, os.PathLike))
+
+
+def lee_contenido(origen: Origen) -> bytes | memoryview:
+    """
+    Devuelve el contenido completo del origen.
+
+    Si ya está en memoria no se copia: los bytes y memoryviews se devuelven tal
+    cual, y de un BytesIO se devuelve una vista de su buffer. Solo se lee del
+    disco cuando el origen es una ruta.
+
+    Raises:
+        FileNotFoundError: Si el origen es una ruta que no existe.
+    """
+    if es_ruta(origen):
+        with open(origen, 'rb') as archivo:
+            return archivo.read()
+    if isinstance(origen, (bytes, memoryview)):
+        return origen
+    if isinstance(origen, bytearray):
+        return memoryview(origen)
+    if isinstance(origen, io.BytesIO):
+        return origen.getbuffer()
+    origen.seek(0)
+    return origen.read()
+
+
+@contextlib.contextmanager
+def abre_binario(origen: Origen) -> Iterator[BinaryIO]:
+    """
+    Da un archivo binario posicionado al inicio para leer el origen.
+
+    Las rutas se abren y se cierran al salir; un archivo que ya estaba abierto
+    se usa tal cual y no se cierra, así quien lo pasó puede seguir usándolo.
+    """
+    if es_ruta(origen):
+        with open(origen, 'rb') as archivo:
+            yield archivo
+    elif isinstance(origen, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(origen)
+    else:
+        origen.seek(0)
+        yield origen
+
+
+def nombre(origen: Origen) -> str:
+    """Nombre del archivo de origen (el de la ruta o el atributo `name`), o '' si está solo en memoria."""
+    if es_ruta(origen):
+        return os.path.basename(os.fspath(origen))
+    return os.path.basename(str(getattr(origen, 'name', '') or ''))
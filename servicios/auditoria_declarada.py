@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+from servicios.indice_tarifas import TariffIndex
+from servicios.consulta_invoices import trae_invoices
+from servicios.consulta_tarificacion import trae_indice_tarifas
+from servicios.metricas import metricas
+
+# Columnas de 'invoices' que usa la auditoría de datos declarados.
+COLUMNAS_AUDITORIA = (
+    'id', 'proveedor', 'track_code', 'ambito', 'tipo_servicio', 'name',
+    'alto', 'ancho', 'largo', 'peso_aforado', 'peso_fisico', 'peso_facturable', 'tarifa',
+)
+# Diferencias menores a esto son redondeo (los valores se guardan con 2 decimales).
+TOLERANCIA_PESO = 0.01    # kg
+TOLERANCIA_TARIFA = 0.01  # moneda
+# Divisor del peso volumétrico (cm³ por kg) que usa el análisis.
+DIVISOR_AFORADO = 4000
+
+# Motivos por los que una invoice es inconsistente, en el orden en que se informan.
+MOTIVOS = {
+    'datos_faltantes': "Faltan medidas o peso declarados",
+    'aforado_inconsistente': "El peso aforado declarado no es alto × ancho × largo / 4000",
+    'facturable_inconsistente': "El peso facturable declarado no es el mayor entre físico y aforado",
+    'sin_tarifa': "No hay tarifa para el peso facturable declarado",
+    'tarifa_inconsistente': "La tarifa facturada no es la del tarifario para el peso declarado",
+}
+
+
+def _numerico(serie: pd.Series) -> np.ndarray:
+    return pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float)
+
+
+def audita_declarados(df: pd.DataFrame, tarifas: TariffIndex) -> pd.DataFrame:
+    """
+    Recalcula, con las medidas y el peso que declara el proveedor, los pesos y
+    la tarifa de cada invoice, sin consultar Tavily ni Gemini.
+
+    Aplica la misma lógica que el análisis con LLM (peso aforado = volumen / 4000,
+    peso facturable = el mayor entre físico y aforado, tarifa según el tarifario)
+    pero vectorizada sobre todas las filas a la vez.
+
+    Args:
+        df: Invoices con al menos las columnas de COLUMNAS_AUDITORIA.
+        tarifas: El TariffIndex del periodo.
+
+    Returns:
+        Las filas de `df` con 'peso_aforado_calculado', 'peso_facturable_calculado',
+        'tarifa_esperada', 'diferencia' (facturada menos esperada), una columna
+        booleana por cada motivo de MOTIVOS, 'inconsistente' y 'motivo' (texto).
+    """
+    alto = _numerico(df['alto'])
+    ancho = _numerico(df['ancho'])
+    largo = _numerico(df['largo'])
+    peso_fisico = _numerico(df['peso_fisico'])
+    aforado_declarado = _numerico(df['peso_aforado'])
+    facturable_declarado = _numerico(df['peso_facturable'])
+    tarifa = _numerico(df['tarifa'])
+
+    aforado = alto * ancho * largo / DIVISOR_AFORADO
+    facturable = np.fmax(peso_fisico, aforado)
+
+    # Una búsqueda en el índice por cada (proveedor, ámbito, servicio), no por fila.
+    esperada = np.full(len(df), np.nan)
+    claves = df[['proveedor', 'ambito', 'tipo_servicio']]
+    for (proveedor, ambito, servicio), posiciones in claves.groupby(
+            ['proveedor', 'ambito', 'tipo_servicio'], sort=False).indices.items():
+        esperada[posiciones] = tarifas.lookup_many(proveedor, ambito, servicio, facturable[posiciones])
+
+    faltantes = np.isnan(alto) | np.isnan(ancho) | np.isnan(largo) | np.isnan(peso_fisico)
+    with np.errstate(invalid='ignore'):
+        marcas = {
+            'datos_faltantes': faltantes,
+            'aforado_inconsistente': ~faltantes & ~(np.abs(np.round(aforado, 2) - aforado_declarado) <= TOLERANCIA_PESO),
+            'facturable_inconsistente': ~faltantes & ~(
+                np.abs(np.fmax(peso_fisico, aforado_declarado) - facturable_declarado) <= TOLERANCIA_PESO),
+            'sin_tarifa': ~faltantes & np.isnan(esperada),
+            'tarifa_inconsistente': ~np.isnan(esperada) & ~(np.abs(tarifa - esperada) <= TOLERANCIA_TARIFA),
+        }
+
+    resultado = df.copy()
+    resultado['peso_aforado_calculado'] = np.round(aforado, 2)
+    resultado['peso_facturable_calculado'] = np.round(facturable, 2)
+    resultado['tarifa_esperada'] = esperada
+    resultado['diferencia'] = tarifa - esperada
+    for nombre, marca in marcas.items():
+        resultado[nombre] = marca
+    resultado['inconsistente'] = np.logical_or.reduce(list(marcas.values()))
+
+    # El motivo se arma por combinación de marcas (son pocas), no fila por fila.
+    motivo = np.full(len(df), None, dtype=object)
+    combinaciones = np.column_stack(list(marcas.values())) if len(df) else np.zeros((0, len(marcas)), dtype=bool)
+    unicas, inversa = np.unique(combinaciones, axis=0, return_inverse=True)
+    for indice, combinacion in enumerate(unicas):
+        if combinacion.any():
+            texto = "; ".join(MOTIVOS[nombre] for nombre, activo in zip(marcas, combinacion) if activo)
+            motivo[inversa.ravel() == indice] = texto
+    resultado['motivo'] = motivo
+    return resultado
+
+
+def resumen_auditoria(auditoria: pd.DataFrame) -> dict:
+    """
+    Cantidad de filas, de inconsistentes por motivo, el monto facturado de más
+    y de menos, y el divisor de peso aforado que usa el proveedor (mediana de
+    volumen / peso aforado declarado; None si no se puede calcular).
+    """
+    diferencia = auditoria['diferencia'].where(auditoria['tarifa_inconsistente'], 0.0).fillna(0.0)
+    volumen = auditoria['peso_aforado_calculado'] * DIVISOR_AFORADO
+    with np.errstate(divide='ignore', invalid='ignore'):
+        divisores = volumen / pd.to_numeric(auditoria['peso_aforado'], errors='coerce')
+    divisores = divisores[np.isfinite(divisores) & (divisores > 0)]
+    return {
+        'filas': len(auditoria),
+        'inconsistentes': int(auditoria['inconsistente'].sum()),
+        **{nombre: int(auditoria[nombre].sum()) for nombre in MOTIVOS},
+        'facturado_de_mas': float(diferencia[diferencia > 0].sum()),
+        'facturado_de_menos': abs(float(diferencia[diferencia < 0].sum())),
+        'divisor_aforado_declarado': float(divisores.median()) if len(divisores) else None,
+    }
+
+
+def audita_periodo(periodo) -> pd.DataFrame:
+    """Audita con los datos declarados todas las invoices del periodo (ver `audita_declarados`)."""
+    df = trae_invoices(periodo, columnas=COLUMNAS_AUDITORIA)
+    tarifas = trae_indice_tarifas(periodo)
+    with metricas.span("auditoria_declarada"):
+        return audita_declarados(df, tarifas)
+
+
+if __name__ == "__main__":
+    # Auditoría de un periodo con los datos declarados, sin llamadas a Tavily/Gemini:
+    #   python -m servicios.auditoria_declarada 202507 [--csv inconsistentes.csv]
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Audita un periodo con las medidas declaradas por el proveedor.")
+    parser.add_argument("periodo", type=int, help="Periodo a auditar (AAAAMM).")
+    parser.add_argument("--csv", help="Guarda las invoices inconsistentes en este CSV.")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    auditoria = audita_periodo(args.periodo)
+    resumen = resumen_auditoria(auditoria)
+    print(f"Periodo {args.periodo}: {resumen['inconsistentes']} de {resumen['filas']} invoices inconsistentes "
+          f"({time.perf_counter() - inicio:.2f} s)")
+    for nombre, descripcion in MOTIVOS.items():
+        print(f"  - {descripcion}: {resumen[nombre]}")
+    if resumen['divisor_aforado_declarado'] is not None:
+        print(f"Divisor de peso aforado del proveedor (mediana): {resumen['divisor_aforado_declarado']:,.0f} "
+              f"(el análisis usa {DIVISOR_AFORADO})")
+    print(f"Facturado de más: {resumen['facturado_de_mas']:,.2f} | de menos: {resumen['facturado_de_menos']:,.2f}")
+    if args.csv:
+        auditoria[auditoria['inconsistente']].to_csv(args.csv, index=False)
+        print(f"💾 Inconsistentes guardadas en {args.csv}")
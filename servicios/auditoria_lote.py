@@ -0,0 +1,298 @@
+"""
+Auditoría por lotes, sin la interfaz de Streamlit.
+
+Por cada entrada corre el mismo flujo que la app: control de totales entre la
+factura PDF y el CSV, carga del CSV en 'invoices', análisis de dimensiones de
+cada periodo del CSV, inserción de los resultados en 'scales' y un reporte
+CSV por periodo. Cada carga y cada periodo corre en un proceso aparte, con
+como mucho --procesos a la vez.
+
+Entradas:
+    factura.pdf:reporte.csv   un par factura / reporte
+    reporte.csv               un reporte sin factura (requiere --sin-factura)
+    directorio/               los pares con el mismo nombre (202507.pdf y 202507.csv);
+                              si hay un único PDF y un único CSV, ese par
+    202507                    un periodo ya cargado: solo se analiza
+
+Ejecutar desde la raíz del proyecto:
+    python -m servicios.auditoria_lote files/factura_correcta.pdf:files/test.csv
+    python -m servicios.auditoria_lote files/Invoices_202507-10.csv --sin-factura --procesos 4
+"""
+import os
+import sys
+import time
+import argparse
+import contextlib
+import multiprocessing
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from servicios.limitador import RPM_DEFAULT
+
+DIRECTORIO_SALIDA_DEFAULT = "reportes"
+
+# Estados de cada carga o periodo en el resumen final.
+OK = "ok"
+TOTALES_DISTINTOS = "totales distintos"
+FALLIDO = "fallido"
+
+
+def pares_de_directorio(directorio: str) -> list[tuple[str, str]]:
+    """Pares (pdf, csv) de un directorio: los que comparten nombre o, si no hay, el único PDF con el único CSV."""
+    archivos = sorted(os.listdir(directorio))
+    pdfs = {os.path.splitext(a)[0]: os.path.join(directorio, a) for a in archivos if a.lower().endswith(".pdf")}
+    csvs = {os.path.splitext(a)[0]: os.path.join(directorio, a) for a in archivos if a.lower().endswith(".csv")}
+    pares = [(pdfs[nombre], csvs[nombre]) for nombre in sorted(pdfs.keys() & csvs.keys())]
+    if not pares and len(pdfs) == 1 and len(csvs) == 1:
+        pares = [(next(iter(pdfs.values())), next(iter(csvs.values())))]
+    return pares
+
+
+def interpreta_entradas(entradas: list[str], sin_factura: bool) -> tuple[list[tuple[str | None, str]], list[int]]:
+    """
+    Separa las entradas de la línea de comandos en cargas (pdf o None, csv) y periodos.
+
+    Raises:
+        ValueError: Si una entrada no existe o es un CSV sin factura y no se indicó --sin-factura.
+    """
+    cargas, periodos = [], []
+    for entrada in entradas:
+        if entrada.isdigit() and len(entrada) == 6:
+            periodos.append(int(entrada))
+        elif os.path.isdir(entrada):
+            pares = pares_de_directorio(entrada)
+            if not pares:
+                raise ValueError(f"No se encontraron pares factura PDF / reporte CSV en {entrada}.")
+            cargas += pares
+        elif ":" in entrada and entrada.lower().endswith(".csv"):
+            ruta_pdf, ruta_csv = entrada.rsplit(":", 1)
+            for ruta in (ruta_pdf, ruta_csv):
+                if not os.path.isfile(ruta):
+                    raise ValueError(f"No existe el archivo {ruta}.")
+            cargas.append((ruta_pdf, ruta_csv))
+        elif entrada.lower().endswith(".csv") and os.path.isfile(entrada):
+            if not sin_factura:
+                raise ValueError(f"{entrada} no tiene factura: indicá factura.pdf:{entrada} o usá --sin-factura.")
+            cargas.append((None, entrada))
+        else:
+            raise ValueError(f"Entrada no reconocida: {entrada}")
+    return cargas, periodos
+
+
+def periodos_de_csv(ruta_csv: str) -> set[int]:
+    """Periodos que trae un CSV, leyendo solo esa columna."""
+    # latin-1 decodifica cualquier byte, y la columna 'periodo' es solo dígitos.
+    df = pd.read_csv(ruta_csv, usecols=lambda c: c.strip().lower() == 'periodo', encoding='latin-1', dtype=str)
+    return {int(p) for p in df.iloc[:, 0].dropna().unique()}
+
+
+@contextlib.contextmanager
+def _log(directorio_salida: str, nombre: str):
+    """Redirige la salida del proceso a un archivo: los procesos en paralelo no se mezclan en la consola."""
+    directorio = os.path.join(directorio_salida, "logs")
+    os.makedirs(directorio, exist_ok=True)
+    with open(os.path.join(directorio, f"{nombre}.log"), "w", encoding="utf-8") as archivo, \
+            contextlib.redirect_stdout(archivo), contextlib.redirect_stderr(archivo):
+        yield
+
+
+def procesa_carga(ruta_pdf: str | None, ruta_csv: str, directorio_salida: str) -> dict:
+    """Controla totales (si hay factura) y carga el CSV. Devuelve el resumen con los periodos del CSV."""
+    from servicios import extrae_pdf, extrae_csv, carga_csv
+    from servicios.compara_totales import compara_totales
+
+    inicio = time.perf_counter()
+    resumen = {'entrada': ruta_csv if ruta_pdf is None else f"{ruta_pdf}:{ruta_csv}", 'periodos': []}
+    nombre = os.path.splitext(os.path.basename(ruta_csv))[0]
+    with _log(directorio_salida, f"carga_{nombre}"):
+        try:
+            reporte = extrae_csv.lee_csv_invoices(ruta_csv)
+            if ruta_pdf is not None and not compara_totales(extrae_pdf.extraer_total_de_factura(ruta_pdf), reporte.df):
+                resumen['estado'] = TOTALES_DISTINTOS
+            else:
+                resumen['filas'] = carga_csv.carga_invoices(reporte)
+                resumen['periodos'] = sorted(int(p) for p in reporte.df['periodo'].unique())
+                resumen['estado'] = OK
+        except Exception as e:
+            print(f"❌ {e}")
+            resumen.update(estado=FALLIDO, error=str(e))
+    resumen['segundos'] = time.perf_counter() - inicio
+    return resumen
+
+
+def analiza_periodo(periodo: int, directorio_salida: str, reanudar: bool, max_workers: int | None) -> dict:
+    """Analiza el periodo, guarda las diferencias en 'scales' y escribe el reporte del periodo."""
+    from servicios.busquedallm import realiza_busqueda_llm
+    from servicios.db.database_operations import insert_scales_data
+    from servicios.metricas import corrida
+
+    inicio = time.perf_counter()
+    resumen = {'periodo': periodo}
+    with _log(directorio_salida, f"periodo_{periodo}"):
+        try:
+            # Cada periodo deja sus métricas aparte: los procesos no se pisan 'ultima_corrida'.
+            os.environ['METRICAS_DIR'] = os.path.join(directorio_salida, "metricas", f"periodo_{periodo}")
+            with corrida():
+                df = realiza_busqueda_llm(periodo, max_workers=max_workers, reanudar=reanudar)
+            if not df.empty and not insert_scales_data(df):
+                raise RuntimeError("No se pudieron guardar los resultados en 'scales'.")
+            ruta = os.path.join(directorio_salida, f"periodo_{periodo}.csv")
+            df.to_csv(ruta, index=False)
+            resumen.update(
+                estado=OK,
+                diferencias=len(df),
+                monto=float(df['diferencia'].sum()) if not df.empty else 0.0,
+                reporte=ruta,
+            )
+        except Exception as e:
+            print(f"❌ {e}")
+            resumen.update(estado=FALLIDO, error=str(e))
+    resumen['segundos'] = time.perf_counter() - inicio
+    return resumen
+
+
+def _inicializa_proceso(rpm_por_proceso: dict):
+    # Los limitadores son por proceso: cada uno recibe su parte de la cuota de la API key.
+    for proveedor, rpm in rpm_por_proceso.items():
+        os.environ[f"{proveedor.upper()}_RPM"] = str(rpm)
+
+
+def procesos_necesarios(cargas: list[tuple[str | None, str]], periodos: list[int],
+                        periodos_por_carga: list[set[int]]) -> int:
+    """
+    Cuántos procesos pueden trabajar a la vez en el lote: uno por carga mientras
+    se cargan, y después uno por periodo (los pedidos más los que traen los CSV).
+    """
+    todos = set(periodos).union(*periodos_por_carga)
+    return max(1, len(cargas), len(todos))
+
+
+def ejecuta_lote(cargas: list[tuple[str | None, str]], periodos: list[int], procesos: int,
+                 directorio_salida: str, reanudar: bool = False, max_workers: int | None = None,
+                 periodos_por_carga: list[set[int]] | None = None) -> tuple[list, list]:
+    """
+    Corre las cargas y los análisis en un pool de `procesos` procesos.
+
+    Cada periodo se analiza apenas terminan todas las cargas que lo traen, en
+    paralelo con el resto de las cargas. La cuota por minuto de Tavily y Gemini
+    se reparte entre los procesos.
+
+    Args:
+        periodos_por_carga: Los periodos de cada CSV de `cargas`, si ya se leyeron.
+
+    Returns:
+        (resúmenes de las cargas, resúmenes de los periodos), en orden de finalización.
+    """
+    os.makedirs(directorio_salida, exist_ok=True)
+    rpm_por_proceso = {
+        proveedor: float(os.getenv(f"{proveedor.upper()}_RPM", rpm)) / procesos
+        for proveedor, rpm in RPM_DEFAULT.items()
+    }
+    resultados_cargas, resultados_periodos = [], []
+    # Cargas que faltan terminar por periodo: un periodo no se analiza a medias.
+    if periodos_por_carga is None:
+        periodos_por_carga = [periodos_de_csv(ruta_csv) for _, ruta_csv in cargas]
+    cargas_faltantes = {}
+    for periodos_carga in periodos_por_carga:
+        for periodo in periodos_carga:
+            cargas_faltantes[periodo] = cargas_faltantes.get(periodo, 0) + 1
+    # Periodos a analizar: los pedidos y los de las cargas que terminaron bien.
+    a_analizar = set(periodos)
+    periodos_enviados = set()
+    # Periodos de cargas que fallaron: quedaron a medias en la base y no se analizan.
+    periodos_fallidos = set()
+
+    # 'spawn': cada proceso abre sus propias conexiones, no hereda las del padre.
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto,
+                             initializer=_inicializa_proceso, initargs=(rpm_por_proceso,)) as executor:
+        pendientes = {}
+
+        def envia_periodos():
+            for periodo in sorted(a_analizar - periodos_enviados - periodos_fallidos):
+                if cargas_faltantes.get(periodo, 0) == 0:
+                    periodos_enviados.add(periodo)
+                    futuro = executor.submit(analiza_periodo, periodo, directorio_salida, reanudar, max_workers)
+                    pendientes[futuro] = ("periodo", periodo)
+
+        for indice, (ruta_pdf, ruta_csv) in enumerate(cargas):
+            pendientes[executor.submit(procesa_carga, ruta_pdf, ruta_csv, directorio_salida)] = ("carga", indice)
+        envia_periodos()
+
+        while pendientes:
+            terminados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                tipo, clave = pendientes.pop(futuro)
+                resultado = futuro.result()
+                if tipo == "carga":
+                    resultados_cargas.append(resultado)
+                    print(f"{'✅' if resultado['estado'] == OK else '❌'} Carga {resultado['entrada']}: {resultado['estado']}")
+                    for periodo in periodos_por_carga[clave]:
+                        cargas_faltantes[periodo] -= 1
+                    if resultado['estado'] == FALLIDO:
+                        omitidos = sorted(periodos_por_carga[clave] & (a_analizar - periodos_enviados))
+                        periodos_fallidos.update(periodos_por_carga[clave])
+                        if omitidos:
+                            print(f"⏭️ No se analizan los periodos {omitidos}: su carga falló.")
+                    else:
+                        a_analizar.update(resultado['periodos'])
+                    envia_periodos()
+                else:
+                    resultados_periodos.append(resultado)
+                    print(f"{'✅' if resultado['estado'] == OK else '❌'} Periodo {resultado['periodo']}: "
+                          f"{resultado['estado']} ({resultado['segundos']:.0f} s)")
+    return resultados_cargas, resultados_periodos
+
+
+def _primera_linea(texto: str) -> str:
+    # Los errores de la base traen el SQL y los parámetros: en el resumen basta la primera línea (el resto está en el log).
+    return texto.splitlines()[0] if texto else ''
+
+
+def imprime_resumen(cargas: list[dict], periodos: list[dict]):
+    print("\n== Cargas")
+    for c in cargas:
+        detalle = f"{c.get('filas', 0)} filas, periodos {c['periodos']}" if c['estado'] == OK else _primera_linea(c.get('error', ''))
+        print(f"  {c['estado']:<18} {c['entrada']}  {detalle}")
+    print("\n== Periodos")
+    for p in sorted(periodos, key=lambda p: p['periodo']):
+        if p['estado'] == OK:
+            detalle = f"{p['diferencias']} diferencias, {p['monto']:,.2f} facturado de más -> {p['reporte']}"
+        else:
+            detalle = _primera_linea(p.get('error', ''))
+        print(f"  {p['periodo']}  {p['estado']:<8} {p['segundos']:>7.0f} s  {detalle}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entradas", nargs="+", help="Pares factura.pdf:reporte.csv, CSV, directorios o periodos.")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Procesos en paralelo.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Productos consultados en paralelo por proceso (por defecto LLM_MAX_WORKERS).")
+    parser.add_argument("--salida", default=DIRECTORIO_SALIDA_DEFAULT, help="Directorio de reportes y logs.")
+    parser.add_argument("--sin-factura", action="store_true", help="Permite cargar CSV sin control de totales.")
+    parser.add_argument("--reanudar", action="store_true", help="Retoma los periodos sin repetir filas resueltas.")
+    args = parser.parse_args()
+
+    try:
+        cargas, periodos = interpreta_entradas(args.entradas, args.sin_factura)
+    except ValueError as e:
+        parser.error(str(e))
+    # Los periodos salen de los CSV: una sola carga puede traer varios para analizar a la vez.
+    periodos_por_carga = [periodos_de_csv(ruta_csv) for _, ruta_csv in cargas]
+    procesos = max(1, min(args.procesos, procesos_necesarios(cargas, periodos, periodos_por_carga)))
+
+    inicio = time.perf_counter()
+    print(f"🚀 {len(cargas)} cargas y {len(periodos)} periodos con {procesos} procesos. Logs en {args.salida}/logs")
+    resultados_cargas, resultados_periodos = ejecuta_lote(
+        cargas, periodos, procesos, args.salida, reanudar=args.reanudar, max_workers=args.workers,
+        periodos_por_carga=periodos_por_carga)
+    imprime_resumen(resultados_cargas, resultados_periodos)
+
+    fallidos = [r for r in resultados_cargas + resultados_periodos if r['estado'] != OK]
+    print(f"\n{'❌' if fallidos else '✅'} {len(resultados_periodos)} periodos analizados, "
+          f"{len(fallidos)} con problemas, en {(time.perf_counter() - inicio) / 60:.1f} min.")
+    sys.exit(1 if fallidos else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,473 @@
 import os
 import pandas as pd
 import json
-import google.generativeai as genai
+import threading
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
 from servicios.pydantic_model import ProductDimensions
-from dotenv import load_dotenv
-from tavily import TavilyClient
-from servicios.consulta_invoices import trae_invoices
-from servicios.consulta_tarificacion import trae_tarifas
-
-def realiza_busqueda_llm(periodo) -> pd.DataFrame:
-    """Realiza una búsqueda avanzada usando Tavily y extrae dimensiones con Gemini."""
-
-    load_dotenv()
-    tavily_api_key = os.getenv("TAVILY_API_KEY")
-    google_api_key = os.getenv("GOOGLE_API_KEY")
-
-    df = trae_invoices(periodo)
-    tarifas = trae_tarifas()
-    tarifas['tarifa'] = tarifas['tarifa'].astype(float)
-    tarifas['ambito'] = tarifas['ambito'].astype(int)
-    df['tarifa'] = df['tarifa'].astype(float)
-
-    productos = []
-    for row in df.itertuples():
-        print(f"\nProcesando producto: {row.name}")
-        dimensiones = buscar_dimensiones_producto(row.name, tavily_api_key, google_api_key)
-        if dimensiones:
+from servicios.cache_dimensiones import CacheDimensiones
+from servicios.indice_tarifas import TariffIndex
+from servicios.checkpoint_analisis import (
+    CheckpointAnalisis, COLUMNAS_RESULTADO, OK, SIN_DIMENSIONES, SIN_TARIFA, ERROR,
+)
+from servicios.clientes_proveedores import ClientesProveedores, ErrorProveedor, obtener_clientes
+from servicios.limitador import obtener_limitador
+from servicios.metricas import metricas, en_contexto
+from servicios.consulta_invoices import trae_invoices, itera_invoices, cuenta_invoices, COLUMNAS_ANALISIS
+from servicios.triage import marca_outliers, resumen_triage
+from servicios.dimensiones_nombre import dimensiones_desde_nombre
+from servicios.consulta_tarificacion import trae_indice_tarifas
+
+# Cantidad de productos que se consultan en paralelo contra Tavily/Gemini.
+# Con 1 se conserva el comportamiento secuencial original.
+MAX_WORKERS_DEFAULT = 8
+# Cantidad de productos que se envían a Gemini en un único pedido.
+# Con 1 se hace un pedido por producto.
+TAMANO_LOTE_DEFAULT = 1
+
+
+def realiza_busqueda_llm(periodo, max_workers: int | None = None, cache: CacheDimensiones | None = None,
+                         tamano_lote: int | None = None,
+                         progreso: Callable[[int, int, int], None] | None = None,
+                         reanudar: bool = False, checkpoint: bool = True,
+                         triage: bool | None = None,
+                         desde_nombre: bool | None = None,
+                         clientes: ClientesProveedores | None = None) -> pd.DataFrame:
+    """
+    Realiza una búsqueda avanzada usando Tavily y extrae dimensiones con Gemini.
+
+    Los productos se procesan en un pool de hilos: cada consulta pasa la mayor
+    parte del tiempo esperando la red, así que varias en paralelo reducen el
+    tiempo total sin cambiar el resultado.
+
+    Args:
+        periodo: El periodo (AAAAMM) a analizar.
+        max_workers: Cantidad máxima de productos consultados en simultáneo.
+                     Si es None se toma de la variable de entorno LLM_MAX_WORKERS.
+        cache: Caché de dimensiones a usar. Si es None se abre el caché local por defecto.
+        tamano_lote: Productos por pedido a Gemini (modo lote). Si es None se toma
+                     de la variable de entorno LLM_BATCH_SIZE.
+        progreso: Función opcional que recibe (filas procesadas, filas totales,
+                  filas salteadas por estar ya resueltas) cada vez que termina
+                  un lote. Las salteadas también cuentan como procesadas.
+        reanudar: Si es True se saltean las invoices que ya tienen resultado
+                  guardado para el periodo (ver `resume`).
+        checkpoint: Si es True el resultado de cada fila se guarda en
+                    'analisis_filas' a medida que se obtiene.
+        triage: Si es True solo se buscan las filas con medidas declaradas
+                atípicas para su categoría (ver servicios.triage). Si es None
+                se toma de la variable de entorno LLM_TRIAGE.
+        desde_nombre: Si es True, los productos cuyo nombre trae medidas y peso
+                      confiables (ver servicios.dimensiones_nombre) se resuelven
+                      sin consultar la red. Si es None se toma de la variable de
+                      entorno LLM_DIMENSIONES_NOMBRE (desactivado por defecto).
+        clientes: Clientes de Tavily y Gemini a usar. Si es None se usan los
+                  compartidos del proceso (ver servicios.clientes_proveedores).
+
+    Returns:
+        Un DataFrame con los productos cuya tarifa real es menor a la facturada,
+        en el mismo orden en que aparecen en la tabla 'invoices'.
+    """
+
+    if clientes is None:
+        clientes = obtener_clientes()
+    if max_workers is None:
+        max_workers = int(os.getenv("LLM_MAX_WORKERS", MAX_WORKERS_DEFAULT))
+    max_workers = max(1, max_workers)
+    if tamano_lote is None:
+        tamano_lote = int(os.getenv("LLM_BATCH_SIZE", TAMANO_LOTE_DEFAULT))
+    tamano_lote = max(1, tamano_lote)
+    if triage is None:
+        triage = os.getenv("LLM_TRIAGE", "0") == "1"
+    if desde_nombre is None:
+        desde_nombre = os.getenv("LLM_DIMENSIONES_NOMBRE", "0") == "1"
+    cache_propio = cache is None
+    if cache_propio:
+        cache = CacheDimensiones()
+
+    # Índice del tarifario vigente en el periodo (se reutiliza mientras la tabla no cambie)
+    tarifas = trae_indice_tarifas(periodo)
+
+    guardados = {}
+    registro = CheckpointAnalisis(periodo) if checkpoint or reanudar else None
+    if reanudar:
+        guardados = registro.guardados()
+        print(f"⏩ Reanudando el periodo {periodo}: {len(guardados)} filas ya resueltas.")
+    elif registro is not None:
+        registro.reiniciar()
+
+    if triage:
+        # El triage compara cada fila con su categoría en todo el periodo,
+        # así que necesita el periodo completo antes de empezar.
+        df = trae_invoices(periodo, columnas=COLUMNAS_ANALISIS)
+        verificar = marca_outliers(df)
+        print(f"🔬 {resumen_triage(verificar)}")
+        bloques = [df[verificar.to_numpy()]]
+        total = len(bloques[0])
+    else:
+        # Sin triage, cada bloque se empieza a procesar apenas llega de la base;
+        # el total se cuenta antes, así el progreso y la ETA valen desde el inicio.
+        total = cuenta_invoices(periodo)
+        bloques = itera_invoices(periodo, columnas=COLUMNAS_ANALISIS)
+
+    hechos = 0
+    reanudadas = 0
+    lock_progreso = threading.Lock()
+
+    def avanza(cantidad: int, salteadas: int = 0):
+        nonlocal hechos, reanudadas
+        if progreso:
+            with lock_progreso:
+                hechos += cantidad
+                reanudadas += salteadas
+                progreso(hechos, total, reanudadas)
+
+    def registrar(lote, resultados_lote):
+        if registro is not None:
             try:
-                producto = ProductDimensions(**dimensiones)
-                print(f"  - Dimensiones extraídas: {producto}")
-                id = row.id
-                ambito = row.ambito
-                operacion = row.tipo_servicio
-                alto_valor = producto.alto
-                ancho_valor = producto.ancho
-                largo_valor = producto.largo
-                peso_valor = producto.peso
-                tarifa_proveedor = row.tarifa
-                try:
-                    peso_aforado = ancho_valor * largo_valor * alto_valor / 4000 # Peso aforado en kg
-                except Exception as e:
-                    print(f"  - Error al calcular el peso aforado: {e}")
-                    peso_aforado = 0
-                try:    
-                    peso_facturable = max(peso_valor, peso_aforado) # Peso facturable en kg
-                except Exception as e:
-                    print(f"  - Error al calcular el peso facturable: {e}")
-                    peso_facturable = 0
-                mask = (
-                    (tarifas['ambito'] == ambito) & 
-                    (tarifas['tipo_de_servicio'] == operacion) & 
-                    (tarifas['rango_desde'] <= peso_facturable) & 
-                    (tarifas['rango_hasta'] >= peso_facturable)
-                )
-                
-                # Aplicar la máscara y seleccionar la columna 'tarifa'
-                resultado_tarifa = tarifas.loc[mask, 'tarifa']
-
-                # Extraer el valor numérico (si se encontró)
-                if not resultado_tarifa.empty:
-                    tarifa_real = resultado_tarifa.iloc[0]
-                else:
-                    tarifa_real = None # O 0, o np.nan, para manejar casos sin tarifa
-                diferencia = tarifa_proveedor - tarifa_real if tarifa_real is not None else None
-
-                #print(f"  - Tarifa encontrada: {tarifa_real}")
-                datos = {
-                    "invoice_id": id,
-                    "nombre_producto": row.name,
-                    "track_code": row.track_code,
-                    "alto": alto_valor,
-                    "ancho": ancho_valor,
-                    "largo": largo_valor,
-                    "peso_aforado": peso_aforado,
-                    "peso_fisico": peso_valor,
-                    "peso_facturable": peso_facturable,
-                    "tarifa_proveedor": tarifa_proveedor,
-                    "tarifa_real": tarifa_real,
-                    "diferencia": diferencia,
-                }
-                if tarifa_real < tarifa_proveedor:
-                    productos.append(datos)
-                
+                for resultado in resultados_lote:
+                    registro.registra(resultado)
             except Exception as e:
-                print(f"  - Error al validar las dimensiones con Pydantic: {e}")
+                # Las filas quedan pendientes y se reintenta en la próxima escritura.
+                print(f"  - ⚠️ No se pudo guardar el avance del análisis: {e}")
+        avanza(len(lote))
+
+    def procesar(lote):
+        # Un error en un lote no debe cancelar el resto del análisis.
+        try:
+            resultados_lote = procesa_lote(lote, tarifas, clientes, cache)
+        except Exception as e:
+            print(f"  - ❌ Error inesperado procesando un lote de {len(lote)} productos: {e}")
+            resultados_lote = [resultado_fallido(row, ERROR, str(e)) for row in lote]
+        registrar(lote, resultados_lote)
+        return resultados_lote
+
+    # Solo se conservan las filas que van al resultado: la memoria no crece con el periodo.
+    productos = {}
+    con_error = 0
+    resueltos_nombre = 0
+
+    def acumula(datos: dict, nuevo: bool = True):
+        nonlocal con_error
+        if nuevo:
+            metricas.suma("filas_analizadas", estado=datos['estado'])
+            con_error += datos['estado'] == ERROR
+        if datos['estado'] == OK and datos['tarifa_real'] < datos['tarifa_proveedor']:
+            productos[datos['invoice_id']] = {k: v for k, v in datos.items() if k not in ('estado', 'motivo')}
+
+    # Lotes enviados al pool y todavía sin recoger. Con un tope, leer de la base
+    # espera a que se libere lugar en vez de encolar el periodo entero.
+    en_vuelo = set()
+    max_en_vuelo = max_workers * 2
+
+    def recoge(todos: bool = False):
+        nonlocal en_vuelo
+        if not en_vuelo:
+            return
+        listos, en_vuelo = wait(en_vuelo, return_when=ALL_COMPLETED if todos else FIRST_COMPLETED)
+        for futuro in listos:
+            for datos in futuro.result():
+                acumula(datos)
+
+    limitadores = [obtener_limitador("tavily"), obtener_limitador("gemini")]
+    mediciones = [limitador.medicion() for limitador in limitadores]
+    with metricas.span("analisis_llm"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for bloque in bloques:
+            filas_bloque = list(bloque.assign(tarifa=bloque['tarifa'].astype(float)).itertuples())
+            pendientes = []
+            for row in filas_bloque:
+                guardado = guardados.pop(row.id, None)
+                if guardado is None:
+                    pendientes.append(row)
+                else:
+                    acumula(resultado_guardado(row, guardado), nuevo=False)
+            salteadas = len(filas_bloque) - len(pendientes)
+            avanza(salteadas, salteadas=salteadas)
+
+            # Los productos con medidas y peso en el nombre se resuelven sin red.
+            if desde_nombre:
+                restantes = []
+                for row in pendientes:
+                    producto = dimensiones_desde_nombre(row.name)
+                    if producto is None:
+                        restantes.append(row)
+                        continue
+                    print(f"\nProcesando producto: {row.name}\n  - Dimensiones obtenidas del nombre: {producto}")
+                    datos = calcula_tarifa(row, producto, tarifas)
+                    metricas.suma("dimensiones_desde_nombre")
+                    resueltos_nombre += 1
+                    registrar([row], [datos])
+                    acumula(datos)
+                pendientes = restantes
+
+            for i in range(0, len(pendientes), tamano_lote):
+                while len(en_vuelo) >= max_en_vuelo:
+                    recoge()
+                en_vuelo.add(executor.submit(en_contexto(procesar), pendientes[i:i + tamano_lote]))
+        recoge(todos=True)
+
+    if registro is not None:
+        registro.vaciar()
+    print(f"\n📦 {cache.resumen()}")
+    if desde_nombre:
+        # Cada producto resuelto por nombre ahorra una búsqueda en Tavily y una extracción con Gemini.
+        print(f"📏 Dimensiones tomadas del nombre: {resueltos_nombre} productos, "
+              f"{2 * resueltos_nombre} llamadas de red evitadas")
+    for limitador, medicion in zip(limitadores, mediciones):
+        print(f"🚦 {limitador.resumen(desde=medicion)}")
+    if con_error:
+        print(f"⚠️ {con_error} filas quedaron con error y se vuelven a intentar al reanudar el periodo.")
+    if cache_propio:
+        cache.cerrar()
+    try:
+        print(f"📈 Métricas de la corrida guardadas en {metricas.guarda()}")
+    except OSError as e:
+        print(f"⚠️ No se pudieron guardar las métricas de la corrida: {e}")
+
+    # Las invoices se leen en orden de id: ordenar por id es el orden de la tabla.
+    return pd.DataFrame([productos[invoice_id] for invoice_id in sorted(productos)])
+
+
+def resume(periodo, **kwargs) -> pd.DataFrame:
+    """
+    Reanuda el análisis de un periodo que se cortó a mitad de camino.
+
+    Las invoices con resultado guardado en 'analisis_filas' no se vuelven a
+    consultar en Tavily/Gemini; solo se procesan las que faltan o fallaron por
+    un error inesperado. Devuelve el mismo DataFrame que `realiza_busqueda_llm`.
+    """
+    return realiza_busqueda_llm(periodo, reanudar=True, **kwargs)
+
+
+def resultado_fallido(row, estado: str, motivo: str) -> dict:
+    """Resultado de una fila que no se pudo resolver, con el motivo."""
+    return {
+        "invoice_id": row.id,
+        "nombre_producto": row.name,
+        "track_code": row.track_code,
+        "tarifa_proveedor": row.tarifa,
+        "estado": estado,
+        "motivo": motivo,
+    }
+
+
+def resultado_guardado(row, guardado: dict) -> dict:
+    """
+    Reconstruye el resultado de una fila a partir de lo guardado en 'analisis_filas',
+    con las mismas claves y en el mismo orden que `calcula_tarifa` y `resultado_fallido`.
+    """
+    if guardado['estado'] != OK:
+        return resultado_fallido(row, guardado['estado'], guardado['motivo'])
+    valores = {}
+    for columna in COLUMNAS_RESULTADO:
+        valor = guardado.get(columna)
+        valores[columna] = float(valor) if valor is not None else None
+    return {
+        "invoice_id": row.id,
+        "nombre_producto": row.name,
+        "track_code": row.track_code,
+        "alto": valores['alto'],
+        "ancho": valores['ancho'],
+        "largo": valores['largo'],
+        "peso_aforado": valores['peso_aforado'],
+        "peso_fisico": valores['peso_fisico'],
+        "peso_facturable": valores['peso_facturable'],
+        "tarifa_proveedor": row.tarifa,
+        "tarifa_real": valores['tarifa_real'],
+        "diferencia": valores['diferencia'],
+        "estado": OK,
+        "motivo": None,
+    }
+
+
+def procesa_lote(filas: list, tarifas: TariffIndex, clientes: ClientesProveedores,
+                 cache: CacheDimensiones | None = None) -> list[dict]:
+    """
+    Procesa un lote de productos haciendo un único pedido a Gemini.
+
+    Cada producto se busca en el caché y, si no está, en Tavily. Los contextos
+    obtenidos se envían juntos a Gemini; los productos que falten en la
+    respuesta o no pasen la validación se reintentan de a uno.
+
+    Returns:
+        Una lista alineada con `filas` con el resultado de cada producto
+        (ver `calcula_tarifa` y `resultado_fallido`).
+    """
+    if len(filas) == 1:
+        return [procesa_producto(filas[0], tarifas, clientes, cache)]
+
+    productos = {}
+    errores = {}
+    pendientes = []
+    for row in filas:
+        print(f"\nProcesando producto: {row.name}")
+        producto = cache.obtener(row.name) if cache is not None else None
+        if producto is not None:
+            print(f"  - Dimensiones obtenidas del caché: {producto}")
+            productos[row.id] = producto
+            continue
+        try:
+            contexto = buscar_contexto_tavily(row.name, clientes.tavily)
+        except ErrorProveedor as e:
+            errores[row.id] = str(e)
+            continue
+        if contexto:
+            pendientes.append((row, contexto))
         else:
             print("  - No se pudieron extraer dimensiones para este producto.")
-    return pd.DataFrame(productos)
 
+    if pendientes:
+        try:
+            extraidos = extraer_datos_con_gemini_lote(
+                [(row.id, row.name, contexto) for row, contexto in pendientes], clientes.gemini
+            )
+        except ErrorProveedor as e:
+            errores.update({row.id: str(e) for row, _ in pendientes})
+            pendientes = []
+        for row, contexto in pendientes:
+            producto = valida_dimensiones(extraidos.get(row.id))
+            if producto is None:
+                print(f"  - 🟡 '{row.name}' sin respuesta válida en el lote. Reintentando individualmente...")
+                try:
+                    producto = valida_dimensiones(extraer_datos_con_gemini(contexto, row.name, clientes.gemini))
+                except ErrorProveedor as e:
+                    errores[row.id] = str(e)
+                    continue
+            if producto is None:
+                print(f"  - No se pudieron extraer dimensiones para '{row.name}'.")
+                continue
+            if cache is not None:
+                cache.guardar(row.name, producto)
+            productos[row.id] = producto
+
+    return [
+        calcula_tarifa(row, productos[row.id], tarifas) if row.id in productos
+        else resultado_fallido(row, ERROR, errores[row.id]) if row.id in errores
+        else resultado_fallido(row, SIN_DIMENSIONES, "No se pudieron extraer dimensiones.")
+        for row in filas
+    ]
 
-def extraer_datos_con_gemini(contexto: str, nombre_producto: str, google_api_key) -> dict:
-    """Usa Gemini para extraer las dimensiones del texto de búsqueda."""
-    genai.configure(api_key=google_api_key)
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    
+
+def procesa_producto(row, tarifas: TariffIndex, clientes: ClientesProveedores,
+                     cache: CacheDimensiones | None = None) -> dict:
+    """
+    Busca las dimensiones de un producto y calcula su tarifa real.
+
+    Args:
+        row: Una fila de la tabla 'invoices' (namedtuple de itertuples).
+        tarifas: El índice del tarifario.
+        clientes: Clientes de Tavily y Gemini.
+        cache: Caché de dimensiones; si el producto está guardado no se
+               consulta ni Tavily ni Gemini.
+
+    Returns:
+        El resultado del producto (ver `calcula_tarifa` y `resultado_fallido`).
+    """
+    print(f"\nProcesando producto: {row.name}")
+    producto = cache.obtener(row.name) if cache is not None else None
+    if producto is not None:
+        print(f"  - Dimensiones obtenidas del caché: {producto}")
+        return calcula_tarifa(row, producto, tarifas)
+
+    try:
+        dimensiones = buscar_dimensiones_producto(row.name, clientes)
+    except ErrorProveedor as e:
+        # Error pasajero que persistió tras los reintentos: la fila queda para reanudar.
+        print(f"  - ❌ {e}")
+        return resultado_fallido(row, ERROR, str(e))
+    if not dimensiones:
+        print("  - No se pudieron extraer dimensiones para este producto.")
+        return resultado_fallido(row, SIN_DIMENSIONES, "No se pudieron extraer dimensiones.")
+
+    producto = valida_dimensiones(dimensiones)
+    if producto is None:
+        return resultado_fallido(row, SIN_DIMENSIONES, "Las dimensiones extraídas no pasaron la validación.")
+    print(f"  - Dimensiones extraídas: {producto}")
+    if cache is not None:
+        cache.guardar(row.name, producto)
+    return calcula_tarifa(row, producto, tarifas)
+
+
+def valida_dimensiones(dimensiones) -> ProductDimensions | None:
+    """Valida con Pydantic las dimensiones devueltas por el modelo. Devuelve None si no son válidas."""
+    with metricas.span("validacion"):
+        if not dimensiones or not isinstance(dimensiones, dict):
+            return None
+        try:
+            return ProductDimensions(**dimensiones)
+        except Exception as e:
+            print(f"  - Error al validar las dimensiones con Pydantic: {e}")
+            return None
+
+
+def calcula_tarifa(row, producto: ProductDimensions, tarifas: TariffIndex) -> dict:
+    """
+    Calcula el peso facturable y la tarifa real de un producto.
+
+    Returns:
+        Un diccionario con los datos del análisis y 'estado' OK, o el resultado
+        fallido (SIN_TARIFA o ERROR) con su motivo.
+    """
+    with metricas.span("tarifa"):
+        try:
+            id = row.id
+            ambito = row.ambito
+            operacion = row.tipo_servicio
+            alto_valor = producto.alto
+            ancho_valor = producto.ancho
+            largo_valor = producto.largo
+            peso_valor = producto.peso
+            tarifa_proveedor = row.tarifa
+            try:
+                peso_aforado = ancho_valor * largo_valor * alto_valor / 4000 # Peso aforado en kg
+            except Exception as e:
+                print(f"  - Error al calcular el peso aforado: {e}")
+                peso_aforado = 0
+            try:    
+                peso_facturable = max(peso_valor, peso_aforado) # Peso facturable en kg
+            except Exception as e:
+                print(f"  - Error al calcular el peso facturable: {e}")
+                peso_facturable = 0
+            # None si el peso no cae en ningún rango del tarifario
+            tarifa_real = tarifas.lookup(row.proveedor, ambito, operacion, peso_facturable)
+            if tarifa_real is None:
+                motivo = f"Sin tarifa para ámbito {ambito}, servicio {operacion} y peso {peso_facturable}."
+                print(f"  - {motivo}")
+                return resultado_fallido(row, SIN_TARIFA, motivo)
+            diferencia = tarifa_proveedor - tarifa_real
+
+            #print(f"  - Tarifa encontrada: {tarifa_real}")
+            return {
+                "invoice_id": id,
+                "nombre_producto": row.name,
+                "track_code": row.track_code,
+                "alto": alto_valor,
+                "ancho": ancho_valor,
+                "largo": largo_valor,
+                "peso_aforado": peso_aforado,
+                "peso_fisico": peso_valor,
+                "peso_facturable": peso_facturable,
+                "tarifa_proveedor": tarifa_proveedor,
+                "tarifa_real": tarifa_real,
+                "diferencia": diferencia,
+                "estado": OK,
+                "motivo": None,
+            }
+
+        except Exception as e:
+            print(f"  - Error al calcular la tarifa de '{row.name}': {e}")
+            return resultado_fallido(row, ERROR, str(e))
+
+
+def extraer_datos_con_gemini(contexto: str, nombre_producto: str, gemini) -> dict:
+    """
+    Usa Gemini para extraer las dimensiones del texto de búsqueda.
+
+    `gemini` es un `ClienteGemini` o cualquier objeto con un método `generar(prompt)`.
+
+    Raises:
+        ErrorProveedor: Si un error pasajero (429, timeout, red) persiste tras los reintentos.
+    """
     prompt = f"""
     Basado en el siguiente contexto de búsqueda para el producto "{nombre_producto}", 
     extrae el alto, ancho, largo y peso.
@@ -115,46 +489,141 @@ def extraer_datos_con_gemini(contexto: str, nombre_producto: str, google_api_key
     """
     
     try:
-        response = model.generate_content(prompt)
+        texto = obtener_limitador("gemini").ejecutar(gemini.generar, prompt)
         # Limpiar la respuesta para asegurar que sea un JSON válido
-        json_text = response.text.strip().replace("```json", "").replace("```", "")
+        json_text = texto.strip().replace("```json", "").replace("```", "")
         return json.loads(json_text)
+    except ErrorProveedor as e:
+        if e.reintentable:
+            raise
+        print(f"  - ❌ Error al consultar Gemini: {e}")
+        return {}
     except (json.JSONDecodeError, Exception) as e:
         print(f"  - Error al procesar la respuesta de Gemini: {e}")
         return {}
 
 
-def buscar_dimensiones_producto(nombre_producto: str, tavily_api_key, google_api_key) -> dict:
-    """Usa Tavily para buscar y Gemini para extraer las dimensiones."""
-    tavily_client = TavilyClient(api_key=tavily_api_key)
+def extraer_datos_con_gemini_lote(productos: list[tuple], gemini) -> dict:
+    """
+    Usa Gemini para extraer las dimensiones de varios productos en un único pedido.
+
+    Args:
+        productos: Lista de tuplas (invoice_id, nombre_producto, contexto).
+
+    Returns:
+        Un diccionario {invoice_id: datos} con las entradas que vinieron en la
+        respuesta. Los productos ausentes o con una respuesta ilegible no aparecen,
+        para que quien llama los reintente de a uno.
+
+    Raises:
+        ErrorProveedor: Si un error pasajero (429, timeout, red) persiste tras los reintentos.
+    """
+    bloques = "\n".join(
+        f"""
+    Producto invoice_id={invoice_id}: "{nombre_producto}"
+    Contexto:
+    ---
+    {contexto}
+    ---
+    """
+        for invoice_id, nombre_producto, contexto in productos
+    )
+    prompt = f"""
+    A continuación hay {len(productos)} productos, cada uno con su invoice_id y su contexto de búsqueda.
+    Para cada producto extrae el alto, ancho, largo y peso.
+
+    - Si encuentras las dimensiones exactas, úsalas.
+    - Si no las encuentras, busca dimensiones de productos muy similares mencionados en el contexto.
+    - Devuelve los valores como números flotantes (float).
+    - Tu respuesta DEBE ser únicamente un arreglo JSON con un objeto por producto, con las claves
+      "invoice_id", "alto", "ancho", "largo", "peso" y "fuente". El "invoice_id" debe ser exactamente el indicado.
+    - En la clave "fuente" indica de que pagina web o fuente obtuviste la información.
+    - Si no encuentras la fuente, pon "desconocida".
+    - Si no puedes determinar alguno de los valores, intenta predecirlo basado en productos similares. determina que tipo de producto es y busca dimensiones típicas.
+    - Selecciona la opción más representativa y confiable, utiliza las medidas que a veces suelen estar en el nombre de la publicación o en las imagenes. 
+    - Sé especialmente ágil y eficiente al estimar medidas y **sobretodo** peso físico.
+    {bloques}
+    """
+
+    try:
+        texto = obtener_limitador("gemini").ejecutar(gemini.generar, prompt)
+        json_text = texto.strip().replace("```json", "").replace("```", "")
+        respuesta = json.loads(json_text)
+    except ErrorProveedor as e:
+        if e.reintentable:
+            raise
+        print(f"  - ❌ Error al consultar Gemini en lote: {e}")
+        return {}
+    except (json.JSONDecodeError, Exception) as e:
+        print(f"  - Error al procesar la respuesta en lote de Gemini: {e}")
+        return {}
+
+    if not isinstance(respuesta, list):
+        print("  - La respuesta en lote de Gemini no es un arreglo JSON.")
+        return {}
+
+    # El modelo puede devolver el id como texto o como float: se compara como texto.
+    ids_por_texto = {str(invoice_id): invoice_id for invoice_id, _, _ in productos}
+    resultados = {}
+    for entrada in respuesta:
+        if not isinstance(entrada, dict):
+            continue
+        valor = entrada.pop("invoice_id", None)
+        if isinstance(valor, float) and valor.is_integer():
+            valor = int(valor)
+        invoice_id = ids_por_texto.get(str(valor).strip())
+        if invoice_id is not None:
+            entrada['fuente'] = "Tavily + Gemini"
+            resultados[invoice_id] = entrada
+    return resultados
+
+
+def buscar_contexto_tavily(nombre_producto: str, tavily) -> str:
+    """
+    Usa Tavily (un `ClienteTavily` o cualquier objeto con `buscar`) para buscar
+    información del producto. Devuelve el contexto combinado o un string vacío.
+
+    Las llamadas pasan por el limitador de Tavily (ver servicios.limitador).
+
+    Raises:
+        ErrorProveedor: Si un error pasajero (429, timeout, red) persiste tras los reintentos.
+    """
     print(f"\n🔎 Buscando con Tavily: '{nombre_producto}'...")
-    
+
     try:
         # Búsqueda avanzada con Tavily
-        search_context = tavily_client.search(
-            query=f'dimensions (height, width, length, weight) for product "{nombre_producto}"',
-            search_depth="advanced" # Búsqueda más profunda
+        resultados = obtener_limitador("tavily").ejecutar(
+            tavily.buscar,
+            f'dimensions (height, width, length, weight) for product "{nombre_producto}"',
+            profundidad="advanced" # Búsqueda más profunda
         )
-        
-        # Combinamos los resultados para dárselos a Gemini
-        contexto_combinado = "\n".join([str(res) for res in search_context['results']])
-        
-        if not contexto_combinado:
-            print("  - Tavily no devolvió resultados.")
-            return {}
-            
-        print("  - Resultados de Tavily obtenidos. Extrayendo con Gemini...")
-        datos_extraidos = extraer_datos_con_gemini(contexto_combinado, nombre_producto, google_api_key)
-        
-        if datos_extraidos:
-            print("  - ✅ ¡Extracción con Gemini exitosa!")
-            datos_extraidos['fuente'] = "Tavily + Gemini"
-            return datos_extraidos
-        else:
-            print("  - 🟡 Gemini no pudo extraer los datos del contexto.")
-            return {}
-
-    except Exception as e:
+    except ErrorProveedor as e:
+        if e.reintentable:
+            raise
         print(f"  - ❌ Error durante la búsqueda con Tavily: {e}")
+        return ""
+
+    # Combinamos los resultados para dárselos a Gemini
+    contexto_combinado = "\n".join([str(res) for res in resultados])
+    if not contexto_combinado:
+        print("  - Tavily no devolvió resultados.")
+    return contexto_combinado
+
+
+def buscar_dimensiones_producto(nombre_producto: str, clientes: ClientesProveedores) -> dict:
+    """Usa Tavily para buscar y Gemini para extraer las dimensiones."""
+    contexto_combinado = buscar_contexto_tavily(nombre_producto, clientes.tavily)
+    if not contexto_combinado:
+        return {}
+
+    print("  - Resultados de Tavily obtenidos. Extrayendo con Gemini...")
+    datos_extraidos = extraer_datos_con_gemini(contexto_combinado, nombre_producto, clientes.gemini)
+
+    if datos_extraidos:
+        print("  - ✅ ¡Extracción con Gemini exitosa!")
+        datos_extraidos['fuente'] = "Tavily + Gemini"
+        return datos_extraidos
+    else:
+        print("  - 🟡 Gemini no pudo extraer los datos del contexto.")
         return {}
     
\ No newline at end of file
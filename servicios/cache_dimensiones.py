@@ -0,0 +1,129 @@
+import os
+import re
+import json
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from servicios.pydantic_model import ProductDimensions
+from servicios.metricas import metricas
+
+# Ruta por defecto del archivo SQLite donde se guardan las dimensiones ya resueltas.
+RUTA_CACHE_DEFAULT = os.path.join(".cache", "dimensiones.sqlite")
+# Días que una entrada se considera válida antes de volver a buscarla en la web.
+TTL_DIAS_DEFAULT = 180
+# Cantidad máxima de productos guardados; al superarla se eliminan los menos usados.
+MAX_ENTRADAS_DEFAULT = 50000
+
+
+def normaliza_nombre(nombre: str) -> str:
+    """
+    Normaliza el nombre de un producto para usarlo como clave del caché.
+
+    Pasa a minúsculas, quita acentos y caracteres extraños, y colapsa espacios,
+    de modo que variantes triviales del mismo título compartan la entrada.
+    """
+    texto = unicodedata.normalize("NFKD", str(nombre))
+    texto = texto.encode("ascii", "ignore").decode("ascii").lower()
+    texto = re.sub(r"[^a-z0-9.&/]+", " ", texto)
+    return " ".join(texto.split())
+
+
+class CacheDimensiones:
+    """
+    Caché persistente (SQLite) de dimensiones de producto validadas.
+
+    Guarda un `ProductDimensions` por nombre normalizado, con la fecha en que se
+    obtuvo y su fuente. Las entradas vencen a los `ttl_dias` y, si se supera
+    `max_entradas`, se eliminan las de acceso más antiguo.
+    Es seguro usarlo desde varios hilos a la vez.
+    """
+
+    def __init__(self, ruta: str | None = None, ttl_dias: int | None = None, max_entradas: int | None = None):
+        self.ruta = ruta or os.getenv("DIMENSIONES_CACHE_PATH", RUTA_CACHE_DEFAULT)
+        self.ttl = timedelta(days=int(ttl_dias or os.getenv("DIMENSIONES_CACHE_TTL_DIAS", TTL_DIAS_DEFAULT)))
+        self.max_entradas = int(max_entradas or os.getenv("DIMENSIONES_CACHE_MAX", MAX_ENTRADAS_DEFAULT))
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._conn = sqlite3.connect(self.ruta, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dimensiones (
+                    nombre_normalizado TEXT PRIMARY KEY,
+                    dimensiones TEXT NOT NULL,
+                    fuente TEXT,
+                    creado TEXT NOT NULL,
+                    ultimo_acceso TEXT NOT NULL
+                )
+                """
+            )
+            # El desalojo se hace al abrir el caché y no en cada escritura,
+            # para no recorrer la tabla por cada producto guardado.
+            self._desalojar()
+
+    def obtener(self, nombre_producto: str) -> ProductDimensions | None:
+        """Devuelve las dimensiones guardadas para el producto, o None si no están o vencieron."""
+        clave = normaliza_nombre(nombre_producto)
+        ahora = datetime.now()
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT dimensiones, creado FROM dimensiones WHERE nombre_normalizado = ?",
+                (clave,),
+            ).fetchone()
+            if fila is None or datetime.fromisoformat(fila[1]) < ahora - self.ttl:
+                self.fallos += 1
+                metricas.suma("cache_dimensiones", resultado="fallo")
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE dimensiones SET ultimo_acceso = ? WHERE nombre_normalizado = ?",
+                    (ahora.isoformat(), clave),
+                )
+            self.aciertos += 1
+        metricas.suma("cache_dimensiones", resultado="acierto")
+        return ProductDimensions(**json.loads(fila[0]))
+
+    def guardar(self, nombre_producto: str, producto: ProductDimensions):
+        """Guarda (o reemplaza) las dimensiones validadas de un producto."""
+        clave = normaliza_nombre(nombre_producto)
+        ahora = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO dimensiones
+                    (nombre_normalizado, dimensiones, fuente, creado, ultimo_acceso)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (clave, producto.model_dump_json(), str(producto.fuente), ahora, ahora),
+            )
+
+    def _desalojar(self):
+        """Elimina entradas vencidas y, si sobran, las de acceso más antiguo."""
+        limite = (datetime.now() - self.ttl).isoformat()
+        self._conn.execute("DELETE FROM dimensiones WHERE creado < ?", (limite,))
+        self._conn.execute(
+            """
+            DELETE FROM dimensiones WHERE nombre_normalizado IN (
+                SELECT nombre_normalizado FROM dimensiones
+                ORDER BY ultimo_acceso DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entradas,),
+        )
+
+    def resumen(self) -> str:
+        """Texto con los aciertos y fallos acumulados desde que se creó el caché."""
+        total = self.aciertos + self.fallos
+        tasa = (self.aciertos / total * 100) if total else 0
+        return f"Caché de dimensiones: {self.aciertos} aciertos, {self.fallos} fallos ({tasa:.1f}% de aciertos)"
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
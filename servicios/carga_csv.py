@@ -1,84 +1,225 @@
 import os
-import csv
-from dotenv import load_dotenv
-from google.cloud.sql.connector import Connector
-import sqlalchemy
+import time
+import hashlib
+import threading
+from datetime import datetime
+import pandas as pd
+from servicios import archivos
+from servicios.archivos import Origen
+from servicios.db.conexion import obtener_engine
+from servicios.db.upsert import ejecuta_upsert
+from servicios.db.esquema import invoices_table
+from servicios.extrae_csv import ReporteCsv, codificacion_csv, tipa_invoices
+from servicios.metricas import metricas
 from sqlalchemy import (
     Table,
     Column,
     String,
     Integer,
-    Numeric,
+    DateTime,
     MetaData,
-    Text,
+    select,
 )
 
-def carga_invoices(csv_path):
-    """Función para cargar datos desde un CSV a la tabla 'invoices' en Cloud SQL."""
+# Filas que se leen, convierten e insertan por transacción.
+TAMANO_CHUNK_DEFAULT = 2000
+# Bloque de lectura al revisar la codificación del archivo.
+BLOQUE_LECTURA = 1024 * 1024
 
-    # initialize Connector object
-    connector = Connector()
+# Columnas que identifican un envío: un mismo envío no se carga dos veces.
+CLAVE_INVOICE = ('periodo', 'proveedor', 'track_code')
 
-    load_dotenv()
+# Registro de los archivos ya cargados, identificados por el hash de su contenido.
+_metadata_cargas = MetaData()
+cargas_csv_table = Table(
+    "cargas_csv",
+    _metadata_cargas,
+    Column("hash_sha256", String(64), primary_key=True),
+    Column("nombre_archivo", String(255)),
+    Column("filas", Integer, nullable=False),
+    Column("fecha_carga", DateTime, nullable=False),
+)
+
+# 'cargas_csv' se crea (si falta) una sola vez por proceso.
+_cargas_creada = False
+_lock = threading.Lock()
+
+
+def _tabla_invoices(db_conn) -> Table:
+    # La estructura de 'invoices' es la de servicios.db.esquema: no se refleja
+    # de la base, así no depende de la reflexión de cada motor (DuckDB no la soporta completa).
+    global _cargas_creada
+    with _lock:
+        if not _cargas_creada:
+            _metadata_cargas.create_all(db_conn, checkfirst=True)
+            db_conn.commit()
+            _cargas_creada = True
+        return invoices_table
+
+
+def hash_archivo(csv_path: Origen) -> str:
+    """Calcula el SHA-256 del contenido del archivo, leyéndolo por bloques."""
+    if not archivos.es_ruta(csv_path):
+        return hashlib.sha256(archivos.lee_contenido(csv_path)).hexdigest()
+    sha = hashlib.sha256()
+    with open(csv_path, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _upsert(db_conn, tabla: Table, filas: list[dict]):
+    """
+    Upsert de un bloque sobre la clave (periodo, proveedor, track_code). MySQL
+    no escribe las filas cuyos valores no cambiaron, así que una recarga
+    parcial solo toca lo modificado.
+    """
+    columnas = [c for c in filas[0] if c not in CLAVE_INVOICE and c != 'id']
+    ejecuta_upsert(db_conn, tabla, filas, CLAVE_INVOICE, columnas)
+
+
+def _filas(df) -> list[dict]:
+    """Las filas de un DataFrame ya tipado como dicts, con NaN/NA como NULL."""
+    df = df.astype(object)
+    return df.where(df.notna(), None).to_dict(orient='records')
+
+
+def _tipa_bloque(bloque) -> tuple:
+    """
+    Tipa un bloque leído como texto. Si algún valor no se puede convertir, se
+    tipa fila por fila y se descartan solo las filas con valores inválidos.
+    """
+    try:
+        return tipa_invoices(bloque), 0
+    except ValueError:
+        pass
+    validas = []
+    for posicion in range(len(bloque)):
+        try:
+            validas.append(tipa_invoices(bloque.iloc[[posicion]]))
+        except ValueError as e:
+            # +2: la fila 1 del archivo es el encabezado.
+            print(f"⚠️ Advertencia: La fila {bloque.index[posicion] + 2} tiene un valor inválido ({e}). Se ignorará.")
+    if not validas:
+        return tipa_invoices(bloque.iloc[:0]), len(bloque)
+    return pd.concat(validas), len(bloque) - len(validas)
 
-    db_user = os.getenv('DB_USER')
-    db_pass = os.getenv('DB_PASSWORD')
-    db_instance = os.getenv('INSTANCE_CONNECTION_NAME')
-    db_name = os.getenv('DB_NAME')
 
-    # function to return the database connection object
-    def getconn():
-        conn = connector.connect(
-            db_instance,
-            "pymysql",
-            user=db_user,
-            password=db_pass,
-            db=db_name
-        )
-        return conn
+def _bloques_desde_archivo(csv_path: Origen, tamano_chunk: int):
+    """
+    Lee el CSV en bloques y devuelve, por bloque, (filas convertidas, filas descartadas).
 
-    # create connection pool with 'creator' argument to our connection object function
-    pool = sqlalchemy.create_engine(
-        "mysql+pymysql://",
-        creator=getconn,
-    )
+    La codificación y los tipos son los de `extrae_csv.lee_csv_invoices`, así
+    cargar desde la ruta o desde el ReporteCsv inserta exactamente lo mismo.
+    """
+    with archivos.abre_binario(csv_path) as binario:
+        codificacion = codificacion_csv(iter(lambda: binario.read(BLOQUE_LECTURA), b''))
+        binario.seek(0)
+        lector = pd.read_csv(binario, encoding=codificacion, dtype=str, keep_default_na=False,
+                             index_col=False, chunksize=tamano_chunk)
+        with lector:
+            for bloque in lector:
+                df, descartadas = _tipa_bloque(bloque)
+                yield _filas(df), descartadas
+
+
+def _bloques_desde_reporte(reporte: ReporteCsv, tamano_chunk: int):
+    """Recorre el DataFrame ya tipado del reporte en bloques, con NaN/NA como NULL."""
+    for inicio in range(0, len(reporte.df), tamano_chunk):
+        yield _filas(reporte.df.iloc[inicio:inicio + tamano_chunk]), 0
+
+
+def carga_invoices(origen, tamano_chunk: int | None = None) -> int:
+    """
+    Función para cargar datos desde un CSV a la tabla 'invoices' en Cloud SQL.
+
+    Args:
+        origen: La ruta al CSV, su contenido o el archivo ya abierto (ver
+                `servicios.archivos`), o el `ReporteCsv` que ya se leyó para
+                comparar totales (así no se vuelve a parsear el archivo).
+        tamano_chunk: Filas por bloque. Si es None se toma de CARGA_CHUNK_SIZE.
+
+    Cada bloque de `tamano_chunk` filas se convierte a los tipos de la tabla,
+    se inserta con un único INSERT de varias filas (VALUES (...), (...)) y se
+    confirma. Desde una ruta, el archivo se lee por bloques y la memoria usada
+    no depende de su tamaño.
+
+    La carga es idempotente: un archivo cuyo hash ya figura en 'cargas_csv' se
+    omite, y las filas se insertan con upsert sobre (periodo, proveedor, track_code).
+
+    Returns:
+        La cantidad de registros insertados o actualizados (0 si el archivo ya se había cargado).
+
+    Raises:
+        Exception: El error de lectura o de la base que cortó la carga. Los
+            bloques ya confirmados quedan en la tabla, pero el archivo no se
+            registra en 'cargas_csv' y se vuelve a cargar la próxima vez.
+    """
+    if tamano_chunk is None:
+        tamano_chunk = int(os.getenv('CARGA_CHUNK_SIZE', TAMANO_CHUNK_DEFAULT))
+    tamano_chunk = max(1, tamano_chunk)
+
+    pool = obtener_engine()
+    insertadas = 0
+    descartadas = 0
+    inicio = time.perf_counter()
 
     try:
         with pool.connect() as db_conn:
-            metadata = MetaData()
+            invoices_table = _tabla_invoices(db_conn)
 
-            invoices_table = Table('invoices', metadata, autoload_with=db_conn)
+            if isinstance(origen, ReporteCsv):
+                hash_csv = origen.hash_sha256
+                nombre_archivo = origen.nombre_archivo
+                bloques = _bloques_desde_reporte(origen, tamano_chunk)
+            else:
+                hash_csv = hash_archivo(origen)
+                nombre_archivo = archivos.nombre(origen)
+                bloques = _bloques_desde_archivo(origen, tamano_chunk)
+
+            ya_cargado = db_conn.execute(
+                select(cargas_csv_table.c.fecha_carga).where(cargas_csv_table.c.hash_sha256 == hash_csv)
+            ).first()
+            if ya_cargado:
+                print(f"ℹ️ Este archivo ya se cargó el {ya_cargado[0]}. Se omite la carga.")
+                return 0
 
-            # Definimos la tabla "invoices"
             # --- Carga de Datos desde el CSV ---
-            print("Insertando datos desde invoices.csv...")
-            with open(csv_path, mode='r', encoding='utf-8-sig') as csvfile:
-                reader = csv.DictReader(csvfile)
-                
-                clean_rows = []
-                # Iteramos fila por fila para un mejor control de errores
-                for row_num, row in enumerate(reader, 1):
-                    clean_row = {}
-                    for k, v in row.items():
-                        # ¡IMPORTANTE! Ignoramos columnas sin nombre (causa del error)
-                        if k is None:
-                            print(f"⚠️ Advertencia: Se encontró una columna extra sin nombre en la fila {row_num}. Se ignorará.")
-                            continue
-                        clean_row[k.lower()] = v
-                    clean_rows.append(clean_row)
-
-                # Ejecutamos la inserción de todos los datos
+            print(f"Insertando datos desde {nombre_archivo}...")
+            for clean_rows, descartadas_bloque in bloques:
+                descartadas += descartadas_bloque
+                if descartadas_bloque:
+                    metricas.suma("filas_descartadas", descartadas_bloque)
                 if clean_rows:
-                    db_conn.execute(invoices_table.insert(), clean_rows)
-                    db_conn.commit()
-                    print(f"✅ ¡Se han insertado {len(clean_rows)} registros en la tabla!")
-                else:
-                    print("No se encontraron datos en el CSV.")
+                    with metricas.span("carga_db"):
+                        _upsert(db_conn, invoices_table, clean_rows)
+                        db_conn.commit()
+                    insertadas += len(clean_rows)
+                    metricas.suma("filas_cargadas", len(clean_rows))
+
+            # Se registra el archivo solo cuando se cargó completo.
+            db_conn.execute(cargas_csv_table.insert().values(
+                hash_sha256=hash_csv,
+                nombre_archivo=nombre_archivo[:255],
+                filas=insertadas,
+                fecha_carga=datetime.now(),
+            ))
+            db_conn.commit()
+
+            duracion = time.perf_counter() - inicio
+            if insertadas:
+                print(f"✅ ¡Se han insertado o actualizado {insertadas} registros en la tabla! "
+                      f"({duracion:.1f} s, {insertadas / duracion:,.0f} filas/s)")
+            else:
+                print("No se encontraron datos en el CSV.")
+            if descartadas:
+                print(f"⚠️ Se descartaron {descartadas} filas con valores inválidos.")
 
     except Exception as e:
         print(f"Ocurrió un error: {e}")
+        if insertadas:
+            print(f"Se llegaron a confirmar {insertadas} registros antes del error.")
+        # Quien llama tiene que enterarse: una carga a medias no es una carga terminada.
+        raise
 
-    finally:
-        if 'connector' in locals():
-            connector.close()
-        print("Conexión cerrada.")
+    return insertadas
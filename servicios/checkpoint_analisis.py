@@ -0,0 +1,124 @@
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import (
+    Table,
+    Column,
+    String,
+    Integer,
+    Double,
+    DateTime,
+    MetaData,
+    Text,
+    select,
+    delete,
+)
+from servicios.db.conexion import obtener_engine
+from servicios.db.upsert import ejecuta_upsert
+
+# Filas que se acumulan en memoria antes de escribirlas en la base.
+TAMANO_ESCRITURA_DEFAULT = 25
+
+# Estados posibles de una fila analizada.
+OK = "ok"
+SIN_DIMENSIONES = "sin_dimensiones"
+SIN_TARIFA = "sin_tarifa"
+ERROR = "error"
+# Los errores inesperados (red, cuota, etc.) se vuelven a intentar al reanudar.
+ESTADOS_TERMINADOS = (OK, SIN_DIMENSIONES, SIN_TARIFA)
+
+COLUMNAS_RESULTADO = (
+    'alto', 'ancho', 'largo', 'peso_aforado', 'peso_fisico', 'peso_facturable',
+    'tarifa_real', 'diferencia',
+)
+
+_metadata = MetaData()
+analisis_filas_table = Table(
+    "analisis_filas",
+    _metadata,
+    Column("invoice_id", Integer, primary_key=True, autoincrement=False),
+    Column("periodo", Integer, nullable=False, index=True),
+    Column("estado", String(20), nullable=False),
+    # Con precisión completa: al reanudar, las filas restauradas valen lo mismo que las recalculadas.
+    *[Column(columna, Double) for columna in COLUMNAS_RESULTADO],
+    Column("motivo", Text),
+    Column("actualizado", DateTime, nullable=False),
+)
+
+_tabla_creada = False
+_lock_tabla = threading.Lock()
+
+
+def _asegura_tabla(db_conn):
+    global _tabla_creada
+    with _lock_tabla:
+        if not _tabla_creada:
+            _metadata.create_all(db_conn, checkfirst=True)
+            db_conn.commit()
+            _tabla_creada = True
+
+
+class CheckpointAnalisis:
+    """
+    Guarda en la tabla 'analisis_filas' el resultado de cada fila de un análisis
+    mientras corre, en escrituras de a `tamano_escritura` filas.
+
+    Si el proceso se corta, `guardados()` indica qué invoices ya se resolvieron
+    para no volver a pagar sus búsquedas en Tavily/Gemini.
+    """
+
+    def __init__(self, periodo, tamano_escritura: int | None = None):
+        self.periodo = int(periodo)
+        self.tamano_escritura = max(1, int(tamano_escritura or os.getenv('CHECKPOINT_BATCH_SIZE', TAMANO_ESCRITURA_DEFAULT)))
+        self._pendientes = []
+        self._lock = threading.Lock()
+        with obtener_engine().connect() as db_conn:
+            _asegura_tabla(db_conn)
+
+    def reiniciar(self):
+        """Borra los resultados guardados del periodo para empezar un análisis desde cero."""
+        with self._lock, obtener_engine().connect() as db_conn:
+            db_conn.execute(delete(analisis_filas_table).where(analisis_filas_table.c.periodo == self.periodo))
+            db_conn.commit()
+            self._pendientes = []
+
+    def guardados(self) -> dict:
+        """Devuelve {invoice_id: fila guardada} con las filas ya terminadas del periodo."""
+        with obtener_engine().connect() as db_conn:
+            result = db_conn.execute(
+                select(analisis_filas_table).where(
+                    analisis_filas_table.c.periodo == self.periodo,
+                    analisis_filas_table.c.estado.in_(ESTADOS_TERMINADOS),
+                )
+            )
+            return {fila.invoice_id: fila._asdict() for fila in result}
+
+    def registra(self, resultado: dict):
+        """Agrega el resultado de una fila; se escribe cuando se junta un bloque."""
+        fila = {
+            'invoice_id': int(resultado['invoice_id']),
+            'periodo': self.periodo,
+            'estado': resultado.get('estado', OK),
+            'motivo': resultado.get('motivo'),
+            'actualizado': datetime.now(),
+        }
+        for columna in COLUMNAS_RESULTADO:
+            fila[columna] = resultado.get(columna)
+        with self._lock:
+            self._pendientes.append(fila)
+            if len(self._pendientes) >= self.tamano_escritura:
+                self._escribe()
+
+    def vaciar(self):
+        """Escribe las filas que quedaron pendientes."""
+        with self._lock:
+            self._escribe()
+
+    def _escribe(self):
+        if not self._pendientes:
+            return
+        columnas = [c.name for c in analisis_filas_table.columns if c.name != 'invoice_id']
+        with obtener_engine().connect() as db_conn:
+            ejecuta_upsert(db_conn, analisis_filas_table, self._pendientes, ('invoice_id',), columnas)
+            db_conn.commit()
+        self._pendientes = []
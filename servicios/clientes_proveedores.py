@@ -0,0 +1,221 @@
+import os
+import atexit
+import threading
+from dataclasses import dataclass
+import requests
+from requests.adapters import HTTPAdapter
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from dotenv import load_dotenv
+from servicios.metricas import metricas
+
+MODELO_GEMINI = 'gemini-2.5-flash'
+TAVILY_URL_DEFAULT = "https://api.tavily.com"
+# Segundos de espera máximos por llamada (se pueden ajustar por variables de entorno).
+TAVILY_TIMEOUT_DEFAULT = 30
+GEMINI_TIMEOUT_DEFAULT = 60
+# Conexiones keep-alive que conserva la sesión HTTP de Tavily.
+CONEXIONES_HTTP = 32
+
+# Tipos de error de los proveedores.
+TIMEOUT = "timeout"
+RED = "red"
+LIMITE = "limite"                # 429: demasiados pedidos por unidad de tiempo
+CUOTA = "cuota"                  # cuota del plan agotada
+AUTENTICACION = "autenticacion"
+SOLICITUD = "solicitud"
+SERVIDOR = "servidor"
+RESPUESTA = "respuesta"          # la respuesta llegó pero no se puede usar
+# Errores pasajeros: el mismo pedido puede funcionar si se repite más tarde.
+TIPOS_REINTENTABLES = (TIMEOUT, RED, LIMITE, SERVIDOR)
+
+
+class ErrorProveedor(Exception):
+    """Falla de una llamada a Tavily o Gemini, clasificada para decidir si conviene reintentarla."""
+
+    def __init__(self, proveedor: str, tipo: str, mensaje: str, codigo: int | None = None,
+                 espera: float | None = None):
+        super().__init__(f"{proveedor} ({tipo}{f' {codigo}' if codigo else ''}): {mensaje}")
+        self.proveedor = proveedor
+        self.tipo = tipo
+        self.codigo = codigo
+        # Segundos que el proveedor pidió esperar antes de reintentar (Retry-After).
+        self.espera = espera
+
+    @property
+    def reintentable(self) -> bool:
+        return self.tipo in TIPOS_REINTENTABLES
+
+
+def _tipo_por_codigo(codigo: int | None) -> str:
+    if codigo == 429:
+        return LIMITE
+    if codigo in (432, 433):
+        return CUOTA
+    if codigo in (401, 403):
+        return AUTENTICACION
+    if codigo in (408, 504):
+        return TIMEOUT
+    if codigo is not None and codigo >= 500:
+        return SERVIDOR
+    if codigo is not None and codigo >= 400:
+        return SOLICITUD
+    return RESPUESTA
+
+
+def _retry_after(respuesta) -> float | None:
+    try:
+        return float(respuesta.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ClienteTavily:
+    """
+    Cliente de la búsqueda de Tavily sobre una única sesión HTTP.
+
+    Todas las búsquedas del proceso reutilizan las conexiones keep-alive de la
+    sesión, en vez de abrir una conexión TLS nueva por producto.
+    """
+
+    def __init__(self, api_key: str | None, timeout: float | None = None, url: str | None = None):
+        self.timeout = float(timeout or os.getenv('TAVILY_TIMEOUT', TAVILY_TIMEOUT_DEFAULT))
+        self.url = (url or os.getenv('TAVILY_API_URL') or TAVILY_URL_DEFAULT).rstrip("/")
+        self._sesion = requests.Session()
+        self._sesion.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        })
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=CONEXIONES_HTTP)
+        self._sesion.mount("https://", adaptador)
+        self._sesion.mount("http://", adaptador)
+
+    def buscar(self, consulta: str, profundidad: str = "advanced") -> list[dict]:
+        """
+        Devuelve los resultados de la búsqueda.
+
+        Raises:
+            ErrorProveedor: Si la búsqueda falla por red, tiempo, cuota o respuesta inválida.
+        """
+        try:
+            with metricas.span("tavily"):
+                respuesta = self._sesion.post(
+                    f"{self.url}/search",
+                    json={"query": consulta, "search_depth": profundidad},
+                    timeout=self.timeout,
+                )
+        except requests.Timeout as e:
+            raise ErrorProveedor("tavily", TIMEOUT, f"sin respuesta en {self.timeout:.0f}s") from e
+        except requests.RequestException as e:
+            raise ErrorProveedor("tavily", RED, str(e)) from e
+
+        metricas.suma("bytes_enviados", len(respuesta.request.body or b""), proveedor="tavily")
+        metricas.suma("bytes_recibidos", len(respuesta.content), proveedor="tavily")
+        if respuesta.status_code != 200:
+            detalle = respuesta.text[:200]
+            try:
+                detalle = respuesta.json().get("detail", {}).get("error") or detalle
+            except Exception:
+                pass
+            raise ErrorProveedor("tavily", _tipo_por_codigo(respuesta.status_code), detalle,
+                                 respuesta.status_code, _retry_after(respuesta))
+        try:
+            return respuesta.json()["results"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise ErrorProveedor("tavily", RESPUESTA, f"respuesta inesperada: {e}") from e
+
+    def cerrar(self):
+        self._sesion.close()
+
+
+class ClienteGemini:
+    """
+    Cliente de Gemini con el modelo creado una sola vez.
+
+    `genai.configure` es global al proceso, así que también se llama una sola vez.
+    """
+
+    def __init__(self, api_key: str | None, modelo: str = MODELO_GEMINI,
+                 timeout: float | None = None, endpoint: str | None = None):
+        self.timeout = float(timeout or os.getenv('GEMINI_TIMEOUT', GEMINI_TIMEOUT_DEFAULT))
+        endpoint = endpoint or os.getenv('GEMINI_API_ENDPOINT')
+        if endpoint:
+            # Un endpoint propio (por ejemplo, un servidor local de pruebas) solo habla REST.
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        self._modelo = genai.GenerativeModel(modelo)
+
+    def generar(self, prompt: str) -> str:
+        """
+        Devuelve el texto generado para el prompt.
+
+        Raises:
+            ErrorProveedor: Si el pedido falla o la respuesta no trae texto.
+        """
+        metricas.suma("bytes_enviados", len(prompt.encode("utf-8")), proveedor="gemini")
+        try:
+            with metricas.span("gemini"):
+                respuesta = self._modelo.generate_content(prompt, request_options={"timeout": self.timeout})
+        except google_exceptions.GoogleAPICallError as e:
+            # Los errores de google.api_core traen el código HTTP en `code`.
+            codigo = e.code if isinstance(e.code, int) else None
+            tipo = _tipo_por_codigo(codigo) if codigo is not None else SERVIDOR
+            raise ErrorProveedor("gemini", tipo, str(e), codigo) from e
+        except (TimeoutError, requests.Timeout, google_exceptions.RetryError) as e:
+            raise ErrorProveedor("gemini", TIMEOUT, f"sin respuesta en {self.timeout:.0f}s") from e
+        except (ConnectionError, requests.RequestException) as e:
+            raise ErrorProveedor("gemini", RED, str(e)) from e
+        # Cualquier otra excepción es un error de programación: se propaga tal cual, sin reintentos.
+        uso = getattr(respuesta, "usage_metadata", None)
+        metricas.suma("tokens_enviados", getattr(uso, "prompt_token_count", 0) or 0, proveedor="gemini")
+        metricas.suma("tokens_recibidos", getattr(uso, "candidates_token_count", 0) or 0, proveedor="gemini")
+        try:
+            return respuesta.text
+        except ValueError as e:
+            # Respuesta bloqueada o sin candidatos.
+            raise ErrorProveedor("gemini", RESPUESTA, str(e)) from e
+
+
+@dataclass
+class ClientesProveedores:
+    """Clientes de los proveedores externos que usa el análisis."""
+    tavily: ClienteTavily
+    gemini: ClienteGemini
+
+
+_clientes = None
+_lock = threading.Lock()
+
+
+def obtener_clientes() -> ClientesProveedores:
+    """
+    Devuelve los clientes de Tavily y Gemini compartidos por todo el proceso.
+
+    Se crean la primera vez que se los pide, con las API keys del entorno, y
+    se reutilizan en las llamadas siguientes.
+    """
+    global _clientes
+    if _clientes is not None:
+        return _clientes
+
+    with _lock:
+        if _clientes is None:
+            load_dotenv()
+            _clientes = ClientesProveedores(
+                tavily=ClienteTavily(os.getenv("TAVILY_API_KEY")),
+                gemini=ClienteGemini(os.getenv("GOOGLE_API_KEY")),
+            )
+    return _clientes
+
+
+def cerrar_clientes():
+    """Cierra la sesión HTTP compartida. Se registra para ejecutarse al salir del proceso."""
+    global _clientes
+    with _lock:
+        if _clientes is not None:
+            _clientes.tavily.cerrar()
+            _clientes = None
+
+
+atexit.register(cerrar_clientes)
@@ -12,7 +12,8 @@ def compara_totales(total_pdf, df_csv):
         print("❌ No se puede comparar porque uno de los valores es None.")
         return
 
-    total_csv = float(df_csv['tarifa'].sum())
+    # Se redondea a centavos para que errores de punto flotante no rompan la igualdad.
+    total_csv = round(float(df_csv['tarifa'].sum()), 2)
 
     print(f"Total extraído del PDF: {total_pdf}")
     print(f"Total calculado del CSV: {total_csv}")
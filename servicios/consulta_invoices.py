@@ -1,51 +1,105 @@
 import os
-from dotenv import load_dotenv
+from typing import Iterator
 import pandas as pd
-from google.cloud.sql.connector import Connector
 import sqlalchemy
+from servicios.db.conexion import obtener_engine
+from servicios.db.esquema import invoices_table
+from servicios.metricas import metricas
 
-# initialize Connector object
-connector = Connector()
-
-load_dotenv()
-
-db_host = os.getenv('DB_HOST')
-db_port = os.getenv('DB_PORT')
-db_user = os.getenv('DB_USER')
-db_pass = os.getenv('DB_PASSWORD')
-db_instance = os.getenv('INSTANCE_CONNECTION_NAME')
-db_name = os.getenv('DB_NAME')
-
-def trae_invoices(periodo):
-
-# function to return the database connection object
-    def getconn():
-        conn = connector.connect(
-            db_instance,
-            "pymysql",
-            user=db_user,
-            password=db_pass,
-            db=db_name
-        )
-        return conn
-
-    # create connection pool with 'creator' argument to our connection object function
-    pool = sqlalchemy.create_engine(
-        "mysql+pymysql://",
-        creator=getconn,
+# Columnas de 'invoices' que usa el análisis (búsqueda, tarifa y triage).
+COLUMNAS_ANALISIS = (
+    'id', 'proveedor', 'track_code', 'ambito', 'tipo_servicio', 'name', 'category',
+    'alto', 'ancho', 'largo', 'peso_aforado', 'peso_fisico', 'tarifa',
+)
+# Filas por bloque al leer un periodo.
+TAMANO_BLOQUE_DEFAULT = 5000
+
+
+def cuenta_invoices(periodo) -> int:
+    """Cantidad de invoices del periodo."""
+    pool = obtener_engine()
+    with metricas.span("consulta_invoices"), pool.connect() as db_conn:
+        return db_conn.execute(
+            sqlalchemy.select(sqlalchemy.func.count())
+            .select_from(invoices_table)
+            .where(invoices_table.c.periodo == int(periodo))
+        ).scalar_one()
+
+
+def itera_invoices(periodo, columnas=COLUMNAS_ANALISIS, tamano_bloque: int | None = None) -> Iterator[pd.DataFrame]:
+    """
+    Devuelve las invoices del periodo como DataFrames de a `tamano_bloque` filas.
+
+    La consulta es parametrizada, trae solo `columnas` (None para todas) en
+    orden de id y se pagina por id (`id > último id leído ... LIMIT`): cada
+    bloque es una consulta corta con su propia conexión, que vuelve al pool
+    antes de entregar el bloque. Así quien consume puede tardar lo que
+    necesite entre bloques sin dejar un cursor abierto en el servidor (MySQL
+    lo corta con net_write_timeout) ni una conexión tomada.
+
+    Args:
+        periodo: El periodo (AAAAMM).
+        columnas: Columnas de 'invoices' a traer.
+        tamano_bloque: Filas por bloque. Si es None se toma de INVOICES_CHUNK_SIZE.
+    """
+    if tamano_bloque is None:
+        tamano_bloque = int(os.getenv('INVOICES_CHUNK_SIZE', TAMANO_BLOQUE_DEFAULT))
+    tamano_bloque = max(1, tamano_bloque)
+    columnas = list(columnas) if columnas is not None else list(invoices_table.c.keys())
+    # El id hace de cursor de la paginación: se trae aunque no se lo pida.
+    consultadas = columnas if 'id' in columnas else columnas + ['id']
+    consulta = (
+        sqlalchemy.select(*(invoices_table.c[c] for c in consultadas))
+        .where(invoices_table.c.periodo == int(periodo))
+        # Sin ORDER BY cada motor devuelve las filas en el orden de su índice
+        # (SQLite, por ejemplo, en el de la clave única por track_code).
+        .order_by(invoices_table.c.id)
+        .limit(tamano_bloque)
     )
 
+    pool = obtener_engine()
+    ultimo_id = None
+    while True:
+        pagina = consulta if ultimo_id is None else consulta.where(invoices_table.c.id > ultimo_id)
+        with metricas.span("consulta_invoices"), pool.connect() as db_conn:
+            filas = db_conn.execute(pagina).fetchall()
+        if not filas:
+            return
+        metricas.suma("filas_leidas", len(filas), tabla="invoices")
+        bloque = pd.DataFrame(filas, columns=consultadas)
+        ultimo_id = int(bloque['id'].iloc[-1])
+        yield bloque[columnas]
+        if len(filas) < tamano_bloque:
+            return
+
+
+def trae_invoices(periodo, columnas=None) -> pd.DataFrame:
+    """Devuelve las invoices del periodo en un único DataFrame (ver `itera_invoices`)."""
+    bloques = list(itera_invoices(periodo, columnas=columnas))
+    if not bloques:
+        return pd.DataFrame(columns=list(columnas) if columnas is not None else list(invoices_table.c.keys()))
+    return pd.concat(bloques, ignore_index=True)
+
+
+def trae_invoices_con_scales():
+    """
+    Devuelve las invoices de los periodos que ya tienen resultados en 'scales',
+    con la columna booleana 'en_scales' (True si el análisis encontró diferencia).
+    """
+    pool = obtener_engine()
+
     with pool.connect() as db_conn:
-    
-        # query and fetch invoices table
-        result = db_conn.execute(sqlalchemy.text(f"SELECT * FROM invoices WHERE periodo = {periodo}"))
-        columns = result.keys()
-        # 2. Unpack all rows of data
-        rows = result.fetchall()
-    
-    # 3. Create the DataFrame
-        df = pd.DataFrame(rows, columns=columns)
-        
-    connector.close()
-    return df
+        result = db_conn.execute(sqlalchemy.text(
+            """
+            SELECT i.*, s.invoice_id IS NOT NULL AS en_scales
+            FROM invoices i
+            LEFT JOIN (SELECT DISTINCT invoice_id FROM scales) s ON s.invoice_id = i.id
+            WHERE i.periodo IN (
+                SELECT DISTINCT i2.periodo FROM invoices i2 JOIN scales s2 ON s2.invoice_id = i2.id
+            )
+            """
+        ))
+        df = pd.DataFrame(result.fetchall(), columns=result.keys())
 
+    df['en_scales'] = df['en_scales'].astype(bool)
+    return df
@@ -1,55 +1,126 @@
-import os
-from dotenv import load_dotenv
+import threading
+from datetime import date
 import pandas as pd
-from google.cloud.sql.connector import Connector
 import sqlalchemy
+from servicios.db.conexion import obtener_engine
+from servicios.indice_tarifas import TariffIndex
+from servicios.metricas import metricas
 
-# initialize Connector object
-connector = Connector()
-
-load_dotenv()
-
-db_host = os.getenv('DB_HOST')
-db_port = os.getenv('DB_PORT')
-db_user = os.getenv('DB_USER')
-db_pass = os.getenv('DB_PASSWORD')
-db_instance = os.getenv('INSTANCE_CONNECTION_NAME')
-db_name = os.getenv('DB_NAME')
-
-def trae_tarifas():
-
-# function to return the database connection object
-    def getconn():
-        conn = connector.connect(
-            db_instance,
-            "pymysql",
-            user=db_user,
-            password=db_pass,
-            db=db_name
-        )
-        return conn
-
-    # create connection pool with 'creator' argument to our connection object function
-    pool = sqlalchemy.create_engine(
-        "mysql+pymysql://",
-        creator=getconn,
-    )
+# Snapshot tipado del tarifario en memoria y la versión con la que se leyó.
+_snapshot = None
+_version = None
+# Índices ya construidos por periodo para la versión actual del snapshot.
+_indices = {}
+_lock = threading.Lock()
+
+
+def version_tarifario() -> tuple:
+    """
+    Devuelve una firma barata del contenido de 'tarifario'.
+
+    La cantidad de filas y el id máximo cambian ante altas y bajas. Las sumas
+    de tarifa y rangos, ponderadas por id, cambian al editar cualquiera de esos
+    valores en una fila (aunque se intercambien entre filas). De las fechas
+    de vigencia solo entran la mínima y la máxima: si se edita en el lugar una
+    fecha intermedia, hay que llamar a `invalidar_cache_tarifas()`.
+    """
+    pool = obtener_engine()
+    with pool.connect() as db_conn:
+        result = db_conn.execute(sqlalchemy.text(
+            """
+            SELECT COUNT(*), MAX(id), SUM(id * tarifa), SUM(id * rango_desde), SUM(id * rango_hasta),
+                   MIN(fecha_inicio), MAX(fecha_inicio), MIN(fecha_fin), MAX(fecha_fin)
+            FROM tarifario
+            """
+        ))
+        return tuple(result.one())
+
+
+def _lee_tarifario() -> pd.DataFrame:
+    """Lee la tabla completa y convierte cada columna a su tipo."""
+    pool = obtener_engine()
 
     with pool.connect() as db_conn:
-    
+
         # query and fetch invoices table
         result = db_conn.execute(sqlalchemy.text(f"SELECT * FROM tarifario"))
         columns = result.keys()
 
-    
+
         # 2. Unpack all rows of data
         rows = result.fetchall()
 
-    
+
     # 3. Create the DataFrame
         df = pd.DataFrame(rows, columns=columns)
 
-        
-    connector.close()
+    df['ambito'] = df['ambito'].astype(int)
+    df['rango_desde'] = df['rango_desde'].astype(int)
+    df['rango_hasta'] = df['rango_hasta'].astype(int)
+    df['tarifa'] = df['tarifa'].astype(float)
+    df['fecha_inicio'] = pd.to_datetime(df['fecha_inicio']).dt.date
+    df['fecha_fin'] = pd.to_datetime(df['fecha_fin']).dt.date
     return df
 
+
+def _snapshot_actual() -> pd.DataFrame:
+    """Devuelve el snapshot en memoria, recargándolo solo si cambió la versión de la tabla."""
+    global _snapshot, _version, _indices
+    version = version_tarifario()
+    with _lock:
+        if _snapshot is None or version != _version:
+            print("Cargando el tarifario desde la base de datos...")
+            with metricas.span("consulta_tarifario"):
+                _snapshot = _lee_tarifario()
+            _version = version
+            _indices = {}
+        return _snapshot
+
+
+def _filtra_periodo(df: pd.DataFrame, periodo) -> pd.DataFrame:
+    """Se queda con las tarifas vigentes el primer día del periodo (AAAAMM)."""
+    periodo = int(periodo)
+    dia = date(periodo // 100, periodo % 100, 1)
+    return df[(df['fecha_inicio'] <= dia) & (df['fecha_fin'] >= dia)]
+
+
+def trae_tarifas(periodo=None) -> pd.DataFrame:
+    """
+    Devuelve el tarifario como un DataFrame tipado.
+
+    Args:
+        periodo: Si se indica (AAAAMM), solo se devuelven las tarifas vigentes
+                 en ese periodo según 'fecha_inicio' y 'fecha_fin'.
+    """
+    df = _snapshot_actual()
+    if periodo is None:
+        return df.copy()
+    return _filtra_periodo(df, periodo).copy()
+
+
+def trae_indice_tarifas(periodo) -> TariffIndex:
+    """Devuelve el TariffIndex del periodo, construyéndolo una sola vez por versión del tarifario."""
+    periodo = int(periodo)
+    df = _snapshot_actual()
+    with _lock:
+        indice = _indices.get(periodo)
+        if indice is None:
+            indice = TariffIndex.desde_dataframe(_filtra_periodo(df, periodo))
+            # Solo se guarda si otro hilo no recargó el snapshot mientras tanto.
+            if df is _snapshot:
+                _indices[periodo] = indice
+        return indice
+
+
+def invalidar_cache_tarifas():
+    """
+    Descarta el snapshot en memoria para forzar la próxima lectura completa.
+
+    Hace falta después de editar en el lugar fechas de vigencia que no son la
+    mínima ni la máxima, porque `version_tarifario` no detecta ese cambio.
+    """
+    global _snapshot, _version, _indices
+    with _lock:
+        _snapshot = None
+        _version = None
+        _indices = {}
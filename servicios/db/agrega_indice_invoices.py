@@ -0,0 +1,28 @@
+import sqlalchemy
+from servicios.db.conexion import obtener_engine, cerrar_conexiones
+from servicios.db.esquema import invoices_table
+
+# Agrega a una tabla 'invoices' ya existente el índice (periodo, id) con el que
+# consulta_invoices.itera_invoices lee un periodo de a bloques en orden de id.
+# Sin él, cada bloque ordena de nuevo todas las filas del periodo.
+# Ejecutar desde la raíz del proyecto con: python -m servicios.db.agrega_indice_invoices
+
+pool = obtener_engine()
+
+try:
+    with pool.connect() as db_conn:
+        indice = next(i for i in invoices_table.indexes if i.name == "ix_invoices_periodo_id")
+        existentes = {i['name'] for i in sqlalchemy.inspect(db_conn).get_indexes("invoices")}
+        if indice.name in existentes:
+            print(f"ℹ️ El índice '{indice.name}' ya existe.")
+        else:
+            print(f"Agregando el índice '{indice.name}'...")
+            indice.create(db_conn)
+            db_conn.commit()
+            print("✅ ¡Índice agregado con éxito!")
+
+except Exception as e:
+    print(f"Ocurrió un error: {e}")
+
+finally:
+    cerrar_conexiones()
@@ -0,0 +1,38 @@
+import sqlalchemy
+from servicios.db.conexion import obtener_engine, cerrar_conexiones
+
+# Agrega a una tabla 'invoices' ya existente la clave única (periodo, proveedor, track_code)
+# que usa carga_csv.carga_invoices para hacer upsert. Si ya hay envíos duplicados,
+# se listan y no se modifica la tabla: hay que depurarlos antes (pueden tener 'scales' asociados).
+# Ejecutar desde la raíz del proyecto con: python -m servicios.db.agrega_unique_invoices
+
+pool = obtener_engine()
+
+try:
+    with pool.connect() as db_conn:
+        duplicados = db_conn.execute(sqlalchemy.text(
+            """
+            SELECT periodo, proveedor, track_code, COUNT(*) AS cantidad
+            FROM invoices
+            GROUP BY periodo, proveedor, track_code
+            HAVING COUNT(*) > 1
+            """
+        )).fetchall()
+
+        if duplicados:
+            print(f"❌ Hay {len(duplicados)} envíos duplicados. Depúrelos antes de agregar la clave única:")
+            for fila in duplicados[:20]:
+                print(f"  - {fila.periodo} | {fila.proveedor} | {fila.track_code}: {fila.cantidad} filas")
+        else:
+            print("Agregando la clave única 'uq_invoices_envio'...")
+            db_conn.execute(sqlalchemy.text(
+                "ALTER TABLE invoices ADD CONSTRAINT uq_invoices_envio UNIQUE (periodo, proveedor, track_code)"
+            ))
+            db_conn.commit()
+            print("✅ ¡Clave única agregada con éxito!")
+
+except Exception as e:
+    print(f"Ocurrió un error: {e}")
+
+finally:
+    cerrar_conexiones()
@@ -1,78 +1,17 @@
-import os
 import csv
-from dotenv import load_dotenv
-from google.cloud.sql.connector import Connector
-import sqlalchemy
-from sqlalchemy import (
-    Table,
-    Column,
-    String,
-    Date,
-    Integer,
-    Numeric,
-    MetaData,
-    Text,
-)
+from servicios.db.conexion import obtener_engine, cerrar_conexiones
+from servicios.db.esquema import metadata, invoices_table
 
-# initialize Connector object
-connector = Connector()
+# Crea la tabla 'invoices' si no existe y carga files/Invoices_202507-10.csv.
+# Ejecutar desde la raíz del proyecto con: python -m servicios.db.carga_invoices
 
-load_dotenv()
-
-db_host = os.getenv('DB_HOST')
-db_port = os.getenv('DB_PORT')
-db_user = os.getenv('DB_USER')
-db_pass = os.getenv('DB_PASSWORD')
-db_instance = os.getenv('INSTANCE_CONNECTION_NAME')
-db_name = os.getenv('DB_NAME')
-
-# function to return the database connection object
-def getconn():
-    conn = connector.connect(
-        db_instance,
-        "pymysql",
-        user=db_user,
-        password=db_pass,
-        db=db_name
-    )
-    return conn
-
-# create connection pool with 'creator' argument to our connection object function
-pool = sqlalchemy.create_engine(
-    "mysql+pymysql://",
-    creator=getconn,
-)
+pool = obtener_engine()
 
 try:
     with pool.connect() as db_conn:
-        metadata = MetaData()
-
-        # Definimos la tabla "invoices"
-        invoices_table = Table(
-            "invoices",
-            metadata,
-            Column("id", Integer, primary_key=True, autoincrement=True),
-            Column("periodo", Integer, nullable=False),
-            Column("proveedor", String(255), nullable=False),
-            Column("track_code", String(255), nullable=False),
-            Column("ambito", Integer),
-            Column("tipo_servicio", String(100)),
-            Column("name", Text), # Usamos Text para descripciones largas
-            Column("main_category", String(255)),
-            Column("sub_category", String(255)),
-            Column("category", String(255)),
-            Column("alto", Numeric(10, 2)),
-            Column("ancho", Numeric(10, 2)),
-            Column("largo", Numeric(10, 2)),
-            Column("peso_aforado", Numeric(10, 2)),
-            Column("peso_fisico", Numeric(10, 2)),
-            Column("peso_facturable", Numeric(10, 2)),
-            Column("tarifa", Numeric(10, 2), nullable=False),
-        )
-
         print("Creando la tabla 'invoices' si no existe...")
         # Crea la tabla en la base de datos (si no existe ya)
-        metadata.create_all(db_conn, checkfirst=True)
+        metadata.create_all(db_conn, tables=[invoices_table], checkfirst=True)
         print("¡Tabla creada con éxito!")
 
         # --- Carga de Datos desde el CSV ---
@@ -104,6 +43,5 @@ except Exception as e:
     print(f"Ocurrió un error: {e}")
 
 finally:
-    if 'connector' in locals():
-        connector.close()
+    cerrar_conexiones()
     print("Conexión cerrada.")
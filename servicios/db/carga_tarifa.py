@@ -1,70 +1,19 @@
-import os
 import csv
-from dotenv import load_dotenv
-from google.cloud.sql.connector import Connector
-import sqlalchemy
-from sqlalchemy import (
-    Table,
-    Column,
-    String,
-    Date,
-    Integer,
-    Numeric,
-    MetaData,
-)
+from datetime import date
+from servicios.db.conexion import obtener_engine, cerrar_conexiones
+from servicios.db.esquema import metadata, tarifario_table
 
-# initialize Connector object
-connector = Connector()
+# Crea la tabla 'tarifario' si no existe y carga files/Tarifario_2025H2.csv.
+# Ejecutar desde la raíz del proyecto con: python -m servicios.db.carga_tarifa
+# (con DB_URL definida se carga la base local en lugar de Cloud SQL).
 
-load_dotenv()
-
-db_host = os.getenv('DB_HOST')
-db_port = os.getenv('DB_PORT')
-db_user = os.getenv('DB_USER')
-db_pass = os.getenv('DB_PASSWORD')
-db_instance = os.getenv('INSTANCE_CONNECTION_NAME')
-db_name = os.getenv('DB_NAME')
-
-# function to return the database connection object
-def getconn():
-    conn = connector.connect(
-        db_instance,
-        "pymysql",
-        user=db_user,
-        password=db_pass,
-        db=db_name
-    )
-    return conn
-
-# create connection pool with 'creator' argument to our connection object function
-pool = sqlalchemy.create_engine(
-    "mysql+pymysql://",
-    creator=getconn,
-)
+pool = obtener_engine()
 
 try:
     with pool.connect() as db_conn:
-        # El objeto MetaData contiene la definición de todas nuestras tablas
-        metadata = MetaData()
-
-        # Definimos la tabla "tarifario"
-        tarifario_table = Table(
-            "tarifario",
-            metadata,
-            Column("id", Integer, primary_key=True, autoincrement=True),
-            Column("proveedor", String(255), nullable=False),
-            Column("fecha_inicio", Date, nullable=False),
-            Column("fecha_fin", Date, nullable=False),
-            Column("ambito", String(255), nullable=False),
-            Column("tipo_de_servicio", String(255), nullable=False),
-            Column("rango_desde", Integer, nullable=False),
-            Column("rango_hasta", Integer, nullable=False),
-            Column("tarifa", Numeric(10, 2), nullable=False), # Ideal para dinero (ej: 12345678.99)
-        )
-
         print("Creando la tabla 'tarifario' si no existe...")
         # Crea la tabla en la base de datos (si no existe ya)
-        metadata.create_all(db_conn, checkfirst=True)
+        metadata.create_all(db_conn, tables=[tarifario_table], checkfirst=True)
         print("¡Tabla creada con éxito!")
 
         # --- Carga de Datos desde el CSV ---
@@ -79,6 +28,9 @@ try:
                     # Limpiamos el nombre de la columna: minúsculas, sin espacios y sin acentos
                     clean_key = key.lower().replace(' ', '_').replace('á', 'a')
                     clean_row[clean_key] = value
+                # SQLite y DuckDB solo aceptan fechas como objetos date
+                clean_row['fecha_inicio'] = date.fromisoformat(clean_row['fecha_inicio'])
+                clean_row['fecha_fin'] = date.fromisoformat(clean_row['fecha_fin'])
 
                 clean_rows.append(clean_row)
 
@@ -95,5 +47,5 @@ except Exception as e:
     print(f"Ocurrió un error: {e}")
 
 finally:
-    connector.close()
+    cerrar_conexiones()
     print("Conexión cerrada.")
@@ -0,0 +1,133 @@
+import os
+import atexit
+import threading
+from dotenv import load_dotenv
+import sqlalchemy
+from servicios.db import esquema
+
+load_dotenv()
+
+# Parámetros del pool de conexiones (se pueden ajustar por variables de entorno).
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))
+POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+# Cloud SQL corta las conexiones inactivas: se reciclan antes de que eso pase.
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+# Base alternativa a Cloud SQL, como URL de SQLAlchemy. Por ejemplo:
+#   sqlite:///.cache/auditoria.sqlite   o   duckdb:///.cache/auditoria.duckdb
+DB_URL = os.getenv('DB_URL')
+
+_connector = None
+_engine = None
+_lock = threading.Lock()
+
+
+def obtener_engine() -> sqlalchemy.engine.Engine:
+    """
+    Devuelve el engine de SQLAlchemy compartido por todo el proceso.
+
+    Se crea la primera vez que se lo pide, junto con un único `Connector` de
+    Cloud SQL, y se reutiliza en las llamadas siguientes. Así el costo de TLS
+    y de autenticación IAM se paga una sola vez por conexión del pool.
+
+    Si DB_URL está definida se usa esa base (por ejemplo, un archivo SQLite o
+    DuckDB local) en lugar de Cloud SQL, y se crean las tablas que falten.
+    """
+    global _connector, _engine
+    if _engine is not None:
+        return _engine
+
+    with _lock:
+        if _engine is None and DB_URL:
+            _engine = crea_engine_local(DB_URL)
+        if _engine is None:
+            # Solo se importa si se usa Cloud SQL: una base local no lo necesita.
+            from google.cloud.sql.connector import Connector
+
+            db_user = os.getenv('DB_USER')
+            db_pass = os.getenv('DB_PASSWORD')
+            db_instance = os.getenv('INSTANCE_CONNECTION_NAME')
+            db_name = os.getenv('DB_NAME')
+
+            _connector = Connector()
+
+            # function to return the database connection object
+            def getconn():
+                return _connector.connect(
+                    db_instance,
+                    "pymysql",
+                    user=db_user,
+                    password=db_pass,
+                    db=db_name
+                )
+
+            # create connection pool with 'creator' argument to our connection object function
+            _engine = sqlalchemy.create_engine(
+                "mysql+pymysql://",
+                creator=getconn,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                pool_timeout=POOL_TIMEOUT,
+                pool_recycle=POOL_RECYCLE,
+                pool_pre_ping=True,
+            )
+    return _engine
+
+
+def crea_engine_local(url: str) -> sqlalchemy.engine.Engine:
+    """
+    Crea el engine de una base indicada por URL y le crea el esquema de la
+    aplicación ('invoices', 'tarifario' y 'scales') si falta.
+
+    Para SQLite y DuckDB crea también el directorio del archivo. DuckDB
+    necesita el paquete opcional `duckdb-engine`.
+    """
+    url = sqlalchemy.engine.make_url(url)
+    backend = url.get_backend_name()
+    opciones = {}
+    if backend in ("sqlite", "duckdb") and url.database and url.database != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(url.database)), exist_ok=True)
+    if backend == "sqlite":
+        # Los hilos del análisis escriben a la vez: se espera el lock en vez de fallar.
+        opciones["connect_args"] = {"timeout": POOL_TIMEOUT}
+    else:
+        opciones["pool_pre_ping"] = True
+
+    engine = sqlalchemy.create_engine(url, **opciones)
+    if backend == "sqlite":
+        @sqlalchemy.event.listens_for(engine, "connect")
+        def _modo_wal(dbapi_conn, _):
+            # WAL: las lecturas no se bloquean mientras se escribe.
+            dbapi_conn.execute("PRAGMA journal_mode=WAL")
+
+    esquema.crea_esquema(engine)
+    print(f"Usando la base local {url.render_as_string(hide_password=True)}")
+    return engine
+
+
+def usar_engine(engine: sqlalchemy.engine.Engine):
+    """
+    Reemplaza el engine compartido por otro ya creado, por ejemplo una base
+    SQLite local para benchmarks o pruebas sin Cloud SQL.
+    """
+    global _engine
+    with _lock:
+        if _engine is not None and _engine is not engine:
+            _engine.dispose()
+        _engine = engine
+
+
+def cerrar_conexiones():
+    """Cierra el pool y el Connector compartidos. Se registra para ejecutarse al salir del proceso."""
+    global _connector, _engine
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+        if _connector is not None:
+            _connector.close()
+            _connector = None
+            print("Conexión con la base de datos cerrada.")
+
+
+atexit.register(cerrar_conexiones)
@@ -1,26 +1,8 @@
-import os
-from dotenv import load_dotenv
-from google.cloud.sql.connector import Connector
-import sqlalchemy
 from sqlalchemy import Table, MetaData
+from servicios.db.conexion import obtener_engine, cerrar_conexiones
 
 # --- Configuración de la Conexión ---
-load_dotenv()
-connector = Connector()
-
-db_host = os.getenv('DB_HOST')
-db_port = os.getenv('DB_PORT')
-db_user = os.getenv('DB_USER')
-db_pass = os.getenv('DB_PASSWORD')
-db_instance = os.getenv('INSTANCE_CONNECTION_NAME')
-db_name = os.getenv('DB_NAME')
-
-def getconn():
-    return connector.connect(
-        db_instance, "pymysql", user=db_user, password=db_pass, db=db_name
-    )
-
-pool = sqlalchemy.create_engine("mysql+pymysql://", creator=getconn)
+pool = obtener_engine()
 
 # --- Inserción del Registro ---
 try:
@@ -61,6 +43,5 @@ except Exception as e:
     print(f"❌ Ocurrió un error: {e}")
 
 finally:
-    if 'connector' in locals():
-        connector.close()
+    cerrar_conexiones()
     print("Conexión cerrada.")
\ No newline at end of file
@@ -0,0 +1,80 @@
+from sqlalchemy import (
+    Table,
+    Column,
+    String,
+    Date,
+    Integer,
+    Numeric,
+    MetaData,
+    Text,
+    ForeignKey,
+    UniqueConstraint,
+    Index,
+    Sequence,
+)
+
+# Esquema de la aplicación. Lo usan los scripts carga_invoices.py,
+# carga_tarifa.py y crea_scales.py, y conexion.py para crear una base local.
+# Las secuencias solo las usan los motores sin autoincremento (DuckDB);
+# MySQL y SQLite las ignoran.
+metadata = MetaData()
+
+invoices_table = Table(
+    "invoices",
+    metadata,
+    Column("id", Integer, Sequence("invoices_id_seq"), primary_key=True, autoincrement=True),
+    Column("periodo", Integer, nullable=False),
+    Column("proveedor", String(255), nullable=False),
+    Column("track_code", String(255), nullable=False),
+    Column("ambito", Integer),
+    Column("tipo_servicio", String(100)),
+    Column("name", Text),
+    Column("main_category", String(255)),
+    Column("sub_category", String(255)),
+    Column("category", String(255)),
+    Column("alto", Numeric(10, 2)),
+    Column("ancho", Numeric(10, 2)),
+    Column("largo", Numeric(10, 2)),
+    Column("peso_aforado", Numeric(10, 2)),
+    Column("peso_fisico", Numeric(10, 2)),
+    Column("peso_facturable", Numeric(10, 2)),
+    Column("tarifa", Numeric(10, 2), nullable=False),
+    UniqueConstraint("periodo", "proveedor", "track_code", name="uq_invoices_envio"),
+    # Lectura de un periodo en orden de id, de a bloques (consulta_invoices.itera_invoices).
+    Index("ix_invoices_periodo_id", "periodo", "id"),
+)
+
+tarifario_table = Table(
+    "tarifario",
+    metadata,
+    Column("id", Integer, Sequence("tarifario_id_seq"), primary_key=True, autoincrement=True),
+    Column("proveedor", String(255), nullable=False),
+    Column("fecha_inicio", Date, nullable=False),
+    Column("fecha_fin", Date, nullable=False),
+    Column("ambito", String(255), nullable=False),
+    Column("tipo_de_servicio", String(255), nullable=False),
+    Column("rango_desde", Integer, nullable=False),
+    Column("rango_hasta", Integer, nullable=False),
+    Column("tarifa", Numeric(10, 2), nullable=False),
+)
+
+scales_table = Table(
+    "scales",
+    metadata,
+    Column("id", Integer, Sequence("scales_id_seq"), primary_key=True, autoincrement=True),
+    Column("invoice_id", Integer, ForeignKey("invoices.id"), nullable=False),
+    Column("alto", Numeric(10, 2)),
+    Column("ancho", Numeric(10, 2)),
+    Column("largo", Numeric(10, 2)),
+    Column("peso_aforado", Numeric(10, 2)),
+    Column("peso_fisico", Numeric(10, 2)),
+    Column("peso_facturable", Numeric(10, 2)),
+    Column("tarifa_real", Numeric(10, 2), nullable=False),
+)
+
+
+def crea_esquema(engine):
+    """Crea las tablas 'invoices', 'tarifario' y 'scales' si no existen."""
+    with engine.connect() as db_conn:
+        metadata.create_all(db_conn, checkfirst=True)
+        db_conn.commit()
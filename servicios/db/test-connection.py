@@ -1,37 +1,10 @@
-import os
-from dotenv import load_dotenv
-
-from google.cloud.sql.connector import Connector
 import sqlalchemy
+from servicios.db.conexion import obtener_engine, cerrar_conexiones
 
-# initialize Connector object
-connector = Connector()
-
-load_dotenv()
-
-db_host = os.getenv('DB_HOST')
-db_port = os.getenv('DB_PORT')
-db_user = os.getenv('DB_USER')
-db_pass = os.getenv('DB_PASSWORD')
-db_instance = os.getenv('INSTANCE_CONNECTION_NAME')
-db_name = os.getenv('DB_NAME')
+# Muestra las primeras filas de 'invoices' para comprobar la conexión.
+# Ejecutar desde la raíz del proyecto con: python -m servicios.db.test-connection
 
-# function to return the database connection object
-def getconn():
-    conn = connector.connect(
-        db_instance,
-        "pymysql",
-        user=db_user,
-        password=db_pass,
-        db=db_name
-    )
-    return conn
-
-# create connection pool with 'creator' argument to our connection object function
-pool = sqlalchemy.create_engine(
-    "mysql+pymysql://",
-    creator=getconn,
-)
+pool = obtener_engine()
 
 with pool.connect() as db_conn:
   
@@ -42,5 +15,4 @@ with pool.connect() as db_conn:
     for row in results:
         print(row)
     
-connector.close()
-
+cerrar_conexiones()
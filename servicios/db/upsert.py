@@ -0,0 +1,36 @@
+from sqlalchemy import Table
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+
+def ejecuta_upsert(db_conn, tabla: Table, filas: list[dict], claves: tuple[str, ...], columnas: list[str]):
+    """
+    Inserta `filas` y, las que ya existen según `claves`, las actualiza en `columnas`.
+
+    En MySQL se envía un único INSERT de varias filas con ON DUPLICATE KEY
+    UPDATE (MySQL no escribe las filas cuyos valores no cambiaron), y en DuckDB
+    un único INSERT de varias filas con ON CONFLICT DO UPDATE: fila por fila es
+    cientos de veces más lento. En SQLite y PostgreSQL se usa ON CONFLICT DO
+    UPDATE ejecutado con la lista de filas, así no se pasa del límite de
+    parámetros por sentencia de SQLite.
+    """
+    if not filas:
+        return
+    dialecto = db_conn.dialect.name
+    if dialecto in ("mysql", "mariadb"):
+        stmt = mysql.insert(tabla).values(filas)
+        db_conn.execute(stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columnas}))
+    elif dialecto == "duckdb":
+        stmt = postgresql.insert(tabla).values(filas)
+        db_conn.execute(stmt.on_conflict_do_update(
+            index_elements=list(claves),
+            set_={c: stmt.excluded[c] for c in columnas},
+        ))
+    elif dialecto in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialecto == "sqlite" else postgresql).insert(tabla)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(claves),
+            set_={c: stmt.excluded[c] for c in columnas},
+        )
+        db_conn.execute(stmt, filas)
+    else:
+        raise ValueError(f"No hay upsert implementado para el dialecto '{dialecto}'.")
@@ -0,0 +1,150 @@
+import re
+from servicios.pydantic_model import ProductDimensions
+
+FUENTE_NOMBRE = "Nombre del producto"
+
+# Factores para pasar cada unidad a centímetros o a kilogramos.
+_A_CM = {'mm': 0.1, 'cm': 1.0, 'in': 2.54}
+_A_KG = {'g': 0.001, 'kg': 1.0}
+
+# Límites de plausibilidad: fuera de ellos el número casi seguro no es una medida del paquete.
+MAX_LADO_CM = 300.0
+MAX_PESO_KG = 100.0
+
+_NUMERO = r"(\d+(?:[.,]\d+)?)"
+_UNIDAD_LARGO = r"(mm|cms?|centimet(?:er|re)s?|inch(?:es)?|in|\"|'')"
+_SEPARADOR = r"\s*[x×*]\s*"
+
+# "30 x 20 x 10 cm", "17x7x1 inch", "30cm x 10cm x 2cm", "L X W X H 35 X 10 X 5 Cms",
+# "(42X19X8) Inches", "Small_140X114X74 Mm". La unidad del último número es
+# obligatoria (puede ir después de un paréntesis); los anteriores pueden llevar la suya.
+_patron_medidas = re.compile(
+    r"(?:(?P<etiquetas>[lwbh]\s*[x×*]\s*[lwbh]\s*[x×*]\s*[lwbh])\s*[:\-]?\s*)?"
+    rf"(?<![a-z0-9.]){_NUMERO}\s*{_UNIDAD_LARGO}?{_SEPARADOR}{_NUMERO}\s*{_UNIDAD_LARGO}?{_SEPARADOR}"
+    rf"{_NUMERO}\s*\)?\s*{_UNIDAD_LARGO}(?![a-z])",
+    re.IGNORECASE,
+)
+
+# "220 Gm", "1.5 kg", "200 Grams", "500g". La "g" sola solo vale en minúscula y
+# sin "/" después: "5G", "Activa 3G/4G" o "22G" (calibre) son modelos, no gramos.
+_patron_peso = re.compile(
+    rf"(?<![a-z0-9.]){_NUMERO}\s*(kgs?|kilo(?:gram(?:me)?)?s?|gms?|gr|grams?|gramos?|(?-i:g)(?!/))(?![a-z0-9])",
+    re.IGNORECASE,
+)
+# "66-75 KG", "5 to 10 kg": un rango (de talles o capacidades), no el peso del paquete.
+_patron_antes_rango = re.compile(r"\d\s*(?:-|–|~|to)\s*$", re.IGNORECASE)
+# "for 66 KG", "up to 10 kg", "capacity 5kg": lo que el producto soporta, no lo que pesa.
+_patron_antes_capacidad = re.compile(
+    r"\b(?:for|up\s*to|upto|max(?:imum)?|capacity|load|holds?)\s*[:\-]?\s*$",
+    re.IGNORECASE,
+)
+
+# Los títulos de packs o sets describen cada unidad, no el paquete enviado.
+_patron_multiples = re.compile(
+    r"\b(?:pack|set|combo|box)\s+of\s+(\d+)\b|\b(\d+)\s*(?:pcs|pieces|piezas|units)\b|\beach\b",
+    re.IGNORECASE,
+)
+
+_ETIQUETA_A_CAMPO = {'l': 'largo', 'w': 'ancho', 'b': 'ancho', 'h': 'alto'}
+
+
+def _numero(texto: str) -> float:
+    return float(texto.replace(',', '.'))
+
+
+def _unidad_largo(texto: str | None) -> str | None:
+    if texto is None:
+        return None
+    texto = texto.lower()
+    if texto.startswith('mm'):
+        return 'mm'
+    if texto.startswith(('cm', 'centimet')):
+        return 'cm'
+    return 'in'
+
+
+def _unidad_peso(texto: str) -> str:
+    return 'kg' if texto.lower().startswith('k') else 'g'
+
+
+def extrae_medidas(nombre: str) -> dict | None:
+    """
+    Busca en el nombre un patrón "AxBxC" con unidad y lo devuelve en centímetros.
+
+    Los números se asignan como largo x ancho x alto, salvo que el nombre traiga
+    etiquetas explícitas ("L x W x H", "LxBxH"). Devuelve None si no hay ningún
+    patrón o si hay varios distintos; dos medidas solas ("L X H 35 X 10 Cms")
+    no alcanzan para el volumen y no cuentan como patrón.
+    """
+    encontradas = set()
+    for coincidencia in _patron_medidas.finditer(nombre):
+        grupos = coincidencia.groups()
+        valores = (grupos[1], grupos[3], grupos[5])
+        unidad_final = _unidad_largo(grupos[6])
+        unidades = [_unidad_largo(grupos[2]) or unidad_final, _unidad_largo(grupos[4]) or unidad_final, unidad_final]
+        lados = tuple(round(_numero(v) * _A_CM[u], 2) for v, u in zip(valores, unidades))
+
+        campos = ('largo', 'ancho', 'alto')
+        etiquetas = coincidencia.group('etiquetas')
+        if etiquetas:
+            letras = [c for c in etiquetas.lower() if c in _ETIQUETA_A_CAMPO]
+            asignados = tuple(_ETIQUETA_A_CAMPO[c] for c in letras)
+            if len(set(asignados)) == 3:
+                campos = asignados
+        encontradas.add(tuple(sorted(zip(campos, lados))))
+
+    if len(encontradas) != 1:
+        return None
+    return dict(encontradas.pop())
+
+
+def extrae_peso(nombre: str) -> float | None:
+    """
+    Busca un peso con unidad en el nombre y lo devuelve en kg.
+
+    Devuelve None si no hay uno, si hay varios distintos o si alguno es parte
+    de un rango ("66-75 KG") o una capacidad ("for 75 KG", "up to 10 kg").
+    """
+    pesos = set()
+    for coincidencia in _patron_peso.finditer(nombre):
+        valor, unidad = coincidencia.groups()
+        # "6g" en "Activa 6g" es una generación: la "g" sola pide más de una cifra.
+        if unidad == 'g' and valor.isdigit() and len(valor) == 1:
+            continue
+        antes = nombre[:coincidencia.start()]
+        if _patron_antes_rango.search(antes) or _patron_antes_capacidad.search(antes):
+            return None
+        pesos.add(round(_numero(valor) * _A_KG[_unidad_peso(unidad)], 4))
+    if len(pesos) != 1:
+        return None
+    return pesos.pop()
+
+
+def _es_multiple(nombre: str) -> bool:
+    for coincidencia in _patron_multiples.finditer(nombre):
+        cantidad = coincidencia.group(1) or coincidencia.group(2)
+        if cantidad is None or int(cantidad) > 1:
+            return True
+    return False
+
+
+def dimensiones_desde_nombre(nombre: str) -> ProductDimensions | None:
+    """
+    Extrae alto, ancho, largo y peso del nombre del producto, sin consultar la red.
+
+    Solo devuelve un resultado cuando es confiable: un único patrón con las tres
+    medidas y su unidad, un único peso con unidad, valores plausibles y un
+    título que no sea de un pack o set. En cualquier otro caso devuelve None y el producto
+    sigue el camino de Tavily/Gemini.
+    """
+    if not nombre or not isinstance(nombre, str) or _es_multiple(nombre):
+        return None
+    medidas = extrae_medidas(nombre)
+    if medidas is None:
+        return None
+    peso = extrae_peso(nombre)
+    if peso is None:
+        return None
+    if not all(0 < lado <= MAX_LADO_CM for lado in medidas.values()) or not 0 < peso <= MAX_PESO_KG:
+        return None
+    return ProductDimensions(**medidas, peso=peso, fuente=FUENTE_NOMBRE)
@@ -1,4 +1,123 @@
+import io
+import codecs
+import hashlib
+from dataclasses import dataclass
+from typing import Iterable
 import pandas as pd
+from servicios import archivos
+from servicios.archivos import Origen
+from servicios.metricas import metricas
+
+# Columnas de la tabla 'invoices' que trae el CSV, con su tipo en pandas.
+COLUMNAS_INVOICES = {
+    'periodo': 'int64',
+    'proveedor': 'object',
+    'track_code': 'object',
+    'ambito': 'Int64',
+    'tipo_servicio': 'object',
+    'name': 'object',
+    'main_category': 'object',
+    'sub_category': 'object',
+    'category': 'object',
+    'alto': 'float64',
+    'ancho': 'float64',
+    'largo': 'float64',
+    'peso_aforado': 'float64',
+    'peso_fisico': 'float64',
+    'peso_facturable': 'float64',
+    'tarifa': 'float64',
+}
+
+# El CSV se lee en UTF-8 (con o sin BOM); algunos reportes del proveedor vienen
+# exportados en Latin-1 (ej. '®'), que decodifica cualquier byte.
+CODIFICACION = 'utf-8-sig'
+CODIFICACION_ALTERNATIVA = 'latin-1'
+
+
+@dataclass
+class ReporteCsv:
+    """
+    Resultado de leer una sola vez el CSV de soporte de una factura.
+
+    El mismo DataFrame tipado se usa para comparar totales y para cargar la
+    tabla 'invoices', así lo validado y lo cargado son exactamente lo mismo.
+    """
+    df: pd.DataFrame
+    periodo: int
+    hash_sha256: str
+    nombre_archivo: str
+
+
+def codificacion_csv(bloques: Iterable[bytes | memoryview]) -> str:
+    """
+    Codificación con la que se lee el CSV: UTF-8 si todo el contenido lo es, y
+    si no Latin-1. Recibe el contenido en bloques, así un archivo grande se
+    revisa sin tenerlo entero en memoria.
+    """
+    decodificador = codecs.getincrementaldecoder(CODIFICACION)()
+    try:
+        for bloque in bloques:
+            decodificador.decode(bloque)
+        decodificador.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return CODIFICACION_ALTERNATIVA
+    return CODIFICACION
+
+
+def tipa_invoices(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pasa un DataFrame leído del CSV como texto a las columnas y los tipos de la
+    tabla 'invoices' (COLUMNAS_INVOICES). Los vacíos quedan como nulos.
+
+    Las columnas se pasan a minúsculas y se descartan las que no son de la
+    tabla (por ejemplo, columnas extra sin nombre).
+
+    Raises:
+        KeyError: Si falta alguna columna de la tabla.
+        ValueError: Si un valor numérico no se puede convertir.
+    """
+    df = df.rename(columns=lambda c: str(c).lower())
+    faltantes = [c for c in COLUMNAS_INVOICES if c not in df.columns]
+    if faltantes:
+        raise KeyError(f"Faltan columnas en el CSV: {faltantes}")
+    df = df[list(COLUMNAS_INVOICES)]
+    df = df.mask(df == '')
+    for columna, tipo in COLUMNAS_INVOICES.items():
+        if tipo != 'object':
+            df[columna] = pd.to_numeric(df[columna]).astype(tipo)
+    return df
+
+
+def lee_csv_invoices(ruta_csv: Origen) -> ReporteCsv:
+    """
+    Lee el CSV una única vez y lo convierte a los tipos de la tabla 'invoices'.
+
+    `ruta_csv` puede ser una ruta, el contenido (bytes o memoryview) o el
+    archivo ya abierto (por ejemplo, el que sube Streamlit): lo que ya está en
+    memoria se parsea desde ahí, sin copiarlo a un archivo temporal.
+
+    La codificación y los tipos son los de `codificacion_csv` y `tipa_invoices`.
+    También calcula el hash del contenido, que usa la carga para no ingresar
+    dos veces el mismo archivo.
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe.
+        KeyError: Si falta alguna columna de la tabla.
+    """
+    with metricas.span("csv"):
+        contenido = archivos.lee_contenido(ruta_csv)
+        metricas.suma("bytes_leidos", len(contenido), origen="csv")
+
+        texto = str(contenido, codificacion_csv([contenido]))
+        df = tipa_invoices(pd.read_csv(io.StringIO(texto), dtype=str, keep_default_na=False, index_col=False))
+
+        return ReporteCsv(
+            df=df,
+            periodo=int(df['periodo'].unique()[0]),
+            hash_sha256=hashlib.sha256(contenido).hexdigest(),
+            nombre_archivo=archivos.nombre(ruta_csv),
+        )
+
 
 def extrae_csv(ruta_csv):
     """
@@ -12,12 +131,11 @@ def extrae_csv(ruta_csv):
         El periodo extraído del CSV.
     """
     try:
-        df = pd.read_csv(ruta_csv)
-        periodo = df['periodo'].unique()[0]
-        return df, periodo
+        reporte = lee_csv_invoices(ruta_csv)
+        return reporte.df, reporte.periodo
     except FileNotFoundError:
         print(f"❌ Error: El archivo no fue encontrado en la ruta: {ruta_csv}")
         return None
     except Exception as e:
         print(f"❌ Ocurrió un error al procesar el CSV: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -1,46 +1,137 @@
 import pdfplumber
+import pypdfium2 as pdfium
 import re
+import hashlib
+import threading
+from collections import OrderedDict
 from decimal import Decimal
+from servicios import archivos
+from servicios.archivos import Origen
+from servicios.metricas import metricas
 
-def extraer_total_de_factura(ruta_pdf: str) -> Decimal | None:
+# Expresión regular para encontrar montos. Busca números con separadores de miles
+# (punto o coma) y un separador decimal (coma o punto).
+# Soporta opcionalmente símbolos de moneda al principio.
+patron_monto = re.compile(r"[\$\€]?\s*(\d{1,3}(?:[.,]\d{3})*[,.]\d{2})")
+
+# Totales ya extraídos, por hash SHA-256 del contenido del PDF.
+MAX_CACHE_TOTALES = 256
+_cache_totales = OrderedDict()
+_lock = threading.Lock()
+
+
+def _monto_de_linea(linea: str) -> Decimal | None:
+    """Devuelve el primer monto de una línea que contiene 'TOTAL', o None si no tiene."""
+    busqueda = patron_monto.search(linea)
+    if not busqueda:
+        return None
+    # Limpiamos el string del monto encontrado
+    monto_str = busqueda.group(1)
+    # Quitamos separadores de miles (puntos o comas)
+    monto_limpio = monto_str.replace('.', '').replace(',', '')
+    # Reemplazamos el último caracter por un punto decimal
+    monto_decimal_str = monto_limpio[:-2] + '.' + monto_limpio[-2:]
+    return Decimal(monto_decimal_str)
+
+
+def _total_completo(ruta_pdf: Origen) -> Decimal | None:
+    """Camino original: texto con layout completo de pdfplumber, página por página desde el final."""
+    with archivos.abre_binario(ruta_pdf) as archivo, pdfplumber.open(archivo) as pdf:
+        # Iteramos por las páginas, usualmente el total está en la última
+        for pagina in reversed(pdf.pages):
+            texto = pagina.extract_text()
+
+            # Iteramos por cada línea de la página
+            for linea in texto.split('\n'):
+                #print(f"🔍 Analizando línea: {linea.strip()}")
+                # Buscamos líneas que probablemente contengan el total
+                if 'TOTAL' in linea:
+                    total_encontrado = _monto_de_linea(linea)
+                    if total_encontrado is not None:
+                        #print(f"✅ Total encontrado en la línea '{linea.strip()}': {total_encontrado}")
+                        return total_encontrado # Devolvemos el primer total encontrado
+    return None
+
+
+def _total_rapido(ruta_pdf: Origen) -> Decimal | None:
+    """
+    Camino rápido con pdfium: en lugar de extraer y ordenar todo el texto de la
+    página, ubica cada 'TOTAL' y lee solo la franja horizontal de esa línea.
+    Empieza por la última página y se detiene en el primer total encontrado.
+    """
+    # pdfium abre rutas y bytes directamente; el resto, como archivo binario.
+    if archivos.es_ruta(ruta_pdf) or isinstance(ruta_pdf, bytes):
+        return _total_rapido_documento(pdfium.PdfDocument(ruta_pdf))
+    with archivos.abre_binario(ruta_pdf) as archivo:
+        return _total_rapido_documento(pdfium.PdfDocument(archivo))
+
+
+def _total_rapido_documento(pdf: pdfium.PdfDocument) -> Decimal | None:
+    try:
+        for indice in reversed(range(len(pdf))):
+            pagina = pdf[indice]
+            ancho, _ = pagina.get_size()
+            textpage = pagina.get_textpage()
+
+            coincidencias = []
+            buscador = textpage.search('TOTAL', match_case=True)
+            while (coincidencia := buscador.get_next()) is not None:
+                _, abajo, _, arriba = textpage.get_charbox(coincidencia[0], loose=True)
+                coincidencias.append((arriba, abajo))
+
+            # De arriba hacia abajo, igual que el orden de extract_text()
+            for arriba, abajo in sorted(coincidencias, reverse=True):
+                linea = textpage.get_text_bounded(left=0, bottom=abajo, right=ancho, top=arriba)
+                total_encontrado = _monto_de_linea(' '.join(linea.split()))
+                if total_encontrado is not None:
+                    return total_encontrado
+    finally:
+        pdf.close()
+    return None
+
+
+def _hash_pdf(ruta_pdf: Origen) -> str:
+    contenido = archivos.lee_contenido(ruta_pdf)
+    metricas.suma("bytes_leidos", len(contenido), origen="pdf")
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def extraer_total_de_factura(ruta_pdf: Origen, rapido: bool = True) -> Decimal | None:
     """
     Abre un archivo PDF, busca el total de la factura y lo devuelve como un valor numérico.
 
     Args:
-        ruta_pdf: La ruta al archivo PDF de la factura.
+        ruta_pdf: La ruta al archivo PDF de la factura, su contenido (bytes o
+                  memoryview) o el archivo ya abierto (por ejemplo, el que sube
+                  Streamlit). Lo que ya está en memoria no se escribe a disco.
+        rapido: Si es True se usa primero el camino rápido (pdfium) y, si no
+                encuentra el total, el camino completo de pdfplumber.
 
     Returns:
         Un objeto Decimal con el total encontrado, o None si no se encuentra.
+        El resultado se guarda por hash del contenido, así que volver a chequear
+        la misma factura no vuelve a leer el PDF.
     """
-    total_encontrado = None
-    # Expresión regular para encontrar montos. Busca números con separadores de miles
-    # (punto o coma) y un separador decimal (coma o punto).
-    # Soporta opcionalmente símbolos de moneda al principio.
-    patron_monto = re.compile(r"[\$\€]?\s*(\d{1,3}(?:[.,]\d{3})*[,.]\d{2})")
+    with metricas.span("pdf"):
+        return _extraer_total(ruta_pdf, rapido)
+
 
+def _extraer_total(ruta_pdf: Origen, rapido: bool) -> Decimal | None:
     try:
-        with pdfplumber.open(ruta_pdf) as pdf:
-            # Iteramos por las páginas, usualmente el total está en la última
-            for pagina in reversed(pdf.pages):
-                texto = pagina.extract_text()
-                
-                # Iteramos por cada línea de la página
-                for linea in texto.split('\n'):
-                    #print(f"🔍 Analizando línea: {linea.strip()}")
-                    # Buscamos líneas que probablemente contengan el total
-                    if 'TOTAL' in linea:
-                        busqueda = patron_monto.search(linea)
-                        if busqueda:
-                            # Limpiamos el string del monto encontrado
-                            monto_str = busqueda.group(1)
-                            # Quitamos separadores de miles (puntos o comas)
-                            monto_limpio = monto_str.replace('.', '').replace(',', '')
-                            # Reemplazamos el último caracter por un punto decimal
-                            monto_decimal_str = monto_limpio[:-2] + '.' + monto_limpio[-2:]
-                            
-                            total_encontrado = Decimal(monto_decimal_str)
-                            #print(f"✅ Total encontrado en la línea '{linea.strip()}': {total_encontrado}")
-                            return total_encontrado # Devolvemos el primer total encontrado
+        clave = (_hash_pdf(ruta_pdf), rapido)
+        with _lock:
+            if clave in _cache_totales:
+                _cache_totales.move_to_end(clave)
+                return _cache_totales[clave]
+
+        total_encontrado = None
+        if rapido:
+            try:
+                total_encontrado = _total_rapido(ruta_pdf)
+            except Exception as e:
+                print(f"🟡 Falló la extracción rápida del PDF ({e}). Se usa la extracción completa.")
+        if total_encontrado is None:
+            total_encontrado = _total_completo(ruta_pdf)
 
     except FileNotFoundError:
         print(f"❌ Error: El archivo no fue encontrado en la ruta: {ruta_pdf}")
@@ -49,5 +140,11 @@ def extraer_total_de_factura(ruta_pdf: str) -> Decimal | None:
         print(f"❌ Ocurrió un error al procesar el PDF: {e}")
         return None
 
-    print("🟡 No se pudo encontrar un valor total en el PDF.")
-    return None
\ No newline at end of file
+    with _lock:
+        _cache_totales[clave] = total_encontrado
+        if len(_cache_totales) > MAX_CACHE_TOTALES:
+            _cache_totales.popitem(last=False)
+
+    if total_encontrado is None:
+        print("🟡 No se pudo encontrar un valor total en el PDF.")
+    return total_encontrado
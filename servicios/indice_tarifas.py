@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# Valor que devuelve `lookup_many` para los pesos que no caen en ningún rango.
+SIN_TARIFA = np.nan
+
+
+class TariffIndex:
+    """
+    Índice precalculado del tarifario para buscar tarifas por peso facturable.
+
+    Por cada (proveedor, ambito, tipo_de_servicio) guarda los rangos ordenados
+    como arreglos de NumPy, de modo que un arreglo completo de pesos se resuelve
+    con un único `np.searchsorted`.
+
+    Los límites se resuelven siempre igual: un peso que coincide con el
+    `rango_hasta` de un rango y el `rango_desde` del siguiente pertenece al rango
+    inferior (el primero cuyo `rango_hasta` es mayor o igual al peso).
+    Los pesos fuera de todos los rangos, negativos o NaN no tienen tarifa.
+    """
+
+    def __init__(self, rangos: dict):
+        # rangos: {(proveedor, ambito, tipo_de_servicio): (desde, hasta, tarifa)}
+        self._rangos = rangos
+
+    @classmethod
+    def desde_dataframe(cls, tarifas: pd.DataFrame) -> "TariffIndex":
+        """
+        Construye el índice a partir del DataFrame que devuelve `trae_tarifas()`.
+
+        Raises:
+            ValueError: Si dos rangos de la misma clave se superponen más allá
+                        de un límite compartido.
+        """
+        rangos = {}
+        for clave, grupo in tarifas.groupby(['proveedor', 'ambito', 'tipo_de_servicio'], sort=False):
+            grupo = grupo.sort_values(['rango_hasta', 'rango_desde'])
+            desde = grupo['rango_desde'].to_numpy(dtype=float)
+            hasta = grupo['rango_hasta'].to_numpy(dtype=float)
+            tarifa = grupo['tarifa'].to_numpy(dtype=float)
+            if len(desde) > 1 and np.any(desde[1:] < hasta[:-1]):
+                raise ValueError(f"El tarifario tiene rangos superpuestos para {clave}.")
+            rangos[cls._clave(*clave)] = (desde, hasta, tarifa)
+        return cls(rangos)
+
+    @staticmethod
+    def _clave(proveedor, ambito, tipo_de_servicio) -> tuple:
+        # En 'tarifario' el ámbito es texto y en 'invoices' es entero.
+        return (str(proveedor), int(ambito), str(tipo_de_servicio))
+
+    def lookup_many(self, proveedor, ambito, tipo_de_servicio, pesos) -> np.ndarray:
+        """
+        Devuelve la tarifa para cada peso facturable de una misma clave.
+
+        Args:
+            pesos: Arreglo (o lista) de pesos facturables en kg.
+
+        Returns:
+            Un arreglo float del mismo largo que `pesos`, con SIN_TARIFA (NaN)
+            donde no hay un rango que contenga el peso o la clave no existe.
+        """
+        pesos = np.asarray(pesos, dtype=float)
+        resultado = np.full(pesos.shape, SIN_TARIFA)
+        rangos = self._rangos.get(self._clave(proveedor, ambito, tipo_de_servicio))
+        if rangos is None:
+            return resultado
+
+        desde, hasta, tarifa = rangos
+        # Primer rango cuyo 'hasta' es >= peso; NaN queda al final y no encuentra rango.
+        posicion = np.searchsorted(hasta, pesos, side='left')
+        dentro = posicion < len(hasta)
+        posicion_valida = np.where(dentro, posicion, 0)
+        dentro &= pesos >= desde[posicion_valida]
+        resultado[dentro] = tarifa[posicion_valida[dentro]]
+        return resultado
+
+    def lookup(self, proveedor, ambito, tipo_de_servicio, peso) -> float | None:
+        """Devuelve la tarifa para un único peso, o None si no hay tarifa."""
+        tarifa = self.lookup_many(proveedor, ambito, tipo_de_servicio, [peso])[0]
+        return None if np.isnan(tarifa) else float(tarifa)
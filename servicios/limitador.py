@@ -0,0 +1,198 @@
+import os
+import time
+import random
+import threading
+from servicios.clientes_proveedores import ErrorProveedor, LIMITE
+from servicios.metricas import metricas
+
+# Pedidos por minuto por proveedor si no se configuran (límites de una API key básica).
+RPM_DEFAULT = {'tavily': 100, 'gemini': 60}
+# Pedidos simultáneos máximos contra un mismo proveedor.
+CONCURRENCIA_MAX_DEFAULT = 32
+REINTENTOS_DEFAULT = 5
+BACKOFF_BASE_DEFAULT = 1.0   # segundos
+BACKOFF_MAX_DEFAULT = 60.0   # segundos
+# Después de una reducción, los 429 que lleguen en este lapso son del mismo
+# exceso y no vuelven a reducir.
+ENFRIAMIENTO_REDUCCION = 1.0  # segundos
+
+
+class LimitadorProveedor:
+    """
+    Controla el ritmo de pedidos a un proveedor externo (Tavily o Gemini).
+
+    Combina tres mecanismos:
+    - Un token bucket: como mucho `rpm` pedidos por minuto, con ráfagas
+      de hasta un segundo de cuota.
+    - Un límite de pedidos simultáneos ajustado con AIMD. Cada éxito suma
+      1/límite y cada 429 lo divide por dos. La tasa del bucket se ajusta igual.
+      Así el ritmo se acomoda justo por debajo de la cuota real del proveedor.
+    - Reintentos con backoff exponencial y jitter para los errores pasajeros.
+    """
+
+    def __init__(self, nombre: str, rpm: float | None = None,
+                 concurrencia_max: int = CONCURRENCIA_MAX_DEFAULT,
+                 reintentos: int | None = None, backoff_base: float | None = None,
+                 backoff_max: float | None = None):
+        self.nombre = nombre
+        if rpm is None:
+            rpm = float(os.getenv(f'{nombre.upper()}_RPM', RPM_DEFAULT.get(nombre, 0)))
+        # rpm <= 0: sin límite de tasa, solo el de concurrencia.
+        self.tasa_max = rpm / 60 if rpm and rpm > 0 else None
+        self.tasa = self.tasa_max
+        self.concurrencia_max = max(1, concurrencia_max)
+        self.limite = float(self.concurrencia_max)
+        self.reintentos = int(reintentos if reintentos is not None else os.getenv('LLM_MAX_REINTENTOS', REINTENTOS_DEFAULT))
+        self.backoff_base = float(backoff_base or os.getenv('LLM_BACKOFF_BASE', BACKOFF_BASE_DEFAULT))
+        self.backoff_max = float(backoff_max or os.getenv('LLM_BACKOFF_MAX', BACKOFF_MAX_DEFAULT))
+
+        self._cond = threading.Condition()
+        self._fichas = max(1.0, self.tasa or 1.0)
+        self._ultima_recarga = time.monotonic()
+        self._ultima_reduccion = 0.0
+        self._en_curso = 0
+        self.llamadas = 0
+        self.fallidas = 0
+        self.reintentos_hechos = 0
+        self.limites_recibidos = 0
+
+    def _recarga(self):
+        ahora = time.monotonic()
+        if self.tasa is not None:
+            self._fichas = min(max(1.0, self.tasa), self._fichas + (ahora - self._ultima_recarga) * self.tasa)
+        self._ultima_recarga = ahora
+
+    def _adquiere(self):
+        inicio = time.perf_counter()
+        try:
+            self._espera_turno()
+        finally:
+            # Tiempo que el pedido esperó por la cuota o por la concurrencia.
+            metricas.registra(f"espera_{self.nombre}", time.perf_counter() - inicio)
+
+    def _espera_turno(self):
+        with self._cond:
+            while True:
+                self._recarga()
+                if self._en_curso >= max(1, int(self.limite)):
+                    self._cond.wait()
+                elif self.tasa is not None and self._fichas < 1:
+                    self._cond.wait((1 - self._fichas) / self.tasa)
+                else:
+                    if self.tasa is not None:
+                        self._fichas -= 1
+                    self._en_curso += 1
+                    return
+
+    def _libera(self, exito: bool):
+        with self._cond:
+            self._en_curso -= 1
+            if exito:
+                # Aumento aditivo: por cada "ronda" de `limite` éxitos, +1 pedido
+                # simultáneo y +1% de la tasa configurada.
+                self.limite = min(float(self.concurrencia_max), self.limite + 1 / self.limite)
+                if self.tasa is not None:
+                    self.tasa = min(self.tasa_max, self.tasa + self.tasa_max / 100 / self.limite)
+            self._cond.notify_all()
+
+    def _reduce(self):
+        with self._cond:
+            ahora = time.monotonic()
+            self.limites_recibidos += 1
+            metricas.suma("respuestas_429", proveedor=self.nombre)
+            if ahora - self._ultima_reduccion < ENFRIAMIENTO_REDUCCION:
+                return
+            self._ultima_reduccion = ahora
+            # Disminución multiplicativa.
+            self.limite = max(1.0, self.limite / 2)
+            if self.tasa is not None:
+                self.tasa = max(self.tasa_max / 10, self.tasa / 2)
+                self._fichas = min(self._fichas, 0.0)
+
+    def _espera(self, intento: int, error: ErrorProveedor) -> float:
+        # "Full jitter": un valor al azar hasta el backoff exponencial, así los
+        # hilos que fallaron juntos no vuelven a chocar juntos.
+        espera = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+        if error.espera:
+            espera += error.espera
+        return espera
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        """
+        Ejecuta `funcion` respetando el ritmo del proveedor y reintentando los errores pasajeros.
+
+        Raises:
+            ErrorProveedor: Si el error no es reintentable o se agotaron los reintentos.
+        """
+        intento = 0
+        while True:
+            self._adquiere()
+            try:
+                resultado = funcion(*args, **kwargs)
+            except ErrorProveedor as e:
+                self._libera(exito=False)
+                if e.tipo == LIMITE:
+                    self._reduce()
+                if not e.reintentable or intento >= self.reintentos:
+                    with self._cond:
+                        self.fallidas += 1
+                    raise
+                with self._cond:
+                    self.reintentos_hechos += 1
+                metricas.suma("reintentos", proveedor=self.nombre)
+                espera = self._espera(intento, e)
+                print(f"  - 🔁 {self.nombre}: {e.tipo}, reintento {intento + 1}/{self.reintentos} en {espera:.1f}s")
+                time.sleep(espera)
+                intento += 1
+                continue
+            except Exception:
+                self._libera(exito=False)
+                raise
+            self._libera(exito=True)
+            with self._cond:
+                self.llamadas += 1
+            return resultado
+
+    def medicion(self) -> dict:
+        """Contadores actuales, para medir un tramo con `resumen(desde=...)`."""
+        with self._cond:
+            return {
+                'instante': time.monotonic(),
+                'llamadas': self.llamadas,
+                'fallidas': self.fallidas,
+                'reintentos': self.reintentos_hechos,
+                'limites': self.limites_recibidos,
+            }
+
+    def resumen(self, desde: dict | None = None) -> str:
+        """Texto con llamadas, ritmo, 429 recibidos y límites actuales (desde una medición, si se indica)."""
+        actual = self.medicion()
+        base = desde or {'instante': actual['instante'], 'llamadas': 0, 'fallidas': 0, 'reintentos': 0, 'limites': 0}
+        llamadas = actual['llamadas'] - base['llamadas']
+        transcurrido = actual['instante'] - base['instante']
+        ritmo = llamadas / transcurrido * 60 if transcurrido > 0 else 0.0
+        tasa = f"{self.tasa * 60:.0f}/{self.tasa_max * 60:.0f} rpm" if self.tasa is not None else "sin límite de rpm"
+        return (
+            f"{self.nombre}: {llamadas} llamadas ({ritmo:.1f}/min), "
+            f"{actual['limites'] - base['limites']} respuestas 429, "
+            f"{actual['reintentos'] - base['reintentos']} reintentos, "
+            f"{actual['fallidas'] - base['fallidas']} fallidas | "
+            f"concurrencia {int(self.limite)}/{self.concurrencia_max}, {tasa}"
+        )
+
+
+_limitadores: dict[str, LimitadorProveedor] = {}
+_lock = threading.Lock()
+
+
+def obtener_limitador(proveedor: str) -> LimitadorProveedor:
+    """
+    Devuelve el limitador compartido del proveedor.
+
+    La cuota es por API key, así que todos los análisis del proceso comparten
+    el mismo limitador por proveedor.
+    """
+    with _lock:
+        if proveedor not in _limitadores:
+            _limitadores[proveedor] = LimitadorProveedor(proveedor)
+        return _limitadores[proveedor]
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import random
+import functools
+import threading
+import contextlib
+import contextvars
+import numpy as np
+
+# Duraciones que se guardan por etapa para calcular percentiles. Pasado este
+# número se muestrea (reservoir sampling): la memoria no crece con las filas.
+MUESTRAS_POR_ETAPA = 10_000
+CUANTILES = (0.5, 0.95, 0.99)
+PREFIJO = "auditoria"
+DIRECTORIO_DEFAULT = os.path.join(".cache", "metricas")
+
+
+class _Etapa:
+    """Cantidad, suma y muestra de duraciones de una etapa."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.suma = 0.0
+        self.muestras = []
+
+    def agrega(self, segundos: float, rng: random.Random):
+        self.cantidad += 1
+        self.suma += segundos
+        if len(self.muestras) < MUESTRAS_POR_ETAPA:
+            self.muestras.append(segundos)
+        else:
+            posicion = rng.randrange(self.cantidad)
+            if posicion < MUESTRAS_POR_ETAPA:
+                self.muestras[posicion] = segundos
+
+
+class Metricas:
+    """
+    Registro de tiempos por etapa (spans) y contadores de una corrida.
+
+    Es seguro usarlo desde varios hilos. Los tiempos se agrupan por etapa
+    ('pdf', 'csv', 'tavily', 'gemini', ...) y los contadores por nombre y
+    etiquetas (por ejemplo `reintentos{proveedor="tavily"}`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self.reinicia()
+
+    def reinicia(self):
+        """Descarta lo medido y empieza una corrida nueva."""
+        with self._lock:
+            self._etapas: dict[str, _Etapa] = {}
+            self._contadores: dict[tuple, float] = {}
+            self.inicio = time.time()
+
+    def registra(self, etapa: str, segundos: float):
+        with self._lock:
+            self._etapas.setdefault(etapa, _Etapa()).agrega(segundos, self._rng)
+
+    @contextlib.contextmanager
+    def span(self, etapa: str):
+        """Mide la duración del bloque como una ejecución de `etapa`. Si falla, cuenta un error de la etapa."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.suma("errores", etapa=etapa)
+            raise
+        finally:
+            self.registra(etapa, time.perf_counter() - inicio)
+
+    def suma(self, nombre: str, valor: float = 1, **etiquetas):
+        """Incrementa el contador `nombre` con esas etiquetas."""
+        clave = (nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def resumen_etapas(self) -> list[dict]:
+        """Por etapa: ejecuciones, total y percentiles en segundos."""
+        with self._lock:
+            etapas = {nombre: (e.cantidad, e.suma, list(e.muestras)) for nombre, e in self._etapas.items()}
+        filas = []
+        for nombre, (cantidad, suma, muestras) in etapas.items():
+            valores = np.percentile(muestras, [q * 100 for q in CUANTILES]) if muestras else [0.0] * len(CUANTILES)
+            fila = {'etapa': nombre, 'ejecuciones': cantidad, 'total_s': suma}
+            fila.update({f"p{int(q * 100)}_s": float(v) for q, v in zip(CUANTILES, valores)})
+            filas.append(fila)
+        return filas
+
+    def contadores(self) -> list[dict]:
+        """Los contadores como filas {nombre, etiquetas, valor}."""
+        with self._lock:
+            items = list(self._contadores.items())
+        return [{'nombre': nombre, 'etiquetas': dict(etiquetas), 'valor': valor}
+                for (nombre, etiquetas), valor in sorted(items)]
+
+    def exporta_prometheus(self) -> str:
+        """Devuelve las métricas en el formato de texto de Prometheus."""
+        lineas = [
+            f"# HELP {PREFIJO}_etapa_segundos Duración de cada etapa del flujo de auditoría.",
+            f"# TYPE {PREFIJO}_etapa_segundos summary",
+        ]
+        for fila in self.resumen_etapas():
+            etiqueta = f'etapa="{_escapa(fila["etapa"])}"'
+            for q in CUANTILES:
+                lineas.append(f'{PREFIJO}_etapa_segundos{{{etiqueta},quantile="{q}"}} {fila[f"p{int(q * 100)}_s"]:.6f}')
+            lineas.append(f"{PREFIJO}_etapa_segundos_sum{{{etiqueta}}} {fila['total_s']:.6f}")
+            lineas.append(f"{PREFIJO}_etapa_segundos_count{{{etiqueta}}} {fila['ejecuciones']}")
+
+        declarados = set()
+        for contador in self.contadores():
+            nombre = f"{PREFIJO}_{contador['nombre']}_total"
+            if nombre not in declarados:
+                lineas.append(f"# TYPE {nombre} counter")
+                declarados.add(nombre)
+            etiquetas = ",".join(f'{k}="{_escapa(v)}"' for k, v in contador['etiquetas'].items())
+            valor = _numero(contador['valor'])
+            lineas.append(f"{nombre}{{{etiquetas}}} {valor}" if etiquetas else f"{nombre} {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def exporta_otlp(self) -> dict:
+        """Devuelve las métricas como un ExportMetricsServiceRequest de OTLP en JSON."""
+        inicio = str(int(self.inicio * 1e9))
+        ahora = str(time.time_ns())
+        resumenes = [{
+            'attributes': [_atributo('etapa', fila['etapa'])],
+            'startTimeUnixNano': inicio,
+            'timeUnixNano': ahora,
+            'count': str(fila['ejecuciones']),
+            'sum': fila['total_s'],
+            'quantileValues': [{'quantile': q, 'value': fila[f"p{int(q * 100)}_s"]} for q in CUANTILES],
+        } for fila in self.resumen_etapas()]
+        metricas = [{
+            'name': f"{PREFIJO}.etapa.duracion",
+            'unit': 's',
+            'summary': {'dataPoints': resumenes},
+        }]
+
+        por_nombre = {}
+        for contador in self.contadores():
+            valor = contador['valor']
+            punto = {
+                'attributes': [_atributo(k, v) for k, v in contador['etiquetas'].items()],
+                'startTimeUnixNano': inicio,
+                'timeUnixNano': ahora,
+            }
+            if float(valor).is_integer():
+                punto['asInt'] = str(int(valor))
+            else:
+                punto['asDouble'] = valor
+            por_nombre.setdefault(contador['nombre'], []).append(punto)
+        for nombre, puntos in por_nombre.items():
+            metricas.append({
+                'name': f"{PREFIJO}.{nombre}",
+                # 2 = AGGREGATION_TEMPORALITY_CUMULATIVE
+                'sum': {'dataPoints': puntos, 'aggregationTemporality': 2, 'isMonotonic': True},
+            })
+
+        return {'resourceMetrics': [{
+            'resource': {'attributes': [_atributo('service.name', 'auditoria-facturas')]},
+            'scopeMetrics': [{'scope': {'name': 'servicios.metricas'}, 'metrics': metricas}],
+        }]}
+
+    def guarda(self, directorio: str | None = None) -> str:
+        """
+        Escribe 'ultima_corrida.prom' y 'ultima_corrida.json' (OTLP) en el
+        directorio (por defecto METRICAS_DIR). El .prom sirve para el
+        textfile collector de node_exporter. Devuelve el directorio.
+        """
+        directorio = directorio or os.getenv('METRICAS_DIR', DIRECTORIO_DEFAULT)
+        os.makedirs(directorio, exist_ok=True)
+        for nombre, contenido in (
+            ("ultima_corrida.prom", self.exporta_prometheus()),
+            ("ultima_corrida.json", json.dumps(self.exporta_otlp(), ensure_ascii=False)),
+        ):
+            ruta = os.path.join(directorio, nombre)
+            with open(ruta + ".tmp", "w", encoding="utf-8") as archivo:
+                archivo.write(contenido)
+            os.replace(ruta + ".tmp", ruta)
+        return directorio
+
+
+def _escapa(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+def _atributo(clave: str, valor) -> dict:
+    return {'key': clave, 'value': {'stringValue': str(valor)}}
+
+
+# Registro de la corrida en curso (ver `corrida`). Fuera de una corrida se usa
+# el registro del proceso.
+_registro_proceso = Metricas()
+_registro_actual = contextvars.ContextVar("metricas", default=_registro_proceso)
+
+
+class _RegistroActual:
+    """Delega en el registro de la corrida en curso: `metricas.span(...)` mide en el que corresponde."""
+
+    def __getattr__(self, nombre):
+        return getattr(_registro_actual.get(), nombre)
+
+
+@contextlib.contextmanager
+def corrida(registro: Metricas | None = None):
+    """
+    Mide en `registro` (uno nuevo si es None) todo lo que se ejecute dentro del
+    bloque, también en los hilos lanzados con `en_contexto`.
+
+    Así dos análisis en paralelo, o dos sesiones de la app, no mezclan ni
+    borran las métricas del otro.
+    """
+    registro = registro if registro is not None else Metricas()
+    token = _registro_actual.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_actual.reset(token)
+
+
+def en_contexto(funcion):
+    """Envuelve `funcion` para que, al correr en otro hilo, mida en el registro de la corrida actual."""
+    # Una copia por llamada: un mismo contexto no se puede usar en dos hilos a la vez.
+    return functools.partial(contextvars.copy_context().run, funcion)
+
+
+metricas = _RegistroActual()
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import uuid
+import threading
+from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from servicios.metricas import Metricas, corrida
+
+# Directorio donde se guardan el estado y el resultado de cada análisis.
+DIRECTORIO_TRABAJOS = os.getenv('TRABAJOS_DIR', os.path.join(".cache", "trabajos"))
+# Cantidad de análisis que pueden correr a la vez en el proceso.
+MAX_TRABAJOS = int(os.getenv('TRABAJOS_MAX_WORKERS', 2))
+
+PENDIENTE = "pendiente"
+EN_CURSO = "en_curso"
+TERMINADO = "terminado"
+FALLIDO = "fallido"
+INTERRUMPIDO = "interrumpido"
+
+
+@dataclass
+class Trabajo:
+    """Estado de un análisis de periodo que corre en segundo plano."""
+    id: str
+    periodo: int
+    estado: str = PENDIENTE
+    total: int = 0
+    hechos: int = 0
+    # Filas ya resueltas en una corrida anterior: cuentan en `hechos` pero no llevan tiempo.
+    reanudadas: int = 0
+    creado: float = 0.0
+    inicio: float | None = None
+    fin: float | None = None
+    error: str | None = None
+    reanudar: bool = False
+
+    @property
+    def restantes(self) -> int:
+        return max(self.total - self.hechos, 0)
+
+    @property
+    def eta_segundos(self) -> float | None:
+        """Tiempo restante estimado según el ritmo de las filas procesadas en esta corrida."""
+        procesadas = self.hechos - self.reanudadas
+        if self.estado != EN_CURSO or procesadas <= 0 or self.inicio is None:
+            return None
+        transcurrido = time.time() - self.inicio
+        return transcurrido / procesadas * self.restantes
+
+    @property
+    def ruta_resultado(self) -> str:
+        return os.path.join(DIRECTORIO_TRABAJOS, f"{self.id}.pkl")
+
+
+_trabajos: dict[str, Trabajo] = {}
+# Métricas de cada trabajo de este proceso: cada análisis mide en su propio registro.
+_metricas: dict[str, Metricas] = {}
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=MAX_TRABAJOS, thread_name_prefix="analisis")
+
+
+def _guarda_estado(trabajo: Trabajo):
+    os.makedirs(DIRECTORIO_TRABAJOS, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_TRABAJOS, f"{trabajo.id}.json")
+    with open(ruta + ".tmp", "w", encoding="utf-8") as archivo:
+        json.dump(asdict(trabajo), archivo)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _carga_trabajos_guardados():
+    """Recupera los trabajos de ejecuciones anteriores del proceso."""
+    if not os.path.isdir(DIRECTORIO_TRABAJOS):
+        return
+    for nombre in os.listdir(DIRECTORIO_TRABAJOS):
+        if not nombre.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(DIRECTORIO_TRABAJOS, nombre), encoding="utf-8") as archivo:
+                trabajo = Trabajo(**json.load(archivo))
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el trabajo guardado {nombre}: {e}")
+            continue
+        # Si el proceso se reinició a mitad de un análisis, ese análisis se perdió.
+        if trabajo.estado in (PENDIENTE, EN_CURSO):
+            trabajo.estado = INTERRUMPIDO
+            _guarda_estado(trabajo)
+        _trabajos[trabajo.id] = trabajo
+
+
+def _ejecuta(trabajo: Trabajo):
+    # Import diferido: evita cargar los clientes de Tavily/Gemini solo por consultar el estado.
+    from servicios.busquedallm import realiza_busqueda_llm
+
+    ultimo_guardado = 0.0
+
+    def progreso(hechos: int, total: int, reanudadas: int):
+        nonlocal ultimo_guardado
+        with _lock:
+            trabajo.hechos = hechos
+            trabajo.total = total
+            trabajo.reanudadas = reanudadas
+            # El estado en disco se actualiza como mucho una vez por segundo.
+            if time.time() - ultimo_guardado >= 1:
+                _guarda_estado(trabajo)
+                ultimo_guardado = time.time()
+
+    with _lock:
+        trabajo.estado = EN_CURSO
+        trabajo.inicio = time.time()
+        _guarda_estado(trabajo)
+    try:
+        with corrida(_metricas[trabajo.id]):
+            df = realiza_busqueda_llm(trabajo.periodo, progreso=progreso, reanudar=trabajo.reanudar)
+        df.to_pickle(trabajo.ruta_resultado)
+        with _lock:
+            trabajo.estado = TERMINADO
+    except Exception as e:
+        print(f"❌ El análisis {trabajo.id} del periodo {trabajo.periodo} falló: {e}")
+        with _lock:
+            trabajo.estado = FALLIDO
+            trabajo.error = str(e)
+    finally:
+        with _lock:
+            trabajo.fin = time.time()
+            _guarda_estado(trabajo)
+
+
+def enviar_analisis(periodo, reanudar: bool = False) -> str:
+    """
+    Encola el análisis del periodo y devuelve el id del trabajo sin esperar a que termine.
+
+    Con `reanudar=True` se retoma un análisis cortado, sin repetir las filas ya resueltas.
+    """
+    trabajo = Trabajo(id=uuid.uuid4().hex[:12], periodo=int(periodo), creado=time.time(), reanudar=reanudar)
+    with _lock:
+        _trabajos[trabajo.id] = trabajo
+        _metricas[trabajo.id] = Metricas()
+        _guarda_estado(trabajo)
+    _executor.submit(_ejecuta, trabajo)
+    return trabajo.id
+
+
+def obtener_trabajo(trabajo_id: str) -> Trabajo | None:
+    with _lock:
+        return _trabajos.get(trabajo_id)
+
+
+def metricas_trabajo(trabajo_id: str) -> Metricas | None:
+    """Métricas del trabajo, o None si no corrió en este proceso."""
+    with _lock:
+        return _metricas.get(trabajo_id)
+
+
+def lista_trabajos(periodo=None) -> list[Trabajo]:
+    """Devuelve los trabajos conocidos, del más reciente al más antiguo."""
+    with _lock:
+        trabajos = list(_trabajos.values())
+    if periodo is not None:
+        trabajos = [t for t in trabajos if t.periodo == int(periodo)]
+    return sorted(trabajos, key=lambda t: t.creado, reverse=True)
+
+
+def carga_resultado(trabajo_id: str) -> pd.DataFrame | None:
+    """Devuelve el resultado guardado de un trabajo terminado, sin recalcularlo."""
+    trabajo = obtener_trabajo(trabajo_id)
+    if trabajo is None or trabajo.estado != TERMINADO or not os.path.exists(trabajo.ruta_resultado):
+        return None
+    return pd.read_pickle(trabajo.ruta_resultado)
+
+
+_carga_trabajos_guardados()
@@ -0,0 +1,121 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Cuantiles por categoría fuera de los cuales una fila se considera atípica.
+CUANTIL_BAJO_DEFAULT = 0.05
+CUANTIL_ALTO_DEFAULT = 0.95
+# Categorías con menos filas que esto no tienen una distribución confiable:
+# todas sus filas se mandan a la búsqueda.
+MIN_FILAS_CATEGORIA_DEFAULT = 30
+
+
+def _parametros(cuantil_bajo, cuantil_alto, min_filas_categoria) -> tuple[float, float, int]:
+    if cuantil_bajo is None:
+        cuantil_bajo = float(os.getenv('TRIAGE_CUANTIL_BAJO', CUANTIL_BAJO_DEFAULT))
+    if cuantil_alto is None:
+        cuantil_alto = float(os.getenv('TRIAGE_CUANTIL_ALTO', CUANTIL_ALTO_DEFAULT))
+    if min_filas_categoria is None:
+        min_filas_categoria = int(os.getenv('TRIAGE_MIN_FILAS_CATEGORIA', MIN_FILAS_CATEGORIA_DEFAULT))
+    return cuantil_bajo, cuantil_alto, min_filas_categoria
+
+
+def _metricas(df: pd.DataFrame) -> pd.DataFrame:
+    """Calcula, de forma vectorizada, las métricas declaradas que se comparan por categoría."""
+    alto = pd.to_numeric(df['alto'], errors='coerce').astype(float)
+    ancho = pd.to_numeric(df['ancho'], errors='coerce').astype(float)
+    largo = pd.to_numeric(df['largo'], errors='coerce').astype(float)
+    peso_fisico = pd.to_numeric(df['peso_fisico'], errors='coerce').astype(float)
+    volumen = alto * ancho * largo  # cm³
+    return pd.DataFrame({
+        'category': df['category'].fillna('').astype(str).to_numpy(),
+        # Densidad en kg/m³: un paquete "inflado" tiene una densidad muy baja para su categoría.
+        'densidad': (peso_fisico / volumen.where(volumen > 0) * 1e6).to_numpy(),
+        'peso_aforado': pd.to_numeric(df['peso_aforado'], errors='coerce').astype(float).to_numpy(),
+    }, index=df.index)
+
+
+def marca_outliers(df: pd.DataFrame, referencia: pd.DataFrame | None = None,
+                   cuantil_bajo: float | None = None, cuantil_alto: float | None = None,
+                   min_filas_categoria: int | None = None) -> pd.Series:
+    """
+    Marca las filas cuyas medidas declaradas son atípicas para su categoría.
+
+    Por cada `category` de `referencia` (por defecto, el mismo `df`) se calculan
+    los cuantiles de densidad (peso_fisico / volumen) y de peso_aforado. Una fila
+    es atípica si alguna de las dos queda fuera de [cuantil_bajo, cuantil_alto],
+    si le faltan medidas, o si su categoría tiene menos de `min_filas_categoria`
+    filas de referencia.
+
+    Returns:
+        Una Serie booleana alineada con `df`: True para las filas que conviene
+        verificar con Tavily/Gemini.
+    """
+    cuantil_bajo, cuantil_alto, min_filas_categoria = _parametros(cuantil_bajo, cuantil_alto, min_filas_categoria)
+    metricas = _metricas(df)
+    metricas_ref = metricas if referencia is None else _metricas(referencia)
+
+    agrupado = metricas_ref.groupby('category')[['densidad', 'peso_aforado']]
+    limites = pd.concat({
+        'bajo': agrupado.quantile(cuantil_bajo),
+        'alto': agrupado.quantile(cuantil_alto),
+    }, axis=1)
+    limites.columns = [f"{medida}_{lado}" for lado, medida in limites.columns]
+    limites['filas'] = metricas_ref.groupby('category').size()
+
+    unido = metricas.join(limites, on='category')
+    fuera = np.zeros(len(unido), dtype=bool)
+    for medida in ('densidad', 'peso_aforado'):
+        valores = unido[medida].to_numpy()
+        fuera |= ~((valores >= unido[f"{medida}_bajo"].to_numpy()) & (valores <= unido[f"{medida}_alto"].to_numpy()))
+    # Sin medidas, o categoría nueva o con pocos datos: no se puede descartar, se verifica.
+    fuera |= ~(unido['filas'].fillna(0).to_numpy() >= min_filas_categoria)
+    return pd.Series(fuera, index=df.index, name='verificar')
+
+
+def evalua_triage(historico: pd.DataFrame, **parametros) -> dict:
+    """
+    Mide el triage contra resultados anteriores de la tabla 'scales'.
+
+    Args:
+        historico: Invoices de periodos ya analizados, con una columna booleana
+                   'en_scales' que indica si el análisis encontró una diferencia.
+        **parametros: Los mismos parámetros de `marca_outliers`.
+
+    Returns:
+        Un diccionario con filas totales, filas omitidas, precisión (de las
+        filas marcadas, cuántas tenían diferencia) y cobertura (de las filas con
+        diferencia, cuántas habrían sido marcadas).
+    """
+    marcadas = marca_outliers(historico, **parametros).to_numpy()
+    en_scales = historico['en_scales'].astype(bool).to_numpy()
+    aciertos = int((marcadas & en_scales).sum())
+    total_marcadas = int(marcadas.sum())
+    total_scales = int(en_scales.sum())
+    return {
+        'filas': len(historico),
+        'omitidas': len(historico) - total_marcadas,
+        'precision': aciertos / total_marcadas if total_marcadas else None,
+        'cobertura': aciertos / total_scales if total_scales else None,
+    }
+
+
+def resumen_triage(marcadas: pd.Series) -> str:
+    """Texto con la cantidad de filas omitidas por el triage."""
+    total = len(marcadas)
+    omitidas = int((~marcadas).sum())
+    porcentaje = omitidas / total * 100 if total else 0
+    return f"Triage: {omitidas} de {total} filas omitidas ({porcentaje:.1f}%), {total - omitidas} se verifican con Tavily/Gemini"
+
+
+if __name__ == "__main__":
+    # Evaluación contra los resultados guardados en 'scales':
+    #   python -m servicios.triage
+    from servicios.consulta_invoices import trae_invoices_con_scales
+
+    def porcentaje(valor):
+        return f"{valor * 100:.1f}%" if valor is not None else "sin datos"
+
+    metricas = evalua_triage(trae_invoices_con_scales())
+    print(f"Filas evaluadas: {metricas['filas']} | omitidas: {metricas['omitidas']}")
+    print(f"Precisión: {porcentaje(metricas['precision'])} | cobertura: {porcentaje(metricas['cobertura'])}")